@@ -0,0 +1,101 @@
+import itertools
+from typing import List, Tuple
+
+from nonebot.adapters.qq.event import C2CMessageCreateEvent, GroupAtMessageCreateEvent, MessageEvent
+
+# 超级用户ID，运行基准时会加入 SUPERUSERS
+ADMIN_USER = "bench-admin"
+
+# 用户类型：bound 为预先绑定的用户，fresh 为未绑定的新用户（bind 之后由 unbind 解绑），admin 为超级用户
+BOUND = "bound"
+FRESH = "fresh"
+ADMIN = "admin"
+
+# (场景名称, 消息模板, 用户类型)，覆盖插件的每个指令处理器；模板中的 {i} 为事件序号
+SCENARIOS: List[Tuple[str, str, str]] = [
+    ("help", "/help", BOUND),
+    ("bind", "/bind token{i}", FRESH),
+    ("name", "/name", BOUND),
+    ("setName", "/setName BENCH{i}", BOUND),
+    ("resetName", "/resetName", BOUND),
+    ("ticket", "/ticket", BOUND),
+    ("setTicket", "/setTicket 6", BOUND),
+    ("resetTicket", "/resetTicket", BOUND),
+    ("network", "/network", BOUND),
+    ("networkTrend", "/network trend 24h", BOUND),
+    ("showPermission", "/showPermission", BOUND),
+    ("showFriends", "/showFriends {page}", BOUND),
+    ("showFriendsAll", "/showFriends all", BOUND),
+    ("showFriendRequests", "/showFriendRequests", BOUND),
+    ("addFriend", "/addFriend friend{i}", BOUND),
+    ("acceptFriend", "/acceptFriend friend{i}", BOUND),
+    ("denyFriend", "/denyFriend friend{i}", BOUND),
+    ("removeFriend", "/removeFriend friend{i}", BOUND),
+    ("arcadeInfo", "/info 模拟机厅{arcade}", BOUND),
+    ("watch", "/watch 模拟机厅{arcade}", BOUND),
+    ("unwatch", "/unwatch 模拟机厅{arcade}", BOUND),
+    ("turboStatus", "/turboStatus", ADMIN),
+    ("refreshArcades", "/refreshArcades", ADMIN),
+    ("unbind", "/unbind", FRESH),
+]
+
+
+def bound_user(index: int) -> str:
+    return f"bench-user-{index}"
+
+
+def fresh_user(index: int) -> str:
+    return f"bench-fresh-{index}"
+
+
+class EventFactory:
+    """
+    @Author: TurboServlet
+    @Description: 合成 QQ 消息事件，按比例生成群聊 @ 消息与私聊消息
+    """
+
+    def __init__(self, users: int, groups: int, group_ratio: float = 0.8, arcades: int = 20):
+        self.users = users
+        self.groups = groups
+        self.group_ratio = group_ratio
+        self.arcades = arcades
+        self._ids = itertools.count()
+
+    def _user_id(self, kind: str, index: int) -> str:
+        if kind == ADMIN:
+            return ADMIN_USER
+        if kind == FRESH:
+            return fresh_user(index)
+        return bound_user(index % self.users)
+
+    def make(self, template: str, kind: str, index: int) -> MessageEvent:
+        """
+        @Author: TurboServlet
+        @Func: make()
+        @Description: 生成第 index 个事件
+        @Param {str} template: 消息模板
+        @Param {str} kind: 用户类型
+        @Param {int} index: 事件序号
+        @Return: MessageEvent
+        """
+        message_id = f"bench-{next(self._ids)}"
+        content = template.format(i=index, page=index % 5 + 1, arcade=index % self.arcades)
+        user_id = self._user_id(kind, index)
+        # 按序号的小数部分决定消息来源，保证同样的参数得到同样的事件序列
+        if (index * 0.618) % 1 < self.group_ratio:
+            return GroupAtMessageCreateEvent.model_validate({
+                "id": message_id,
+                "content": content,
+                "timestamp": "2024-01-01T00:00:00+08:00",
+                "author": {"id": user_id, "bot": False, "member_openid": user_id, "member_role": "member"},
+                "group_id": f"bench-group-{index % self.groups}",
+                "group_openid": f"bench-group-{index % self.groups}",
+                "to_me": True,
+            })
+        return C2CMessageCreateEvent.model_validate({
+            "id": message_id,
+            "content": content,
+            "timestamp": "2024-01-01T00:00:00+08:00",
+            "author": {"id": user_id, "user_openid": user_id},
+            "to_me": True,
+        })
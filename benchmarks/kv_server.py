@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import fnmatch
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class RespError(Exception):
+    pass
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return f"-ERR {value}\r\n".encode()
+    if isinstance(value, bool):
+        return f":{int(value)}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, (list, tuple)):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode(item) for item in value)
+    if isinstance(value, str):
+        value = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+_OK = object()
+
+
+def _format_float(value: float) -> bytes:
+    return f"{value:.17g}".encode()
+
+
+class KVServer:
+    """
+    @Author: TurboServlet
+    @Description: 本地替身键值服务，基于 asyncio 实现 RESP2 协议中存储后端用到的命令（字符串、哈希、SCAN、发布订阅），
+                  数据只保存在内存中，键在被访问时按过期时间惰性删除；仅用于开发与多实例测试
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        # 只实现了 RESP2，新版 redis-py 默认使用 RESP3，需要在连接地址中指定协议版本
+        return f"redis://{self.host}:{self.port}/0?protocol=2"
+
+    async def start(self) -> str:
+        """
+        @Author: TurboServlet
+        @Func: start()
+        @Description: 启动服务，端口为 0 时自动分配
+        @Return: str，连接地址
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: Set[bytes] = set()
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                name = args[0].upper().decode()
+                if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                    self._subscription(name, args[1:], subscriptions, writer)
+                else:
+                    try:
+                        result = self._execute(name, args[1:])
+                    except RespError as e:
+                        result = e
+                    except (ValueError, IndexError):
+                        result = RespError(f"wrong arguments for '{name.lower()}' command")
+                    writer.write(b"+OK\r\n" if result is _OK else _encode(result))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for channel in subscriptions:
+                self._channels.get(channel, set()).discard(writer)
+            writer.close()
+
+    def _subscription(self, name: str, channels: List[bytes], subscriptions: Set[bytes], writer: asyncio.StreamWriter):
+        if name == "UNSUBSCRIBE" and not channels:
+            channels = sorted(subscriptions)
+        for channel in channels:
+            if name == "SUBSCRIBE":
+                subscriptions.add(channel)
+                self._channels.setdefault(channel, set()).add(writer)
+            else:
+                subscriptions.discard(channel)
+                self._channels.get(channel, set()).discard(writer)
+            writer.write(_encode([name.lower().encode(), channel, len(subscriptions)]))
+
+    def _alive(self, key: bytes) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+        return key in self._data
+
+    def _get(self, key: bytes, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _hash(self, key: bytes) -> Dict[bytes, bytes]:
+        value = self._get(key, dict)
+        if value is None:
+            value = self._data[key] = {}
+        return value
+
+    def _delete(self, key: bytes) -> bool:
+        existed = self._alive(key)
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+        return existed
+
+    def _execute(self, name: str, args: List[bytes]) -> Any:
+        if name == "PING":
+            return args[0] if args else b"PONG"
+        if name in ("CLIENT", "SELECT"):
+            return _OK
+        if name == "FLUSHALL":
+            self._data.clear()
+            self._expires.clear()
+            return _OK
+        if name == "GET":
+            return self._get(args[0], bytes)
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            return sum(self._delete(key) for key in args)
+        if name == "INCRBYFLOAT":
+            value = float(self._get(args[0], bytes) or 0) + float(args[1])
+            self._data[args[0]] = _format_float(value)
+            return self._data[args[0]]
+        if name == "PTTL":
+            if not self._alive(args[0]):
+                return -2
+            expires_at = self._expires.get(args[0])
+            return -1 if expires_at is None else max(0, int((expires_at - time.monotonic()) * 1000))
+        if name == "PEXPIRE":
+            if not self._alive(args[0]):
+                return 0
+            self._expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+            return 1
+        if name == "HGET":
+            return (self._get(args[0], dict) or {}).get(args[1])
+        if name == "HMGET":
+            value = self._get(args[0], dict) or {}
+            return [value.get(field) for field in args[1:]]
+        if name == "HGETALL":
+            return [item for pair in (self._get(args[0], dict) or {}).items() for item in pair]
+        if name == "HSET":
+            value = self._hash(args[0])
+            added = 0
+            for field, item in zip(args[1::2], args[2::2]):
+                added += field not in value
+                value[field] = item
+            return added
+        if name == "HDEL":
+            value = self._get(args[0], dict) or {}
+            removed = sum(value.pop(field, None) is not None for field in args[1:])
+            if not value:
+                self._delete(args[0])
+            return removed
+        if name == "SCAN":
+            return self._scan(args)
+        if name == "PUBLISH":
+            return self._publish(args[0], args[1])
+        raise RespError(f"unknown command '{name.lower()}'")
+
+    def _set(self, args: List[bytes]) -> Any:
+        key, value = args[0], args[1]
+        options = [arg.upper() for arg in args[2:]]
+        if b"NX" in options and self._alive(key):
+            return None
+        ttl: Optional[float] = None
+        for option, unit in ((b"PX", 1000), (b"EX", 1)):
+            if option in options:
+                ttl = int(args[2 + options.index(option) + 1]) / unit
+        self._data[key] = value
+        if ttl is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + ttl
+        return _OK
+
+    def _scan(self, args: List[bytes]) -> Tuple[bytes, List[bytes]]:
+        cursor = int(args[0])
+        options = [arg.upper() for arg in args[1:]]
+        pattern = args[1 + options.index(b"MATCH") + 1].decode() if b"MATCH" in options else "*"
+        count = int(args[1 + options.index(b"COUNT") + 1]) if b"COUNT" in options else 10
+        # 以排序后的键位置作为游标，遍历期间新增的键可能被跳过，与 Redis 的保证一致
+        keys = sorted(self._data)[cursor:cursor + count]
+        next_cursor = cursor + len(keys) if len(keys) == count else 0
+        matched = [key for key in keys if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+        return str(next_cursor).encode(), matched
+
+    def _publish(self, channel: bytes, message: bytes) -> int:
+        subscribers = self._channels.get(channel, set())
+        payload = _encode([b"message", channel, message])
+        for writer in list(subscribers):
+            writer.write(payload)
+        return len(subscribers)
+
+
+async def _serve(host: str, port: int):
+    server = KVServer(host, port)
+    url = await server.start()
+    print(f"KV 替身服务已启动：{url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Turbobot 共享存储后端的本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
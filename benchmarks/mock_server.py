@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+class EndpointProfile:
+    """
+    @Author: TurboServlet
+    @Description: 模拟接口的延迟与错误分布，延迟服从以 latency 为中位数的对数正态分布
+    """
+
+    def __init__(self, latency: float = 0.02, sigma: float = 0.5, error_rate: float = 0.0, error_status: int = 503):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(self.latency), self.sigma)
+
+
+def _arcade_detail(params: Dict[str, str], body: Dict[str, Any], rng: random.Random) -> Any:
+    players = rng.randint(0, 12)
+    return {
+        "arcadeInfo": {
+            "arcadeName": params.get("arcadeName", "模拟机厅"),
+            "arcadeRequested": 1200,
+            "arcadeCachedRequest": 900,
+            "arcadeFixedRequest": 12,
+            "arcadeCachedHitRate": 7500,
+        },
+        "thirtyMinutesPlayer": players,
+        "oneHourPlayer": players + 3,
+        "twoHoursPlayer": players + 6,
+        "thirtyMinutesPlayCount": players * 3,
+        "oneHourPlayCount": players * 5,
+        "twoHoursPlayCount": players * 9,
+        "playerList": [{"maimaiName": f"PLAYER{i}"} for i in range(players)],
+    }
+
+
+def _friends(params: Dict[str, str], body: Dict[str, Any], rng: random.Random) -> Any:
+    page = int(params.get("page", "1"))
+    return {
+        "content": [{"turboName": f"friend_{page}_{i}"} for i in range(20)],
+        "totalElements": 100,
+        "totalPages": 5,
+    }
+
+
+def _ok(params: Dict[str, str], body: Dict[str, Any], rng: random.Random) -> Any:
+    return None
+
+
+# 接口路径 -> (方法, 响应生成函数)，覆盖插件处理器用到的全部接口
+ENDPOINTS: Dict[str, Tuple[str, Callable[[Dict[str, str], Dict[str, Any], random.Random], Any]]] = {
+    '/bot/bind': ("POST", lambda params, body, rng: {"botKey": f"bench-{body.get('botToken', '')}"}),
+    '/bot/unbind': ("POST", _ok),
+    '/web/setMaimaiName': ("POST", _ok),
+    '/web/resetMaimaiName': ("POST", _ok),
+    '/web/showMaimaiName': ("GET", lambda params, body, rng: "BENCHMARK".encode()),
+    '/web/setTickets': ("POST", _ok),
+    '/web/resetTickets': ("POST", _ok),
+    '/web/currentTickets': ("GET", lambda params, body, rng: {
+        "turboTicket": {"isEnable": True, "ticketId": 6},
+        "maimaiTickets": [{"ticketId": 6, "stock": 2}, {"ticketId": 3, "stock": 1}],
+    }),
+    '/web/showServerRequests': ("GET", lambda params, body, rng: {
+        "requestsCount": 10000,
+        "exceptionRequestsCount": 120,
+        "zlibSkippedRequestsCount": rng.randint(0, 400),
+        "retryRequestsCount": 50,
+        "panicRequestsCount": 3,
+        "exceptionRequestsRate": rng.uniform(0, 3),
+    }),
+    '/permission/showPermission': ("GET", lambda params, body, rng: "USER"),
+    '/web/showTurboPermission': ("GET", lambda params, body, rng: [
+        {"permissionDescription": "查询机厅信息", "isGranted": True},
+        {"permissionDescription": "锁定功能票", "isGranted": False},
+    ]),
+    '/web/showFriends': ("GET", _friends),
+    '/web/showFriendRequests': ("GET", lambda params, body, rng: [
+        {"turboName": "requester", "requestTime": "2024-01-01T12:00:00.000Z"},
+    ]),
+    '/web/addFriend': ("POST", _ok),
+    '/web/acceptFriend': ("POST", _ok),
+    '/web/denyFriend': ("POST", _ok),
+    '/web/removeFriend': ("POST", _ok),
+    '/web/arcadeInfoDetail': ("GET", _arcade_detail),
+}
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+            502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class MockTurboServer:
+    """
+    @Author: TurboServlet
+    @Description: 本地模拟的 Turbo API 服务，基于 asyncio 的最小 HTTP/1.1 实现，支持长连接；
+                  etags 为 True 时为 GET 响应生成 ETag，并对匹配的 If-None-Match 返回 304
+    """
+
+    def __init__(
+        self,
+        default_profile: Optional[EndpointProfile] = None,
+        profiles: Optional[Dict[str, EndpointProfile]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+        etags: bool = True,
+    ):
+        self.default_profile = default_profile or EndpointProfile()
+        self.profiles = profiles or {}
+        self.host = host
+        self.port = port
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.not_modified: Counter = Counter()
+        self.etags = etags
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        """
+        @Author: TurboServlet
+        @Func: start()
+        @Description: 启动模拟服务，端口为 0 时自动分配
+        @Return: str，服务地址
+        """
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                raw_body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                status, payload = await self._respond(method, target, raw_body)
+                content = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode()
+                extra_headers = ""
+                if self.etags and method == "GET" and status == 200 and content:
+                    etag = '"' + hashlib.sha1(content).hexdigest()[:16] + '"'
+                    extra_headers = f"ETag: {etag}\r\n"
+                    if headers.get("if-none-match") == etag:
+                        self.not_modified[urlsplit(target).path] += 1
+                        status, content = 304, b""
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n{extra_headers}"
+                    f"Content-Length: {len(content)}\r\n\r\n".encode("latin-1") + content
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # 停止服务时仍在处理的请求（如被取消的对冲请求）直接结束，不让事件循环报告未处理的取消
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, raw_body: bytes) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        self.requests[url.path] += 1
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return 404, {"message": "not found"}
+        if endpoint[0] != method:
+            return 405, {"message": "method not allowed"}
+
+        profile = self.profiles.get(url.path, self.default_profile)
+        await asyncio.sleep(profile.sample_latency(self._rng))
+        if self._rng.random() < profile.error_rate:
+            self.errors[url.path] += 1
+            return profile.error_status, {"message": "模拟错误"}
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = json.loads(raw_body) if raw_body else {}
+        result = endpoint[1](params, body, self._rng)
+        return 200, b"" if result is None else result
@@ -0,0 +1,264 @@
+"""
+@Author: TurboServlet
+@Description: 插件基准测试：启动本地模拟 Turbo API，用合成事件驱动每个指令处理器，统计吞吐、延迟分位数与内存
+
+用法：
+    python -m benchmarks.run --events 200 --concurrency 32 --save baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from .events import ADMIN_USER, FRESH, SCENARIOS, EventFactory, bound_user
+from .mock_server import EndpointProfile, MockTurboServer
+
+# 回复中出现这些片段时视为处理失败，与插件的错误回复保持一致
+ERROR_MARKERS = ("过程中出现错误", "HTTP响应状态码为", "暂时不可用", "尚未绑定", "过于频繁", "权限不足", "请求数据不合法", "服务器内部错误")
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="nonebot-plugin-turbobot 基准测试")
+    parser.add_argument("--events", type=int, default=200, help="每个指令的事件数量")
+    parser.add_argument("--concurrency", type=int, default=32, help="同时处理的事件数量")
+    parser.add_argument("--users", type=int, default=500, help="预先绑定的用户数量")
+    parser.add_argument("--groups", type=int, default=50, help="群组数量")
+    parser.add_argument("--group-ratio", type=float, default=0.8, help="群聊消息所占比例")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟接口的延迟中位数（秒）")
+    parser.add_argument("--sigma", type=float, default=0.5, help="模拟接口延迟的对数正态分布参数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟接口返回错误的概率")
+    parser.add_argument("--error-status", type=int, default=503, help="模拟错误时的状态码")
+    parser.add_argument("--no-etag", action="store_true", help="模拟接口不返回 ETag，用于测试上游不支持条件请求的情况")
+    parser.add_argument("--profile", help="按接口覆盖延迟与错误分布的 JSON 文件，如 "
+                                          '{"/web/arcadeInfoDetail": {"latency": 0.1, "error_rate": 0.05}}')
+    parser.add_argument("--only", nargs="*", help="只运行指定的指令场景")
+    parser.add_argument("--memory", action="store_true", help="额外运行一轮 tracemalloc 统计每个指令的内存")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--save", help="将结果保存为 JSON 基线")
+    parser.add_argument("--compare", help="与已保存的 JSON 基线比较")
+    parser.add_argument("--threshold", type=float, default=0.15, help="判定回归的相对变化阈值")
+    return parser.parse_args(argv)
+
+
+def prepare_database(path: str, users: int):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS user (QQID TEXT, bot_token TEXT, bot_key TEXT, bind_time TEXT)")
+        conn.executemany(
+            "INSERT INTO user (QQID, bot_token, bot_key, bind_time) VALUES (?, ?, ?, ?)",
+            ((bound_user(i), f"token{i}", f"bench-key-{i}", "2024-01-01 00:00:00") for i in range(users)),
+        )
+    conn.close()
+
+
+def configure_environment(args: argparse.Namespace, base_url: str, database_path: str):
+    # 插件配置在导入时读取，必须在加载插件之前写入环境变量
+    os.environ.update({
+        "API_BASE_URL": base_url,
+        "DATABASE_PATH": database_path,
+        "RATE_LIMIT_ENABLED": "false",
+        "SEND_RATE_PER_CHANNEL": "1000000",
+        "SEND_BURST": "1000000",
+        "METRICS_ENABLED": "false",
+    })
+
+
+class ReplyRecorder:
+    def __init__(self):
+        self.replies = 0
+        self.error_replies = 0
+
+    async def send(self, event, message, **kwargs):
+        self.replies += 1
+        text = str(message)
+        if any(marker in text for marker in ERROR_MARKERS):
+            self.error_replies += 1
+
+
+async def run_scenario(bot, factory: EventFactory, template: str, kind: str, events: int, concurrency: int) -> Dict[str, Any]:
+    """
+    @Author: TurboServlet
+    @Func: run_scenario()
+    @Description: 以指定并发处理一个指令场景的全部事件，统计吞吐与延迟分位数
+    @Return: dict
+    """
+    from nonebot.message import handle_event
+
+    recorder = ReplyRecorder()
+    bot.send = recorder.send
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(index: int):
+        event = factory.make(template, kind, index)
+        async with semaphore:
+            started = time.perf_counter()
+            await handle_event(bot, event)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(events)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "events": events,
+        "throughput": events / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "replies": recorder.replies,
+        "error_replies": recorder.error_replies,
+    }
+
+
+async def measure_memory(bot, factory: EventFactory, template: str, kind: str, events: int, concurrency: int) -> Dict[str, float]:
+    """
+    @Author: TurboServlet
+    @Func: measure_memory()
+    @Description: 使用 tracemalloc 统计处理一批事件时的峰值内存与处理后仍保留的内存
+    @Return: dict
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await run_scenario(bot, factory, template, kind, events, concurrency)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib_per_event": (peak - before) / 1024 / events,
+        "retained_kib_per_event": (after - before) / 1024 / events,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    @Author: TurboServlet
+    @Func: compare()
+    @Description: 与基线比较吞吐与 p99 延迟，返回超过阈值的回归项
+    @Return: List[str]
+    """
+    regressions: List[str] = []
+    print(f"\n{'指令':<20}{'吞吐变化':>12}{'p99 变化':>12}")
+    for name, current in results["commands"].items():
+        previous = baseline.get("commands", {}).get(name)
+        if previous is None:
+            continue
+        throughput_change = current["throughput"] / previous["throughput"] - 1 if previous["throughput"] else 0.0
+        p99_change = current["p99_ms"] / previous["p99_ms"] - 1 if previous["p99_ms"] else 0.0
+        print(f"{name:<20}{throughput_change:>+12.1%}{p99_change:>+12.1%}")
+        if throughput_change < -threshold:
+            regressions.append(f"{name} 吞吐下降 {-throughput_change:.1%}")
+        if p99_change > threshold:
+            regressions.append(f"{name} p99 上升 {p99_change:.1%}")
+    return regressions
+
+
+def load_profiles(path: Optional[str]) -> Dict[str, EndpointProfile]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {endpoint: EndpointProfile(**options) for endpoint, options in json.load(f).items()}
+
+
+async def main(args: argparse.Namespace) -> int:
+    server = MockTurboServer(
+        EndpointProfile(args.latency, args.sigma, args.error_rate, args.error_status),
+        load_profiles(args.profile),
+        seed=args.seed,
+        etags=not args.no_etag,
+    )
+    base_url = await server.start()
+
+    workdir = tempfile.mkdtemp(prefix="turbobot-bench-")
+    database_path = os.path.join(workdir, "bench.db")
+    prepare_database(database_path, args.users)
+    configure_environment(args, base_url, database_path)
+
+    import nonebot
+    from nonebot.adapters.qq import Adapter, Bot
+    from nonebot.adapters.qq.config import BotInfo
+
+    nonebot.init(driver="~none+~httpx", log_level="WARNING", superusers={ADMIN_USER}, command_start={"/"})
+    driver = nonebot.get_driver()
+    driver.register_adapter(Adapter)
+    nonebot.load_plugin("nonebot_plugin_turbobot")
+    bot = Bot(nonebot.get_adapter(Adapter), "bench", BotInfo(id="bench", secret="bench", token="bench"))
+
+    await driver._lifespan.startup()
+    results: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("save", "compare")},
+        "commands": {},
+    }
+    try:
+        factory = EventFactory(args.users, args.groups, args.group_ratio)
+        print(f"{'指令':<20}{'吞吐(次/秒)':>12}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'失败':>8}")
+        for name, template, kind in SCENARIOS:
+            if args.only and name not in args.only:
+                continue
+            stats = await run_scenario(bot, factory, template, kind, args.events, args.concurrency)
+            results["commands"][name] = stats
+            print(
+                f"{name:<20}{stats['throughput']:>12.1f}{stats['p50_ms']:>10.2f}"
+                f"{stats['p90_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['error_replies']:>8}"
+            )
+
+        if args.memory:
+            print(f"\n{'指令':<20}{'峰值(KiB/次)':>14}{'保留(KiB/次)':>14}")
+            memory_events = min(args.events, 50)
+            for name, template, kind in SCENARIOS:
+                # bind/unbind 场景会改变绑定状态，内存统计时跳过
+                if kind == FRESH or (args.only and name not in args.only):
+                    continue
+                memory = await measure_memory(bot, factory, template, kind, memory_events, args.concurrency)
+                results["commands"][name].update(memory)
+                print(f"{name:<20}{memory['peak_kib_per_event']:>14.1f}{memory['retained_kib_per_event']:>14.1f}")
+
+        results["upstream_requests"] = dict(server.requests)
+        results["upstream_errors"] = dict(server.errors)
+        results["upstream_not_modified"] = dict(server.not_modified)
+    finally:
+        await driver._lifespan.shutdown()
+        await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\n发现性能回归：\n" + "\n".join(regressions))
+            return 1
+        print("\n未发现性能回归。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
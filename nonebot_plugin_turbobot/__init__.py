@@ -1,1034 +1,1198 @@
-from datetime import datetime
-import html
-
-import httpx
-from nonebot import (
-    on_command,
-)
-from nonebot.adapters.qq import (  # type: ignore
-    Message,
-    MessageEvent,
-)
-from nonebot.params import CommandArg
-from nonebot.plugin import PluginMetadata
-
-from .config import Config
-from .libraries.db_utils import bind_user, get_bot_key, is_already_bound, unbind_user
-from .permission.models import UserPermission
-
-plugin_config = Config()
-
-__plugin_meta__ = PluginMetadata(
-    name="turbo",
-    description="给turbo用户提供指令服务的插件",
-    usage="",
-    type="application",
-    extra={},
-)
-
-help = on_command('help', aliases={'帮助'}, priority=5)
-set_name = on_command('setName', aliases={'setname', '设置名称', '修改名称'}, priority=5)
-reset_name = on_command('resetName', aliases={'resetname', '重置名称', '删除名称'}, priority=5)
-show_name = on_command('name', aliases={'showName', '查询名称', '查看名称'}, priority=5)
-set_ticket = on_command('setTicket', aliases={'setticket', '设置票', '锁定票'}, priority=5)
-reset_ticket = on_command('resetTicket', aliases={'resetticket', '重置票', '取消票'}, priority=5)
-show_ticket = on_command('ticket', aliases={'showTicket', '查询票', '查看票'}, priority=5)
-bind = on_command('bind', aliases={'绑定'}, priority=5)
-unbind = on_command('unbind', aliases={'解绑'}, priority=5)
-network = on_command('network', aliases={'网络状态', '查询网络'}, priority=5)
-show_permission = on_command('showPermission', aliases={'permission', '获取权限', '展示权限', '权限', '权限查询'}, priority=5)
-show_friends = on_command('showFriends', aliases={'showfriends', 'friends', 'friendslist','好友', '好友列表', '查询好友', '查看好友'}, priority=5)
-show_friend_requests = on_command('showFriendRequests', aliases={'showfriendrequests', '好友请求', '好友请求列表', '查询好友请求'}, priority=5)
-add_friend = on_command('addFriend', aliases={'addfriend', 'add', '加好友', '添加好友', '好友添加'}, priority=5)
-accept_friend = on_command('acceptFriend', aliases={'acceptfriend', 'accept', '同意好友', '同意好友申请', '同意好友请求', '接受好友请求'}, priority=5)
-deny_friend = on_command('denyFriend', aliases={'denyfriend', 'deny', '拒绝好友', '拒绝好友请求', '拒绝好友申请'}, priority=5)
-remove_friend = on_command('removeFriend', aliases={'removefriend', 'remove', '删除好友', '移除好友'}, priority=5)
-arcade_info_detail = on_command('arcadeInfo', aliases={'arcadeinfo', 'info', 'arcade', '机厅', '查卡', '机厅信息'})
-
-@help.handle()
-async def handle_help(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_help()
-    @Description: 输出所有指令的帮助信息
-    @Param {MessageEvent} event: 消息事件
-    """
-    
-    help_message = """
-指令帮助信息：
-1. /setName 或 /设置名称 或 /修改名称 - 设置您的名称
-2. /resetName 或 /重置名称 或 /删除名称 - 重置或删除您的名称
-3. /name 或 /查询名称 或 /查看名称 - 查看当前名称
-4. /setTicket 或 /设置票 或 /锁定票 - 锁定功能票
-5. /resetTicket 或 /重置票 或 /取消票 - 重置功能票
-6. /ticket 或 /查询票 或 /查看票 - 查看功能票状态
-7. /bind 或 /绑定 - 绑定您的Turbo账号
-8. /unbind 或 /解绑 - 解绑您的Turbo账号
-9. /network 或 /网络状态 或 /查询网络 - 查看当前网络状态
-10. /showPermission 或 /权限查询 - 显示您的权限信息
-11. /showFriends 或 /好友 或 /好友列表 或 /查询好友 或 /查看好友 - 查看您的好友列表
-12. /showFriendRequests 或 /好友请求 或 /查询好友请求 - 查看待处理的好友请求
-13. /addFriend 或 /加好友 或 /添加好友 或 /好友添加 - 添加好友
-14. /acceptFriend 或 /同意好友 或 /接受好友请求 - 接受好友请求
-15. /denyFriend 或 /拒绝好友请求 - 拒绝好友请求
-16. /removeFriend 或 /删除好友 或 /移除好友 - 删除好友
-17. /info 或 /机厅 或 /查卡 - 查询机厅信息
-    """
-    
-    await help.send(help_message)
-
-
-@bind.handle()
-async def handle_bind(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_bind()
-    @Description: 处理用户绑定操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 命令参数
-    """
-    qqid = str(event.get_user_id())
-    bot_token = str(arg).strip()
-
-    if not bot_token:
-        await bind.send("绑定命令后需要包含botToken。")
-        return
-    if is_already_bound(qqid):
-        await bind.send("您已经绑定过一个bot_token，无需重复绑定。")
-        return
-
-    payload = {"botToken": bot_token, "botName": plugin_config.bot_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/bot/bind', json=payload)
-
-        if response.status_code == 200:
-            response_data = response.json()
-            bot_key = response_data["botKey"]
-            bind_user(qqid, bot_token, bot_key)
-            await bind.send("绑定成功！请及时撤回您的botToken信息！")
-        else:
-            await bind.send(f"绑定失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await bind.send(f"绑定过程中出现错误：{e}")
-
-
-@unbind.handle()
-async def handle_unbind(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_unbind()
-    @Description: 处理用户解绑操作
-    @Param {MessageEvent} event: 消息事件
-    """
-    qqid = str(event.get_user_id())
-    if not is_already_bound(qqid):
-        await unbind.send("您还未绑定bot，无法解绑！")
-        return
-    bot_key = get_bot_key(qqid)
-    payload = {"botKey": bot_key}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/bot/unbind', json=payload)
-
-        if response.status_code == 200:
-            unbind_user(qqid)
-            await unbind.send("解绑成功！")
-        else:
-            await unbind.send(f"解绑失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await unbind.send(f"解绑过程中出现错误：{e}")
-
-
-@set_name.handle()
-async def handle_set_name(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_set_name()
-    @Description: 处理用户修改maimai名称操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 命令参数
-    """
-    qqid = str(event.get_user_id())
-    new_name = str(arg).strip()
-
-    if not new_name:
-        await set_name.send("修改名称命令后需要包含新的名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-    if not bot_key:
-        await set_name.send("您尚未绑定，请先使用/bind 指令绑定。")
-        return
-
-    payload = {"maimaiName": new_name}
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f'{plugin_config.api_base_url}/web/setMaimaiName', json=payload, headers=headers
-            )
-
-        if response.status_code == 200:
-            await set_name.send("名称修改成功！")
-        elif response.status_code == 400:
-            await set_name.send("修改名称失败，验证码验证失败或数据不合法。")
-        elif response.status_code == 401:
-            await set_name.send("请求的Token缺失或不合法，请检查权限。")
-        elif response.status_code == 403:
-            await set_name.send("权限不足，无法修改名称。")
-        elif response.status_code == 410:
-            await set_name.send("该用户已被封禁，请联系管理员。")
-        elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await set_name.send(f"{error_message}")
-        else:
-            await set_name.send(f"修改名称失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await set_name.send(f"修改名称过程中出现错误：{e}")
-
-
-
-@reset_name.handle()
-async def handle_reset_name(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_reset_name()
-    @Description: 处理用户重置名称操作
-    @Param {MessageEvent} event: 消息事件
-    """
-    qqid = str(event.get_user_id())
-
-    bot_key = get_bot_key(qqid)
-    if not bot_key:
-        await reset_name.send("您尚未绑定，请先使用/bind 指令绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/web/resetMaimaiName', headers=headers)
-
-        if response.status_code == 200:
-            await reset_name.send("名称重置成功！")
-        elif response.status_code == 400:
-            await reset_name.send("重置名称失败，验证码验证失败或数据不合法。")
-        elif response.status_code == 401:
-            await reset_name.send("请求的Token缺失或不合法，请检查权限。")
-        elif response.status_code == 403:
-            await reset_name.send("权限不足，无法重置名称。")
-        elif response.status_code == 410:
-            await reset_name.send("该用户已被封禁，请联系管理员。")
-        elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await reset_name.send(f"{error_message}")
-        else:
-            await reset_name.send(f"重置名称失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await reset_name.send(f"重置名称过程中出现错误：{e}")
-
-@show_name.handle()
-async def handle_show_name(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_show_name()
-    @Description: 处理用户查询当前名称操作
-    @Param {MessageEvent} event: 消息事件
-    """
-
-    qqid = str(event.get_user_id())
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await show_name.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {
-        "Authorization": f"BotKey {bot_key}"
-    }
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/web/showMaimaiName', headers=headers)
-
-            if response.status_code == 200:
-                current_name = response.text
-                await show_name.send(f"您当前的ID为：{current_name}")
-            elif response.status_code == 400:
-                await show_name.send("请求数据不合法，请检查请求。")
-            elif response.status_code == 401:
-                await show_name.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await show_name.send("权限不足，无法获取当前ID。")
-            elif response.status_code == 410:
-                await show_name.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await show_name.send(f"{error_message}")
-            else:
-                await show_name.send(f"获取ID失败，HTTP响应状态码为：{response.status_code}。")
-    except Exception as e:
-        await show_name.send(f"获取ID过程中出现错误：{e}")
-
-
-
-@set_ticket.handle()
-async def handle_set_ticket(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_set_ticket()
-    @Description: 处理用户设置锁定功能票操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 命令参数
-    """
-    qqid = str(event.get_user_id())
-    ticket_id_str = str(arg).strip()
-
-    if not ticket_id_str.isdigit():
-        await set_ticket.send("设置票的命令后需要跟一个数字作为ticketId。")
-        return
-
-    ticket_id = int(ticket_id_str)
-
-    bot_key = get_bot_key(qqid)
-    if not bot_key:
-        await set_ticket.send("您尚未绑定，请先绑定。")
-        return
-
-    payload = {"ticketId": ticket_id}
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f'{plugin_config.api_base_url}/web/setTickets', json=payload, headers=headers
-            )
-
-        if response.status_code == 200:
-            ticket_description = get_ticket_description(ticket_id)
-            await set_ticket.send(f"用户功能票成功锁定为：{ticket_description}")
-        elif response.status_code == 400:
-            await set_ticket.send("设置票失败，验证码验证失败或数据不合法。")
-        elif response.status_code == 401:
-            await set_ticket.send("请求的Token缺失或不合法，请检查权限。")
-        elif response.status_code == 403:
-            await set_ticket.send("权限不足，无法设置票。")
-        elif response.status_code == 410:
-            await set_ticket.send("该用户已被封禁，请联系管理员。")
-        elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await set_ticket.send(f"{error_message}")
-        else:
-            await set_ticket.send(f"设置票失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await set_ticket.send(f"设置票过程中出现错误：{e}")
-
-
-
-@reset_ticket.handle()
-async def handle_reset_ticket(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_reset_ticket()
-    @Description: 处理用户取消锁定功能票操作
-    @Param {MessageEvent} event: 消息事件
-    """
-    qqid = str(event.get_user_id())
-
-    bot_key = get_bot_key(qqid)
-    if not bot_key:
-        await reset_ticket.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f'{plugin_config.api_base_url}/web/resetTickets', headers=headers
-            )
-
-        if response.status_code == 200:
-            await reset_ticket.send("用户功能票取消锁定成功！")
-        elif response.status_code == 400:
-            await reset_ticket.send("取消票失败，验证码验证失败或数据不合法。")
-        elif response.status_code == 401:
-            await reset_ticket.send("请求的Token缺失或不合法，请检查权限。")
-        elif response.status_code == 403:
-            await reset_ticket.send("权限不足，无法取消票。")
-        elif response.status_code == 410:
-            await reset_ticket.send("该用户已被封禁，请联系管理员。")
-        elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await reset_ticket.send(f"{error_message}")
-        else:
-            await reset_ticket.send(f"取消票失败，HTTP响应状态码为{response.status_code}。")
-    except Exception as e:
-        await reset_ticket.send(f"取消票过程中出现错误：{e}")
-
-@show_ticket.handle()
-async def handle_show_ticket(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_show_ticket()
-    @Description: 处理用户查询当前功能票信息操作
-    @Param {MessageEvent} event: 消息事件
-    """
-
-    qqid = str(event.get_user_id())
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await show_ticket.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {
-        "Authorization": f"BotKey {bot_key}"
-    }
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/web/currentTickets', headers=headers)
-
-            if response.status_code == 200:
-                ticket_data = response.json()
-
-                turbo_ticket = ticket_data.get("turboTicket", {})
-                is_enable = turbo_ticket.get("isEnable", False)
-                ticket_id = turbo_ticket.get("ticketId", 0)
-
-                if is_enable:
-                    ticket_description = get_ticket_description(ticket_id)
-                    message = f"已启用功能票锁定，当前锁定功能票为：{ticket_description}\n"
-                else:
-                    message = "未启用功能票锁定\n"
-
-                maimai_tickets = ticket_data.get("maimaiTickets", [])
-                available_tickets = []
-
-                for ticket in maimai_tickets:
-                    stock = ticket.get("stock", 0)
-                    if stock > 0:
-                        ticket_desc = get_ticket_description(ticket.get("ticketId", 0))
-                        available_tickets.append(f"{ticket_desc}：{stock}张")
-
-                if available_tickets:
-                    message += "\n账号内功能票库存：\n" + "\n".join(available_tickets)
-
-                await show_ticket.send(message)
-            elif response.status_code == 400:
-                await show_ticket.send("请求数据不合法，请检查请求。")
-            elif response.status_code == 401:
-                await show_ticket.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await show_ticket.send("权限不足，无法获取功能票信息。")
-            elif response.status_code == 410:
-                await show_ticket.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await show_ticket.send(f"{error_message}")
-            else:
-                await show_ticket.send(f"获取功能票信息失败，HTTP响应状态码为：{response.status_code}。")
-    except Exception as e:
-        await show_ticket.send(f"获取功能票信息过程中出现错误：{e}")
-
-
-@network.handle()
-async def handle_network(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_network()
-    @Description: 处理获取网络相关信息的操作
-    @Param {Event} event: 事件信息
-    """
-
-    qqid = str(event.get_user_id())
-    bot_key = get_bot_key(qqid)
-    
-    if not bot_key:
-        await network.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {
-        "Authorization": f"BotKey {bot_key}"
-    }
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response_network = await client.get('https://api.mai-turbo.net/web/showServerRequests', headers=headers)
-
-            if response_network.status_code == 200:
-                network_data = response_network.json()
-
-                if network_data:
-                    all_requests_count = network_data.get("requestsCount", 0)
-                    exception_requests_count = network_data.get("exceptionRequestsCount", 0)
-                    zlib_skipped_requests_count = network_data.get("zlibSkippedRequestsCount", 0)
-                    retry_requests_count = network_data.get("retryRequestsCount", 0)
-                    panic_requests_count = network_data.get("panicRequestsCount", 0)
-                    exception_requests_rate = network_data.get("exceptionRequestsRate", 0)
-                    black_room_probability = 1 - (1 - exception_requests_rate / 100) ** 10
-
-                    message = (
-                        f"\n一小时内总请求数：{all_requests_count}\n"
-                        f"异常请求数：{exception_requests_count}\n"
-                        f"异常请求占比：{exception_requests_rate:.2f}%\n"
-                        f"Z-LIB 跳过数量：{zlib_skipped_requests_count}\n"
-                        f"重试请求数：{retry_requests_count}\n"
-                        f"失败请求数：{panic_requests_count}\n\n"
-                        f"10pc至少有一次小黑屋的预估概率：{black_room_probability:.2%}\n\n"
-                    )
-                    message += (
-                        "响应数据的「Z-LIB」压缩跳过率与请求重试次数可以反应当前网络情况。\n"
-                        "压缩跳过率超过「3%」时，可能会出现网络不稳定现象。\n"
-                        "请求重试率和失败率较高时，网络或服务器可能存在问题。\n"
-                        "小黑屋率为使用一小时异常率估算的数据，仅供参考。"
-                    )
-
-                    await network.send(message)
-                else:
-                    await network.send("获取网络数据失败。")
-            elif response_network.status_code == 400:
-                await network.send("请求数据不合法，请检查请求。")
-            elif response_network.status_code == 401:
-                await network.send("请求的Token缺失或不合法，请检查权限。")
-            elif response_network.status_code == 403:
-                await network.send("权限不足，无法获取网络数据。")
-            elif response_network.status_code == 410:
-                await network.send("该用户已被封禁，请联系管理员。")
-            elif response_network.status_code == 500:
-                error_message = response_network.json().get("message", "服务器内部错误")
-                await network.send(f"{error_message}")
-            else:
-                await network.send(f"获取数据失败，HTTP响应状态码为：{response_network.status_code}。")
-    except Exception as e:
-        await network.send(f"获取数据过程中出现错误：{e}")
-
-
-@show_permission.handle()
-async def handle_show_permission(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_show_permission()
-    @Description: 处理用户获取权限操作
-    @Param {MessageEvent} event: 消息事件
-    """
-    qqid = str(event.get_user_id())
-
-    bot_key = get_bot_key(qqid)
-    if not bot_key:
-        await show_permission.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/permission/showPermission', headers=headers)
-
-            if response.status_code == 200:
-                permission_text = response.text.strip().replace('"', '')
-                response_data = UserPermission(permission=permission_text)
-                permission_level = response_data.get_permission_level()
-                message = f"用户权限级别：{permission_level}\n"
-            elif response.status_code == 400:
-                await show_permission.send("请求数据不合法，请检查请求。")
-                return
-            elif response.status_code == 401:
-                await show_permission.send("请求的Token缺失或不合法，请检查权限。")
-                return
-            elif response.status_code == 403:
-                await show_permission.send("权限不足，无法获取权限信息。")
-                return
-            elif response.status_code == 410:
-                await show_permission.send("该用户已被封禁，请联系管理员。")
-                return
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await show_permission.send(f"{error_message}")
-                return
-            else:
-                await show_permission.send(f"获取权限信息失败，HTTP响应状态码为 {response.status_code}。")
-                return
-
-            response_turbo = await client.get(f'{plugin_config.api_base_url}/web/showTurboPermission', headers=headers)
-
-            if response_turbo.status_code == 200:
-                turbo_permissions = response_turbo.json()
-                if turbo_permissions:
-                    granted_permissions = []
-                    for permission in turbo_permissions:
-                        description = permission.get("permissionDescription", "未知权限")
-                        is_granted = permission.get("isGranted", False)
-                        if is_granted:
-                            description = html.unescape(description)
-                            granted_permissions.append(description)
-
-                    if granted_permissions:
-                        message += "\n已授予的详细权限：\n" + "\n".join(granted_permissions)
-                    else:
-                        message += "\n未授予任何详细权限。"
-                else:
-                    message += "\n无法获取详细权限信息。"
-            elif response_turbo.status_code == 400:
-                message += "\n请求数据不合法，请检查请求。"
-            elif response_turbo.status_code == 401:
-                message += "\n请求的Token缺失或不合法，请检查权限。"
-            elif response_turbo.status_code == 403:
-                message += "\n权限不足，无法获取详细Turbo权限信息。"
-            elif response_turbo.status_code == 410:
-                message += "\n该用户已被封禁，请联系管理员。"
-            elif response_turbo.status_code == 500:
-                error_message = response_turbo.json().get("message", "服务器内部错误")
-                message += f"\n{error_message}"
-            else:
-                message += f"\n获取详细Turbo权限失败，HTTP响应状态码为 {response_turbo.status_code}。"
-
-            await show_permission.send(message)
-
-    except Exception as e:
-        await show_permission.send(f"获取用户权限过程中出现错误：{e}")
-
-@show_friends.handle()
-async def handle_show_friends(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_show_friends()
-    @Description: 处理用户获取好友列表操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 命令参数（可选）
-    """
-
-    qqid = str(event.get_user_id())
-    bot_key = get_bot_key(qqid)
-    
-    page_str = str(arg).strip()
-    if page_str.isdigit():
-        page = int(page_str)
-    else:
-        page = 1
-
-    if not bot_key:
-        await show_friends.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/web/showFriends', params={"page": page}, headers=headers)
-
-            if response.status_code == 200:
-                friends_data = response.json()
-
-                content = friends_data.get("content", [])
-                total_elements = friends_data.get("totalElements", 0)
-                total_pages = friends_data.get("totalPages", 0)
-
-                if not content:
-                    await show_friends.send("您目前还没有添加好友。")
-                    return
-
-                friend_names = [friend["turboName"] for friend in content]
-                friend_list_message = "好友列表：\n" + "\n".join(friend_names)
-
-                message = (
-                    f"{friend_list_message}\n\n"
-                    f"共 {total_elements} 位好友，当前 {page}/{total_pages} 页。"
-                )
-
-                if total_pages > 1:
-                    message += "\n可以在命令后添加页数查看对应页数的好友。"
-
-                await show_friends.send(message)
-
-            elif response.status_code == 400:
-                await show_friends.send("请求数据不合法，请检查请求。")
-            elif response.status_code == 401:
-                await show_friends.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await show_friends.send("权限不足，无法获取好友列表。")
-            elif response.status_code == 410:
-                await show_friends.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await show_friends.send(f"{error_message}")
-            else:
-                await show_friends.send(f"获取好友列表失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await show_friends.send(f"获取好友列表过程中出现错误：{e}")
-
-@show_friend_requests.handle()
-async def handle_show_friend_requests(event: MessageEvent):
-    """
-    @Author: TurboServlet
-    @Func: handle_show_friend_requests()
-    @Description: 处理用户获取好友请求操作
-    @Param {MessageEvent} event: 消息事件
-    """
-
-    qqid = str(event.get_user_id())
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await show_friend_requests.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/web/showFriendRequests', headers=headers)
-
-            if response.status_code == 200:
-                friend_requests = response.json()
-
-                if not friend_requests:
-                    await show_friend_requests.send("当前没有待处理的好友请求。")
-                    return
-
-                requests_message = "好友请求列表：\n"
-                for request in friend_requests:
-                    turbo_name = request.get("turboName", "未知用户")
-                    request_time = request.get("requestTime", "")
-
-                    try:
-                        formatted_time = datetime.strptime(request_time, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y/%m/%d %H:%M:%S")
-                    except ValueError:
-                        formatted_time = request_time
-
-                    requests_message += f"{turbo_name} - 请求时间：{formatted_time}\n"
-
-                await show_friend_requests.send(requests_message)
-
-            elif response.status_code == 400:
-                await show_friend_requests.send("请求数据不合法，请检查请求。")
-            elif response.status_code == 401:
-                await show_friend_requests.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await show_friend_requests.send("权限不足，无法获取好友请求。")
-            elif response.status_code == 410:
-                await show_friend_requests.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await show_friend_requests.send(f"{error_message}")
-            else:
-                await show_friend_requests.send(f"获取好友请求失败，HTTP响应状态码为 {response.status_code}。")
-
-    except Exception as e:
-        await show_friend_requests.send(f"获取好友请求过程中出现错误：{e}")
-
-@add_friend.handle()
-async def handle_add_friend(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_add_friend()
-    @Description: 处理用户添加好友操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 用户输入的好友名称
-    """
-
-    qqid = str(event.get_user_id())
-    turbo_name = str(arg).strip()
-
-    if not turbo_name:
-        await add_friend.send("请提供要添加好友的名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await add_friend.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-    payload = {"turboName": turbo_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/web/addFriend', json=payload, headers=headers)
-
-            if response.status_code == 200:
-                await add_friend.send(f"好友请求已发送给：{turbo_name}")
-            elif response.status_code == 400:
-                await add_friend.send("请求数据不合法，请检查输入的好友名称。")
-            elif response.status_code == 401:
-                await add_friend.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await add_friend.send("权限不足，无法添加好友。")
-            elif response.status_code == 410:
-                await add_friend.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await add_friend.send(f"{error_message}")
-            else:
-                await add_friend.send(f"添加好友失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await add_friend.send(f"添加好友过程中出现错误：{e}")
-
-@accept_friend.handle()
-async def handle_accept_friend(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_accept_friend()
-    @Description: 处理用户接受好友请求操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 用户输入的好友名称
-    """
-
-    qqid = str(event.get_user_id())
-    turbo_name = str(arg).strip()
-
-    if not turbo_name:
-        await accept_friend.send("请提供要接受好友请求的名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await accept_friend.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-    payload = {"turboName": turbo_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/web/acceptFriend', json=payload, headers=headers)
-
-            if response.status_code == 200:
-                await accept_friend.send(f"您已接受 {turbo_name} 的好友请求。")
-            elif response.status_code == 400:
-                await accept_friend.send("请求数据不合法，请检查输入的好友名称。")
-            elif response.status_code == 401:
-                await accept_friend.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await accept_friend.send("权限不足，无法接受好友请求。")
-            elif response.status_code == 410:
-                await accept_friend.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await accept_friend.send(f"{error_message}")
-            else:
-                await accept_friend.send(f"接受好友请求失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await accept_friend.send(f"接受好友请求过程中出现错误：{e}")
-
-@deny_friend.handle()
-async def handle_deny_friend(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_deny_friend()
-    @Description: 处理用户拒绝好友请求操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 用户输入的好友名称
-    """
-
-    qqid = str(event.get_user_id())
-    turbo_name = str(arg).strip()
-
-    if not turbo_name:
-        await deny_friend.send("请提供要拒绝的好友请求的名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await deny_friend.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-    payload = {"turboName": turbo_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/web/denyFriend', json=payload, headers=headers)
-
-            if response.status_code == 200:
-                await deny_friend.send(f"您已拒绝 {turbo_name} 的好友请求。")
-            elif response.status_code == 400:
-                await deny_friend.send("请求数据不合法，请检查输入的好友名称。")
-            elif response.status_code == 401:
-                await deny_friend.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await deny_friend.send("权限不足，无法拒绝好友请求。")
-            elif response.status_code == 410:
-                await deny_friend.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await deny_friend.send(f"{error_message}")
-            else:
-                await deny_friend.send(f"拒绝好友请求失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await deny_friend.send(f"拒绝好友请求过程中出现错误：{e}")
-
-@remove_friend.handle()
-async def handle_remove_friend(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_remove_friend()
-    @Description: 处理用户删除好友操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: 用户输入的好友名称
-    """
-
-    qqid = str(event.get_user_id())
-    turbo_name = str(arg).strip()
-
-    if not turbo_name:
-        await remove_friend.send("请提供要删除的好友名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await remove_friend.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-    payload = {"turboName": turbo_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f'{plugin_config.api_base_url}/web/removeFriend', json=payload, headers=headers)
-
-            if response.status_code == 200:
-                await remove_friend.send(f"您已成功删除好友：{turbo_name}")
-            elif response.status_code == 400:
-                await remove_friend.send("请求数据不合法，请检查输入的好友名称。")
-            elif response.status_code == 401:
-                await remove_friend.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await remove_friend.send("权限不足，无法删除好友。")
-            elif response.status_code == 410:
-                await remove_friend.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await remove_friend.send(f"{error_message}")
-            else:
-                await remove_friend.send(f"删除好友失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await remove_friend.send(f"删除好友过程中出现错误：{e}")
-
-@arcade_info_detail.handle()
-async def handle_arcade_info_detail(event: MessageEvent, arg: Message = CommandArg()):
-    """
-    @Author: TurboServlet
-    @Func: handle_arcade_info_detail()
-    @Description: 处理用户获取机厅信息操作
-    @Param {MessageEvent} event: 消息事件
-    @Param {Message} arg: arcadeName 参数
-    """
-    
-    qqid = str(event.get_user_id())
-    arcade_name = str(arg).strip()
-
-    if not arcade_name:
-        await arcade_info_detail.send("请提供要查询的机厅名称。")
-        return
-
-    bot_key = get_bot_key(qqid)
-
-    if not bot_key:
-        await arcade_info_detail.send("您尚未绑定，请先绑定。")
-        return
-
-    headers = {"Authorization": f"BotKey {bot_key}"}
-    params = {"arcadeName": arcade_name}
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f'{plugin_config.api_base_url}/web/arcadeInfoDetail', params=params, headers=headers)
-
-            if response.status_code == 200:
-                arcade_data = response.json()
-
-                arcade_info = arcade_data.get("arcadeInfo", {})
-                arcade_name_display = arcade_info.get("arcadeName", "未知机厅")
-                
-                thirty_minutes_player = arcade_data.get("thirtyMinutesPlayer", 0)
-                one_hour_player = arcade_data.get("oneHourPlayer", 0)
-                two_hours_player = arcade_data.get("twoHoursPlayer", 0)
-                thirty_minutes_play_count = arcade_data.get("thirtyMinutesPlayCount", 0)
-                one_hour_play_count = arcade_data.get("oneHourPlayCount", 0)
-                two_hours_play_count = arcade_data.get("twoHoursPlayCount", 0)
-
-                player_list = arcade_data.get("playerList", [])
-                recent_players = [player.get("maimaiName", "未知玩家") for player in player_list[:6]]
-
-                arcade_requested = arcade_info.get("arcadeRequested", 0)
-                arcade_cached_request = arcade_info.get("arcadeCachedRequest", 0)
-                arcade_fixed_request = arcade_info.get("arcadeFixedRequest", 0)
-                arcade_cached_hit_rate = arcade_info.get("arcadeCachedHitRate", 0)
-
-                cache_hit_rate = (arcade_cached_hit_rate / 100) if arcade_cached_hit_rate > 0 else 0
-                error_fix_rate = (arcade_fixed_request / arcade_requested * 100) if arcade_requested > 0 else 0
-
-                message = (
-                    f"{arcade_name_display}\n\n"
-                    f"30 分钟内有 {thirty_minutes_player} 名玩家，共 {thirty_minutes_play_count} pc\n"
-                    f"1 小时内有 {one_hour_player} 名玩家，共 {one_hour_play_count} pc\n"
-                    f"2 小时内有 {two_hours_player} 名玩家，共 {two_hours_play_count} pc\n\n"
-                )
-
-                if recent_players:
-                    message += "最近游玩的 6 名玩家：\n" + "\n".join(recent_players) + "\n\n"
-                else:
-                    message += "最近游玩的 6 名玩家：无\n\n"
-
-                message += (
-                    f"在 {arcade_requested} 次网络请求中，缓存击中 {arcade_cached_request} 次，"
-                    f"修复 {arcade_fixed_request} 次错误，缓存击中率 {cache_hit_rate:.2%}，"
-                    f"缓外错误率 {error_fix_rate:.2%}"
-                )
-
-                await arcade_info_detail.send(message)
-
-            elif response.status_code == 400:
-                await arcade_info_detail.send("请求数据不合法，请检查机厅名称。")
-            elif response.status_code == 401:
-                await arcade_info_detail.send("请求的Token缺失或不合法，请检查权限。")
-            elif response.status_code == 403:
-                await arcade_info_detail.send("权限不足，无法获取机厅信息。")
-            elif response.status_code == 410:
-                await arcade_info_detail.send("该用户已被封禁，请联系管理员。")
-            elif response.status_code == 500:
-                error_message = response.json().get("message", "服务器内部错误")
-                await arcade_info_detail.send(f"{error_message}")
-            else:
-                await arcade_info_detail.send(f"获取机厅信息失败，HTTP响应状态码为 {response.status_code}。")
-    except Exception as e:
-        await arcade_info_detail.send(f"获取机厅信息过程中出现错误：{e}")
-
-
-def get_ticket_description(ticket_id: int) -> str:
-    """
-    @Author: TurboServlet
-    @Func: get_ticket_description()
-    @Description: 获取功能票的描述信息
-    @Param {int} ticket_id: 票的ID
-    @Return: str
-    """
-    ticket_descriptions = {
-        2: '付费2倍票',
-        3: '付费3倍票',
-        4: '付费4倍票',
-        5: '付费5倍票',
-        6: '付费6倍票',
-        10005: '活动5倍票 (类型1)',
-        10105: '活动5倍票 (类型2)',
-        10205: '活动5倍票 (类型3)',
-        11001: '免费1.5倍票',
-        11002: '免费2倍票',
-        11003: '免费3倍票',
-        11005: '免费5倍票',
-        30001: '特殊2倍票',
-        'default': '没有票',
-    }
-    return ticket_descriptions.get(ticket_id, ticket_descriptions['default'])
+from datetime import datetime
+import re
+import time
+
+from nonebot import (
+    get_driver,
+    logger,
+    on_message,
+)
+from nonebot.consts import CMD_ARG_KEY, CMD_KEY, PREFIX_KEY
+from nonebot.adapters.qq import (  # type: ignore
+    Bot,
+    Message,
+    MessageEvent,
+)
+from nonebot.permission import SUPERUSER
+from nonebot.plugin import PluginMetadata
+from nonebot.typing import T_State
+
+from .config import Config
+from .libraries.arcade_index import ARCADE_NOT_FOUND_STATUS_CODES, arcade_index, learn_arcade_name, refresh_arcade_index
+from .libraries.api_client import TurboApiError, format_api_error, turbo_api
+from .libraries.bulk import CONFLICT_POLICIES, BulkResult, export_bindings_file, import_bindings_file
+from .libraries.circuit_breaker import get_breaker_states
+from .libraries.commands import CommandRegistry
+from .libraries.concurrency import command_priority, request_priority, upstream_limiter
+from .libraries.db_utils import close_database, init_database
+from .libraries.friends import fetch_all_friends, prefetch_friends_page
+from .libraries.http_client import close_http_client, init_http_client
+from .libraries.metrics import (
+    COMMAND_DURATION,
+    COMMANDS_IN_FLIGHT,
+    COMMANDS_FORBIDDEN,
+    COMMANDS_RATE_LIMITED,
+    COMMANDS_SHED,
+    setup_metrics_route,
+)
+from .libraries.network_poller import (
+    get_network_snapshot,
+    start_network_poller,
+    stop_network_poller,
+    update_network_snapshot,
+)
+from .libraries.network_series import RESOLUTION_NAMES, get_network_trend, record_network_data
+from .libraries.permissions import (
+    check_command_permission,
+    get_permission_snapshot_stats,
+    refresh_permission_snapshot,
+)
+from .libraries.rate_limit import get_group_id, rate_limiter
+from .libraries.response_cache import get_response_cache_stats
+from .libraries.send_queue import outbound, reply
+from .libraries.storage import (
+    bind_user,
+    close_storage,
+    get_bot_key,
+    get_bot_key_cache_stats,
+    get_storage,
+    init_storage,
+    is_already_bound,
+    unbind_user,
+)
+from .libraries.tickets import (
+    get_ticket_catalog_stats,
+    get_ticket_description,
+    refresh_ticket_catalog,
+    start_ticket_catalog,
+    stop_ticket_catalog,
+)
+from .libraries.watch import get_watch_target, watch_scheduler
+
+plugin_config = Config()
+
+__plugin_meta__ = PluginMetadata(
+    name="turbo",
+    description="给turbo用户提供指令服务的插件",
+    usage="",
+    type="application",
+    extra={},
+)
+
+driver = get_driver()
+driver.on_startup(init_http_client)
+driver.on_startup(init_database)
+driver.on_startup(init_storage)
+driver.on_startup(refresh_arcade_index)
+driver.on_startup(start_ticket_catalog)
+driver.on_startup(start_network_poller)
+driver.on_startup(watch_scheduler.start)
+driver.on_shutdown(watch_scheduler.stop)
+driver.on_shutdown(stop_network_poller)
+driver.on_shutdown(stop_ticket_catalog)
+driver.on_shutdown(close_http_client)
+driver.on_shutdown(close_storage)
+driver.on_shutdown(close_database)
+setup_metrics_route()
+
+commands = CommandRegistry()
+
+help = commands.register('help', aliases={'帮助'}, local=True)
+set_name = commands.register('setName', aliases={'setname', '设置名称', '修改名称'}, description='设置您的名称', shown=('setName', '设置名称', '修改名称'))
+reset_name = commands.register('resetName', aliases={'resetname', '重置名称', '删除名称'}, description='重置或删除您的名称', shown=('resetName', '重置名称', '删除名称'))
+show_name = commands.register('name', aliases={'showName', '查询名称', '查看名称'}, description='查看当前名称', shown=('name', '查询名称', '查看名称'))
+set_ticket = commands.register('setTicket', aliases={'setticket', '设置票', '锁定票'}, description='锁定功能票', shown=('setTicket', '设置票', '锁定票'))
+reset_ticket = commands.register('resetTicket', aliases={'resetticket', '重置票', '取消票'}, description='重置功能票', shown=('resetTicket', '重置票', '取消票'))
+show_ticket = commands.register('ticket', aliases={'showTicket', '查询票', '查看票'}, description='查看功能票状态', shown=('ticket', '查询票', '查看票'))
+bind = commands.register('bind', aliases={'绑定'}, description='绑定您的Turbo账号', shown=('bind', '绑定'))
+unbind = commands.register('unbind', aliases={'解绑'}, description='解绑您的Turbo账号', shown=('unbind', '解绑'))
+network = commands.register('network', aliases={'网络状态', '查询网络'}, description='查看当前网络状态（加 trend 7d 查看历史趋势）', shown=('network', '网络状态', '查询网络'))
+show_permission = commands.register('showPermission', aliases={'permission', '获取权限', '展示权限', '权限', '权限查询'}, description='显示您的权限信息', shown=('showPermission', '权限查询'))
+show_friends = commands.register('showFriends', aliases={'showfriends', 'friends', 'friendslist','好友', '好友列表', '查询好友', '查看好友'}, description='查看您的好友列表（可加页数或 all）', shown=('showFriends', '好友', '好友列表', '查询好友', '查看好友'))
+show_friend_requests = commands.register('showFriendRequests', aliases={'showfriendrequests', '好友请求', '好友请求列表', '查询好友请求'}, description='查看待处理的好友请求', shown=('showFriendRequests', '好友请求', '查询好友请求'))
+add_friend = commands.register('addFriend', aliases={'addfriend', 'add', '加好友', '添加好友', '好友添加'}, description='添加好友', shown=('addFriend', '加好友', '添加好友', '好友添加'))
+accept_friend = commands.register('acceptFriend', aliases={'acceptfriend', 'accept', '同意好友', '同意好友申请', '同意好友请求', '接受好友请求'}, description='接受好友请求', shown=('acceptFriend', '同意好友', '接受好友请求'))
+deny_friend = commands.register('denyFriend', aliases={'denyfriend', 'deny', '拒绝好友', '拒绝好友请求', '拒绝好友申请'}, description='拒绝好友请求', shown=('denyFriend', '拒绝好友请求'))
+remove_friend = commands.register('removeFriend', aliases={'removefriend', 'remove', '删除好友', '移除好友'}, description='删除好友', shown=('removeFriend', '删除好友', '移除好友'))
+arcade_info_detail = commands.register('arcadeInfo', aliases={'arcadeinfo', 'info', 'arcade', '机厅', '查卡', '机厅信息'}, description='查询机厅信息', shown=('info', '机厅', '查卡'))
+watch = commands.register('watch', aliases={'关注机厅', '关注'}, description='关注机厅，人数变化时推送（不加参数查看已关注机厅）', shown=('watch', '关注机厅'))
+unwatch = commands.register('unwatch', aliases={'取消关注机厅', '取消关注'}, description='取消关注机厅', shown=('unwatch', '取消关注机厅'))
+turbo_status = commands.register('turboStatus', aliases={'turbostatus', '服务状态'}, superuser=True, local=True)
+refresh_arcades = commands.register('refreshArcades', aliases={'refresharcades', '刷新机厅'}, superuser=True)
+refresh_tickets = commands.register('refreshTickets', aliases={'refreshtickets', '刷新功能票'}, superuser=True, local=True)
+import_bindings = commands.register('importBindings', aliases={'importbindings', '导入绑定'}, superuser=True, local=True)
+export_bindings = commands.register('exportBindings', aliases={'exportbindings', '导出绑定'}, superuser=True, local=True)
+
+# 所有插件指令共用一个 matcher：NoneBot 的前缀树解析出指令后按别名表直接找到处理器，
+# 不再为每条消息逐个检查二十多个指令 matcher 的规则
+# 规则只匹配已注册的指令，与原先的 on_command 一样在处理后阻止事件继续传播给低优先级的 matcher
+dispatcher = on_message(rule=commands.rule(), priority=5, block=True)
+
+
+@dispatcher.handle()
+async def dispatch_command(bot: Bot, event: MessageEvent, state: T_State):
+    """
+    @Author: TurboServlet
+    @Func: dispatch_command()
+    @Description: 查找指令处理器，进行权限检查与用户、群组、全局限流，被限流的用户只会收到一次提示；
+                  上游请求队列已满时直接拒绝需要请求 Turbo API 的指令，已知被封禁或缺少所需权限的用户在本地拒绝；记录指令处理耗时
+    @Param {Bot} bot: 当前 Bot
+    @Param {MessageEvent} event: 消息事件
+    @Param {T_State} state: 事件状态，包含前缀树解析出的指令与参数
+    """
+    prefix = state[PREFIX_KEY]
+    spec = commands.lookup(prefix[CMD_KEY])
+    if spec is None:
+        return
+    if spec.superuser and not await SUPERUSER(bot, event):
+        return
+
+    allowed, retry_after, notify = await rate_limiter.check(spec.name, str(event.get_user_id()), get_group_id(event))
+    if not allowed:
+        COMMANDS_RATE_LIMITED.inc(spec.name)
+        if notify:
+            await reply(f"操作过于频繁，请 {max(1, int(retry_after + 0.999))} 秒后再试。")
+        return
+
+    priority = command_priority(spec.name)
+    if not spec.local and upstream_limiter.overloaded(priority):
+        COMMANDS_SHED.inc(spec.name)
+        await reply("当前请求较多，请稍后再试。")
+        return
+
+    if not spec.local:
+        rejection = await check_command_permission(spec.name, str(event.get_user_id()))
+        if rejection is not None:
+            COMMANDS_FORBIDDEN.inc(spec.name)
+            await reply(rejection)
+            return
+
+    started_at = time.perf_counter()
+    COMMANDS_IN_FLIGHT.inc(spec.name)
+    token = request_priority.set(priority)
+    try:
+        await spec.call(bot=bot, event=event, arg=prefix[CMD_ARG_KEY])
+    finally:
+        request_priority.reset(token)
+        COMMANDS_IN_FLIGHT.dec(spec.name)
+        COMMAND_DURATION.observe(spec.name, value=time.perf_counter() - started_at)
+
+
+@help.handle()
+async def handle_help(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_help()
+    @Description: 输出所有指令的帮助信息
+    @Param {MessageEvent} event: 消息事件
+    """
+    
+    await reply(commands.help_text())
+
+
+@bind.handle()
+async def handle_bind(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_bind()
+    @Description: 处理用户绑定操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 命令参数
+    """
+    qqid = str(event.get_user_id())
+    bot_token = str(arg).strip()
+
+    if not bot_token:
+        await reply("绑定命令后需要包含botToken。")
+        return
+    if await is_already_bound(qqid):
+        await reply("您已经绑定过一个bot_token，无需重复绑定。")
+        return
+
+    try:
+        bot_key = await turbo_api.bind(bot_token, plugin_config.bot_name)
+        await bind_user(qqid, bot_token, bot_key)
+        await reply("绑定成功！请及时撤回您的botToken信息！")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "绑定"))
+    except Exception as e:
+        await reply(f"绑定过程中出现错误：{e}")
+
+
+@unbind.handle()
+async def handle_unbind(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_unbind()
+    @Description: 处理用户解绑操作
+    @Param {MessageEvent} event: 消息事件
+    """
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您还未绑定bot，无法解绑！")
+        return
+
+    try:
+        await turbo_api.unbind(bot_key)
+        await unbind_user(qqid)
+        await reply("解绑成功！")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "解绑"))
+    except Exception as e:
+        await reply(f"解绑过程中出现错误：{e}")
+
+
+@set_name.handle()
+async def handle_set_name(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_set_name()
+    @Description: 处理用户修改maimai名称操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 命令参数
+    """
+    qqid = str(event.get_user_id())
+    new_name = str(arg).strip()
+
+    if not new_name:
+        await reply("修改名称命令后需要包含新的名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您尚未绑定，请先使用/bind 指令绑定。")
+        return
+
+    try:
+        await turbo_api.set_maimai_name(bot_key, new_name)
+        await reply("名称修改成功！")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "修改名称", "修改名称失败，验证码验证失败或数据不合法。"))
+    except Exception as e:
+        await reply(f"修改名称过程中出现错误：{e}")
+
+
+
+@reset_name.handle()
+async def handle_reset_name(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_reset_name()
+    @Description: 处理用户重置名称操作
+    @Param {MessageEvent} event: 消息事件
+    """
+    qqid = str(event.get_user_id())
+
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您尚未绑定，请先使用/bind 指令绑定。")
+        return
+
+    try:
+        await turbo_api.reset_maimai_name(bot_key)
+        await reply("名称重置成功！")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "重置名称", "重置名称失败，验证码验证失败或数据不合法。"))
+    except Exception as e:
+        await reply(f"重置名称过程中出现错误：{e}")
+
+@show_name.handle()
+async def handle_show_name(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_name()
+    @Description: 处理用户查询当前名称操作
+    @Param {MessageEvent} event: 消息事件
+    """
+
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        current_name = await turbo_api.show_maimai_name(bot_key)
+        await reply(f"您当前的ID为：{current_name}")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取当前ID"))
+    except Exception as e:
+        await reply(f"获取ID过程中出现错误：{e}")
+
+
+
+@set_ticket.handle()
+async def handle_set_ticket(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_set_ticket()
+    @Description: 处理用户设置锁定功能票操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 命令参数
+    """
+    qqid = str(event.get_user_id())
+    ticket_id_str = str(arg).strip()
+
+    if not ticket_id_str.isdigit():
+        await reply("设置票的命令后需要跟一个数字作为ticketId。")
+        return
+
+    ticket_id = int(ticket_id_str)
+
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.set_tickets(bot_key, ticket_id)
+        ticket_description = get_ticket_description(ticket_id)
+        await reply(f"用户功能票成功锁定为：{ticket_description}")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "设置票", "设置票失败，验证码验证失败或数据不合法。"))
+    except Exception as e:
+        await reply(f"设置票过程中出现错误：{e}")
+
+
+
+@reset_ticket.handle()
+async def handle_reset_ticket(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_reset_ticket()
+    @Description: 处理用户取消锁定功能票操作
+    @Param {MessageEvent} event: 消息事件
+    """
+    qqid = str(event.get_user_id())
+
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.reset_tickets(bot_key)
+        await reply("用户功能票取消锁定成功！")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "取消票", "取消票失败，验证码验证失败或数据不合法。"))
+    except Exception as e:
+        await reply(f"取消票过程中出现错误：{e}")
+
+@show_ticket.handle()
+async def handle_show_ticket(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_ticket()
+    @Description: 处理用户查询当前功能票信息操作
+    @Param {MessageEvent} event: 消息事件
+    """
+
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        ticket_data = await turbo_api.current_tickets(bot_key)
+
+        turbo_ticket = ticket_data.get("turboTicket", {})
+        is_enable = turbo_ticket.get("isEnable", False)
+        ticket_id = turbo_ticket.get("ticketId", 0)
+
+        if is_enable:
+            ticket_description = get_ticket_description(ticket_id)
+            message = f"已启用功能票锁定，当前锁定功能票为：{ticket_description}\n"
+        else:
+            message = "未启用功能票锁定\n"
+
+        maimai_tickets = ticket_data.get("maimaiTickets", [])
+        available_tickets = []
+
+        for ticket in maimai_tickets:
+            stock = ticket.get("stock", 0)
+            if stock > 0:
+                ticket_desc = get_ticket_description(ticket.get("ticketId", 0))
+                available_tickets.append(f"{ticket_desc}：{stock}张")
+
+        if available_tickets:
+            message += "\n账号内功能票库存：\n" + "\n".join(available_tickets)
+
+        await reply(message)
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取功能票信息"))
+    except Exception as e:
+        await reply(f"获取功能票信息过程中出现错误：{e}")
+
+
+@network.handle()
+async def handle_network(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_network()
+    @Description: 处理获取网络相关信息的操作，优先使用后台轮询的快照；参数为 trend 时展示历史趋势
+    @Param {Event} event: 事件信息
+    @Param {Message} arg: 可选的 trend 与时间窗口参数，如 trend 7d
+    """
+
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+    
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    args = str(arg).strip().split()
+    if args and args[0].lower() in ("trend", "趋势"):
+        await handle_network_trend(args[1] if len(args) > 1 else "24h")
+        return
+
+    snapshot = get_network_snapshot()
+    if snapshot is not None:
+        network_data, snapshot_age = snapshot
+        await reply(format_network_message(network_data, snapshot_age))
+        return
+
+    try:
+        network_data = await turbo_api.show_server_requests(bot_key)
+
+        if not network_data:
+            await reply("获取网络数据失败。")
+            return
+        update_network_snapshot(network_data)
+        await reply(format_network_message(network_data, 0))
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取网络数据"))
+        return
+    except Exception as e:
+        await reply(f"获取数据过程中出现错误：{e}")
+        return
+
+    # 回复已经发出，记录历史数据失败时只记日志，不再向用户发送错误
+    try:
+        await record_network_data(network_data)
+    except Exception as e:
+        logger.warning(f"记录网络统计历史数据失败：{e!r}")
+
+
+async def handle_network_trend(window_text: str):
+    """
+    @Author: TurboServlet
+    @Func: handle_network_trend()
+    @Description: 展示时间窗口内异常请求占比与 Z-LIB 跳过数量的分位数与移动平均
+    @Param {str} window_text: 时间窗口，如 6h、7d，不带单位时按小时计算
+    """
+    match = re.fullmatch(r"(\d+)\s*(h|d|小时|天)?", window_text.lower())
+    if not match or int(match.group(1)) <= 0:
+        await reply("时间范围格式不正确，请使用如 24h 或 7d 的格式。")
+        return
+
+    amount = int(match.group(1))
+    in_days = match.group(2) in ("d", "天")
+    window = amount * (86400 if in_days else 3600)
+
+    try:
+        trend = await get_network_trend(window)
+    except Exception as e:
+        await reply(f"获取网络趋势过程中出现错误：{e}")
+        return
+
+    if trend is None:
+        await reply("暂无网络统计历史数据。")
+        return
+
+    resolution, points, stats = trend
+    await reply(format_network_trend_message(f"{amount} {'天' if in_days else '小时'}", resolution, points, stats))
+
+
+@show_permission.handle()
+async def handle_show_permission(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_permission()
+    @Description: 处理用户获取权限操作
+    @Param {MessageEvent} event: 消息事件
+    """
+    qqid = str(event.get_user_id())
+
+    bot_key = await get_bot_key(qqid)
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        snapshot, turbo_error = await refresh_permission_snapshot(bot_key)
+        permission_level = snapshot.permission.get_permission_level()
+        message = f"用户权限级别：{permission_level}\n"
+
+        if isinstance(turbo_error, TurboApiError):
+            message += "\n" + format_api_error(turbo_error, "获取详细Turbo权限信息")
+        elif turbo_error is not None or not snapshot.permissions:
+            message += "\n无法获取详细权限信息。"
+        else:
+            granted_permissions = snapshot.granted()
+            if granted_permissions:
+                message += "\n已授予的详细权限：\n" + "\n".join(granted_permissions)
+            else:
+                message += "\n未授予任何详细权限。"
+
+        await reply(message)
+
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取权限信息"))
+    except Exception as e:
+        await reply(f"获取用户权限过程中出现错误：{e}")
+
+@show_friends.handle()
+async def handle_show_friends(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_friends()
+    @Description: 处理用户获取好友列表操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 命令参数（可选）
+    """
+
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+    
+    page_str = str(arg).strip()
+    if page_str.isdigit():
+        page = int(page_str)
+    else:
+        page = 1
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    if page_str.lower() in ('all', '全部'):
+        await handle_show_all_friends(bot_key)
+        return
+
+    try:
+        friends_data = await turbo_api.show_friends(bot_key, page)
+
+        content = friends_data.get("content", [])
+        total_elements = friends_data.get("totalElements", 0)
+        total_pages = friends_data.get("totalPages", 0)
+
+        if not content:
+            await reply("您目前还没有添加好友。")
+            return
+
+        friend_names = [friend["turboName"] for friend in content]
+        friend_list_message = "好友列表：\n" + "\n".join(friend_names)
+
+        message = (
+            f"{friend_list_message}\n\n"
+            f"共 {total_elements} 位好友，当前 {page}/{total_pages} 页。"
+        )
+
+        if total_pages > 1:
+            message += "\n可以在命令后添加页数查看对应页数的好友，或添加 all 查看全部好友。"
+
+        if page < total_pages:
+            prefetch_friends_page(bot_key, page + 1)
+
+        await reply(message)
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取好友列表"))
+    except Exception as e:
+        await reply(f"获取好友列表过程中出现错误：{e}")
+
+async def handle_show_all_friends(bot_key: str):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_all_friends()
+    @Description: 并发获取全部好友页面，合并后分段回复
+    @Param {str} bot_key: 用户的bot_key
+    """
+    try:
+        friends, total_elements, failed_pages = await fetch_all_friends(bot_key)
+
+        if not friends:
+            await reply("您目前还没有添加好友。")
+            return
+
+        friend_names = [friend["turboName"] for friend in friends]
+        chunk_size = max(1, plugin_config.friends_chunk_size)
+        chunks = [friend_names[i:i + chunk_size] for i in range(0, len(friend_names), chunk_size)]
+
+        for index, chunk in enumerate(chunks, start=1):
+            message = f"好友列表（{index}/{len(chunks)}）：\n" + "\n".join(chunk)
+            if index == len(chunks):
+                message += f"\n\n共 {total_elements} 位好友。"
+                if failed_pages:
+                    message += f"\n第 {'、'.join(map(str, failed_pages))} 页获取失败，可稍后单独查看。"
+            await reply(message)
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取好友列表"))
+    except Exception as e:
+        await reply(f"获取好友列表过程中出现错误：{e}")
+
+@show_friend_requests.handle()
+async def handle_show_friend_requests(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_show_friend_requests()
+    @Description: 处理用户获取好友请求操作
+    @Param {MessageEvent} event: 消息事件
+    """
+
+    qqid = str(event.get_user_id())
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        friend_requests = await turbo_api.show_friend_requests(bot_key)
+
+        if not friend_requests:
+            await reply("当前没有待处理的好友请求。")
+            return
+
+        requests_message = "好友请求列表：\n"
+        for request in friend_requests:
+            turbo_name = request.get("turboName", "未知用户")
+            request_time = request.get("requestTime", "")
+
+            try:
+                formatted_time = datetime.strptime(request_time, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y/%m/%d %H:%M:%S")
+            except ValueError:
+                formatted_time = request_time
+
+            requests_message += f"{turbo_name} - 请求时间：{formatted_time}\n"
+
+        await reply(requests_message)
+    except TurboApiError as e:
+        await reply(format_api_error(e, "获取好友请求"))
+    except Exception as e:
+        await reply(f"获取好友请求过程中出现错误：{e}")
+
+@add_friend.handle()
+async def handle_add_friend(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_add_friend()
+    @Description: 处理用户添加好友操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 用户输入的好友名称
+    """
+
+    qqid = str(event.get_user_id())
+    turbo_name = str(arg).strip()
+
+    if not turbo_name:
+        await reply("请提供要添加好友的名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.add_friend(bot_key, turbo_name)
+        await reply(f"好友请求已发送给：{turbo_name}")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "添加好友", "请求数据不合法，请检查输入的好友名称。"))
+    except Exception as e:
+        await reply(f"添加好友过程中出现错误：{e}")
+
+@accept_friend.handle()
+async def handle_accept_friend(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_accept_friend()
+    @Description: 处理用户接受好友请求操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 用户输入的好友名称
+    """
+
+    qqid = str(event.get_user_id())
+    turbo_name = str(arg).strip()
+
+    if not turbo_name:
+        await reply("请提供要接受好友请求的名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.accept_friend(bot_key, turbo_name)
+        await reply(f"您已接受 {turbo_name} 的好友请求。")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "接受好友请求", "请求数据不合法，请检查输入的好友名称。"))
+    except Exception as e:
+        await reply(f"接受好友请求过程中出现错误：{e}")
+
+@deny_friend.handle()
+async def handle_deny_friend(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_deny_friend()
+    @Description: 处理用户拒绝好友请求操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 用户输入的好友名称
+    """
+
+    qqid = str(event.get_user_id())
+    turbo_name = str(arg).strip()
+
+    if not turbo_name:
+        await reply("请提供要拒绝的好友请求的名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.deny_friend(bot_key, turbo_name)
+        await reply(f"您已拒绝 {turbo_name} 的好友请求。")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "拒绝好友请求", "请求数据不合法，请检查输入的好友名称。"))
+    except Exception as e:
+        await reply(f"拒绝好友请求过程中出现错误：{e}")
+
+@remove_friend.handle()
+async def handle_remove_friend(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_remove_friend()
+    @Description: 处理用户删除好友操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: 用户输入的好友名称
+    """
+
+    qqid = str(event.get_user_id())
+    turbo_name = str(arg).strip()
+
+    if not turbo_name:
+        await reply("请提供要删除的好友名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    try:
+        await turbo_api.remove_friend(bot_key, turbo_name)
+        await reply(f"您已成功删除好友：{turbo_name}")
+    except TurboApiError as e:
+        await reply(format_api_error(e, "删除好友", "请求数据不合法，请检查输入的好友名称。"))
+    except Exception as e:
+        await reply(f"删除好友过程中出现错误：{e}")
+
+@arcade_info_detail.handle()
+async def handle_arcade_info_detail(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_arcade_info_detail()
+    @Description: 处理用户获取机厅信息操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: arcadeName 参数
+    """
+    
+    qqid = str(event.get_user_id())
+    arcade_name = str(arg).strip()
+
+    if not arcade_name:
+        await reply("请提供要查询的机厅名称。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    resolved_name, suggestions = arcade_index.resolve(arcade_name)
+    arcade_name = resolved_name or arcade_name
+
+    try:
+        arcade_data = await turbo_api.arcade_info_detail(bot_key, arcade_name)
+
+        arcade_info = arcade_data.get("arcadeInfo", {})
+        arcade_name_display = arcade_info.get("arcadeName", "未知机厅")
+        if "arcadeName" in arcade_info:
+            await learn_arcade_name(arcade_name_display)
+        
+        thirty_minutes_player = arcade_data.get("thirtyMinutesPlayer", 0)
+        one_hour_player = arcade_data.get("oneHourPlayer", 0)
+        two_hours_player = arcade_data.get("twoHoursPlayer", 0)
+        thirty_minutes_play_count = arcade_data.get("thirtyMinutesPlayCount", 0)
+        one_hour_play_count = arcade_data.get("oneHourPlayCount", 0)
+        two_hours_play_count = arcade_data.get("twoHoursPlayCount", 0)
+
+        player_list = arcade_data.get("playerList", [])
+        recent_players = [player.get("maimaiName", "未知玩家") for player in player_list[:6]]
+
+        arcade_requested = arcade_info.get("arcadeRequested", 0)
+        arcade_cached_request = arcade_info.get("arcadeCachedRequest", 0)
+        arcade_fixed_request = arcade_info.get("arcadeFixedRequest", 0)
+        arcade_cached_hit_rate = arcade_info.get("arcadeCachedHitRate", 0)
+
+        cache_hit_rate = (arcade_cached_hit_rate / 100) if arcade_cached_hit_rate > 0 else 0
+        error_fix_rate = (arcade_fixed_request / arcade_requested * 100) if arcade_requested > 0 else 0
+
+        message = (
+            f"{arcade_name_display}\n\n"
+            f"30 分钟内有 {thirty_minutes_player} 名玩家，共 {thirty_minutes_play_count} pc\n"
+            f"1 小时内有 {one_hour_player} 名玩家，共 {one_hour_play_count} pc\n"
+            f"2 小时内有 {two_hours_player} 名玩家，共 {two_hours_play_count} pc\n\n"
+        )
+
+        if recent_players:
+            message += "最近游玩的 6 名玩家：\n" + "\n".join(recent_players) + "\n\n"
+        else:
+            message += "最近游玩的 6 名玩家：无\n\n"
+
+        message += (
+            f"在 {arcade_requested} 次网络请求中，缓存击中 {arcade_cached_request} 次，"
+            f"修复 {arcade_fixed_request} 次错误，缓存击中率 {cache_hit_rate:.2%}，"
+            f"缓外错误率 {error_fix_rate:.2%}"
+        )
+
+        await reply(message)
+    except TurboApiError as e:
+        if suggestions and e.status_code in ARCADE_NOT_FOUND_STATUS_CODES:
+            # 上游也找不到时才给出索引中的候选建议
+            await reply(f"未找到机厅「{arcade_name}」，您是否要查询：\n" + "\n".join(suggestions))
+        else:
+            await reply(format_api_error(e, "获取机厅信息", "请求数据不合法，请检查机厅名称。"))
+    except Exception as e:
+        await reply(f"获取机厅信息过程中出现错误：{e}")
+
+
+@watch.handle()
+async def handle_watch(bot: Bot, event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_watch()
+    @Description: 处理用户关注机厅操作，不带参数时列出当前会话已关注的机厅
+    @Param {Bot} bot: 当前 Bot
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: arcadeName 参数
+    """
+
+    qqid = str(event.get_user_id())
+    arcade_name = str(arg).strip()
+    target = get_watch_target(event)
+
+    if not arcade_name:
+        watched = watch_scheduler.watched_by(target)
+        if watched:
+            await reply("当前已关注的机厅：\n" + "\n".join(watched))
+        else:
+            await reply("当前没有关注任何机厅，请使用 /watch 机厅名称 进行关注。")
+        return
+
+    bot_key = await get_bot_key(qqid)
+
+    if not bot_key:
+        await reply("您尚未绑定，请先绑定。")
+        return
+
+    resolved_name, suggestions = arcade_index.resolve(arcade_name)
+    arcade_name = resolved_name or arcade_name
+
+    watched = watch_scheduler.watched_by(target)
+    if arcade_name not in watched and len(watched) >= plugin_config.watch_max_per_target:
+        await reply(f"最多只能关注 {plugin_config.watch_max_per_target} 个机厅，请先取消关注其他机厅。")
+        return
+
+    try:
+        arcade_data = await turbo_api.arcade_info_detail(bot_key, arcade_name)
+        arcade_info = arcade_data.get("arcadeInfo", {})
+        if "arcadeName" in arcade_info:
+            arcade_name = arcade_info["arcadeName"]
+            await learn_arcade_name(arcade_name)
+
+        await watch_scheduler.subscribe(arcade_name, target, bot.self_id, qqid, arcade_data)
+        await reply(f"已关注机厅「{arcade_name}」，玩家人数或玩家变化时会在这里推送。")
+    except TurboApiError as e:
+        if suggestions and e.status_code in ARCADE_NOT_FOUND_STATUS_CODES:
+            # 上游也找不到时才给出索引中的候选建议
+            await reply(f"未找到机厅「{arcade_name}」，您是否要关注：\n" + "\n".join(suggestions))
+        else:
+            await reply(format_api_error(e, "关注机厅", "请求数据不合法，请检查机厅名称。"))
+    except Exception as e:
+        await reply(f"关注机厅过程中出现错误：{e}")
+
+
+@unwatch.handle()
+async def handle_unwatch(event: MessageEvent, arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_unwatch()
+    @Description: 处理用户取消关注机厅操作
+    @Param {MessageEvent} event: 消息事件
+    @Param {Message} arg: arcadeName 参数
+    """
+
+    arcade_name = str(arg).strip()
+    target = get_watch_target(event)
+
+    if not arcade_name:
+        await reply("请提供要取消关注的机厅名称。")
+        return
+
+    watched = watch_scheduler.watched_by(target)
+    if arcade_name not in watched:
+        resolved_name, _ = arcade_index.resolve(arcade_name)
+        arcade_name = resolved_name or arcade_name
+
+    try:
+        if await watch_scheduler.unsubscribe(arcade_name, target):
+            await reply(f"已取消关注机厅「{arcade_name}」。")
+        else:
+            await reply(f"当前没有关注机厅「{arcade_name}」。")
+    except Exception as e:
+        await reply(f"取消关注机厅过程中出现错误：{e}")
+
+
+@turbo_status.handle()
+async def handle_turbo_status(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_turbo_status()
+    @Description: 向超级用户展示熔断器与缓存状态
+    @Param {MessageEvent} event: 消息事件
+    """
+    state_names = {"closed": "正常", "open": "熔断中", "half_open": "探测中"}
+
+    breaker_lines = []
+    for group, state in get_breaker_states().items():
+        line = f"{group}：{state_names.get(state['state'], state['state'])}，连续失败 {state['consecutive_failures']} 次，已拒绝 {state['rejected']} 次"
+        if state["retry_after"] is not None:
+            line += f"，{state['retry_after']:.0f} 秒后探测"
+        breaker_lines.append(line)
+
+    bot_key_stats = get_bot_key_cache_stats()
+    response_stats = get_response_cache_stats()
+    watch_stats = watch_scheduler.stats()
+    ticket_stats = get_ticket_catalog_stats()
+    limiter_stats = upstream_limiter.stats()
+    permission_stats = get_permission_snapshot_stats()
+
+    message = "熔断器状态：\n" + ("\n".join(breaker_lines) if breaker_lines else "暂无请求记录")
+    message += (
+        f"\n\n存储后端：{get_storage().name}"
+        f"\nbot_key 缓存：{bot_key_stats['size']}/{bot_key_stats['maxsize']}，命中率 {bot_key_stats['hit_rate']:.2%}"
+        f"\n权限快照：{permission_stats['size']}/{permission_stats['maxsize']}，命中率 {permission_stats['hit_rate']:.2%}"
+        f"\n响应缓存：{response_stats['size']}/{response_stats['maxsize']}，命中率 {response_stats['hit_rate']:.2%}，"
+        f"进行中 {response_stats['in_flight']} 个，条件请求未变化 {response_stats['not_modified'] + response_stats['unchanged']} 次"
+        f"\n上游并发：上限 {limiter_stats['limit']:.1f}，进行中 {limiter_stats['in_flight']}，排队 {limiter_stats['queued']}，"
+        f"已拒绝 {limiter_stats['shed']}，平均延迟 {limiter_stats['latency'] * 1000:.0f}ms（基准 {limiter_stats['baseline'] * 1000:.0f}ms）"
+        f"\n待发送消息：{outbound.pending()} 条"
+        f"\n机厅关注：{watch_stats['arcades']} 个机厅，{watch_stats['subscriptions']} 个关注"
+        f"\n功能票目录：版本 {ticket_stats['version']}，{ticket_stats['size']} 种功能票"
+    )
+    await reply(message)
+
+
+@refresh_arcades.handle()
+async def handle_refresh_arcades(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_refresh_arcades()
+    @Description: 从数据库与种子文件重建本地机厅索引
+    @Param {MessageEvent} event: 消息事件
+    """
+    try:
+        count = await refresh_arcade_index()
+        await reply(f"机厅索引已刷新，共 {count} 个机厅。")
+    except Exception as e:
+        await reply(f"刷新机厅索引过程中出现错误：{e}")
+
+
+@refresh_tickets.handle()
+async def handle_refresh_tickets(event: MessageEvent):
+    """
+    @Author: TurboServlet
+    @Func: handle_refresh_tickets()
+    @Description: 立即从数据源刷新功能票目录
+    @Param {MessageEvent} event: 消息事件
+    """
+    if not plugin_config.ticket_catalog_source:
+        await reply("未配置功能票目录数据源（TICKET_CATALOG_SOURCE），当前使用内置目录。")
+        return
+    try:
+        version, count, updated = await refresh_ticket_catalog()
+        if updated:
+            await reply(f"功能票目录已更新到版本 {version}，共 {count} 种功能票。")
+        else:
+            await reply(f"功能票目录已是最新版本 {version}，共 {count} 种功能票。")
+    except Exception as e:
+        await reply(f"刷新功能票目录过程中出现错误：{e}")
+
+
+def progress_reporter(action: str):
+    """
+    @Author: TurboServlet
+    @Func: progress_reporter()
+    @Description: 生成批量导入导出的进度回调，每隔 bulk_progress_interval 秒最多回复一次
+    @Param {str} action: 操作名称，如“导入”
+    @Return: 进度回调
+    """
+    last_report = time.monotonic()
+
+    async def report(result: BulkResult):
+        nonlocal last_report
+        if time.monotonic() - last_report < plugin_config.bulk_progress_interval:
+            return
+        last_report = time.monotonic()
+        await reply(f"正在{action}：已处理 {result.processed} 条，用时 {result.elapsed:.0f} 秒。")
+
+    return report
+
+
+@import_bindings.handle()
+async def handle_import_bindings(arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_import_bindings()
+    @Description: 从机器人所在主机上的 CSV / JSONL 文件批量导入绑定记录
+    @Param {Message} arg: 文件路径与可选的冲突处理方式（skip / overwrite / report，默认 skip）
+    """
+    text = str(arg).strip()
+    path, _, policy = text.rpartition(" ")
+    if policy not in CONFLICT_POLICIES:
+        path, policy = text, "skip"
+    path = path.strip()
+    if not path:
+        await reply("请提供要导入的文件路径，可在路径后加 skip、overwrite 或 report 指定冲突处理方式。")
+        return
+
+    try:
+        result = await import_bindings_file(path, policy, progress_reporter("导入"))
+    except Exception as e:
+        await reply(f"导入绑定过程中出现错误：{e}")
+        return
+
+    message = (
+        f"导入完成，用时 {result.elapsed:.1f} 秒：共 {result.processed} 条，"
+        f"新增 {result.inserted} 条，覆盖 {result.updated} 条，跳过 {result.skipped} 条。"
+    )
+    if result.conflict_count:
+        message += f"\n{result.conflict_count} 条记录与已有绑定冲突，未写入：{'、'.join(result.conflicts)}"
+        if result.conflict_count > len(result.conflicts):
+            message += " 等"
+    if result.invalid_count:
+        message += f"\n{result.invalid_count} 行缺少 QQID 或 bot_key 或格式错误，所在行：{'、'.join(map(str, result.invalid_lines))}"
+        if result.invalid_count > len(result.invalid_lines):
+            message += " 等"
+    await reply(message)
+
+
+@export_bindings.handle()
+async def handle_export_bindings(arg: Message):
+    """
+    @Author: TurboServlet
+    @Func: handle_export_bindings()
+    @Description: 将全部绑定记录导出到机器人所在主机上的 CSV / JSONL 文件
+    @Param {Message} arg: 文件路径，扩展名为 .jsonl 时导出 JSONL，否则导出 CSV
+    """
+    path = str(arg).strip()
+    if not path:
+        await reply("请提供导出文件路径。")
+        return
+
+    try:
+        result = await export_bindings_file(path, progress_reporter("导出"))
+        await reply(f"导出完成，共 {result.processed} 条绑定记录，用时 {result.elapsed:.1f} 秒。")
+    except Exception as e:
+        await reply(f"导出绑定过程中出现错误：{e}")
+
+
+def format_network_message(network_data: dict, snapshot_age: float) -> str:
+    """
+    @Author: TurboServlet
+    @Func: format_network_message()
+    @Description: 将网络统计数据格式化为回复消息
+    @Param {dict} network_data: /web/showServerRequests 的响应数据
+    @Param {float} snapshot_age: 数据距今的秒数
+    @Return: str
+    """
+    all_requests_count = network_data.get("requestsCount", 0)
+    exception_requests_count = network_data.get("exceptionRequestsCount", 0)
+    zlib_skipped_requests_count = network_data.get("zlibSkippedRequestsCount", 0)
+    retry_requests_count = network_data.get("retryRequestsCount", 0)
+    panic_requests_count = network_data.get("panicRequestsCount", 0)
+    exception_requests_rate = network_data.get("exceptionRequestsRate", 0)
+    black_room_probability = 1 - (1 - exception_requests_rate / 100) ** 10
+
+    message = (
+        f"\n一小时内总请求数：{all_requests_count}\n"
+        f"异常请求数：{exception_requests_count}\n"
+        f"异常请求占比：{exception_requests_rate:.2f}%\n"
+        f"Z-LIB 跳过数量：{zlib_skipped_requests_count}\n"
+        f"重试请求数：{retry_requests_count}\n"
+        f"失败请求数：{panic_requests_count}\n\n"
+        f"10pc至少有一次小黑屋的预估概率：{black_room_probability:.2%}\n\n"
+    )
+    message += (
+        "响应数据的「Z-LIB」压缩跳过率与请求重试次数可以反应当前网络情况。\n"
+        "压缩跳过率超过「3%」时，可能会出现网络不稳定现象。\n"
+        "请求重试率和失败率较高时，网络或服务器可能存在问题。\n"
+        "小黑屋率为使用一小时异常率估算的数据，仅供参考。\n\n"
+        f"数据更新于 {int(snapshot_age)} 秒前。"
+    )
+    return message
+
+
+def format_network_trend_message(window_name: str, resolution: int, points: int, stats: dict) -> str:
+    """
+    @Author: TurboServlet
+    @Func: format_network_trend_message()
+    @Description: 将网络趋势统计格式化为回复消息
+    @Param {str} window_name: 时间窗口名称
+    @Param {int} resolution: 聚合粒度（秒）
+    @Param {int} points: 数据点数
+    @Param {dict} stats: get_network_trend 返回的统计结果
+    @Return: str
+    """
+    moving_window = plugin_config.network_trend_moving_average
+    resolution_name = RESOLUTION_NAMES.get(resolution, f"{resolution} 秒")
+
+    def trend_arrow(summary: dict) -> str:
+        if summary["moving_average"] > summary["mean"] * 1.1:
+            return "↑"
+        if summary["moving_average"] < summary["mean"] * 0.9:
+            return "↓"
+        return "→"
+
+    exception_stats = stats["exceptionRequestsRate"]
+    zlib_stats = stats["zlibSkippedRequestsCount"]
+    exception_percentiles = exception_stats["percentiles"]
+    zlib_percentiles = zlib_stats["percentiles"]
+    black_room_probability = 1 - (1 - exception_stats["moving_average"] / 100) ** 10
+
+    return (
+        f"\n近 {window_name}网络趋势（按{resolution_name}聚合，共 {points} 个数据点）\n\n"
+        f"异常请求占比：\n"
+        f"P50 {exception_percentiles[50]:.2f}% / P90 {exception_percentiles[90]:.2f}% / P99 {exception_percentiles[99]:.2f}%\n"
+        f"平均 {exception_stats['mean']:.2f}%，最近 {moving_window} 点移动平均 {exception_stats['moving_average']:.2f}% {trend_arrow(exception_stats)}，"
+        f"移动平均峰值 {exception_stats['moving_average_max']:.2f}%\n\n"
+        f"Z-LIB 跳过数量：\n"
+        f"P50 {zlib_percentiles[50]:.1f} / P90 {zlib_percentiles[90]:.1f} / P99 {zlib_percentiles[99]:.1f}\n"
+        f"平均 {zlib_stats['mean']:.1f}，最近 {moving_window} 点移动平均 {zlib_stats['moving_average']:.1f} {trend_arrow(zlib_stats)}，"
+        f"移动平均峰值 {zlib_stats['moving_average_max']:.1f}\n\n"
+        f"按最近移动平均异常率估算，10pc至少有一次小黑屋的概率：{black_room_probability:.2%}"
+    )
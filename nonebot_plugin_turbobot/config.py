@@ -1,7 +1,131 @@
-from pydantic_settings import BaseSettings
-from pydantic import Field, field_validator
-
-class Config(BaseSettings):
-    database_path: str = Field(default='src/plugins/nonebot_plugin_turbobot/database/botKey.db')
-    api_base_url: str = Field(default='https://api.mai-turbo.net')
-    bot_name: str = Field(default="Turbobot")
+from typing import Dict, List, Optional
+
+from pydantic_settings import BaseSettings
+from pydantic import Field, field_validator, model_validator
+
+class Config(BaseSettings):
+    database_path: str = Field(default='src/plugins/nonebot_plugin_turbobot/database/botKey.db')
+    api_base_url: str = Field(default='https://api.mai-turbo.net')
+    bot_name: str = Field(default="Turbobot")
+
+    http2_enabled: bool = Field(default=False)
+    http_max_connections: int = Field(default=100)
+    http_max_keepalive_connections: int = Field(default=20)
+    http_keepalive_expiry: float = Field(default=30.0)
+
+    database_busy_timeout: float = Field(default=5.0)
+    database_cached_statements: int = Field(default=64)
+    database_maintenance_interval: float = Field(default=3600.0)
+    database_analysis_limit: int = Field(default=1000)
+    database_vacuum_pages: int = Field(default=1024)
+
+    bot_key_cache_size: int = Field(default=10000)
+
+    storage_backend: str = Field(default="sqlite")
+    storage_url: str = Field(default="redis://127.0.0.1:6379/0")
+    storage_key_prefix: str = Field(default="turbobot")
+
+    permission_snapshot_ttl: float = Field(default=300.0)
+    permission_snapshot_size: int = Field(default=10000)
+    command_required_permissions: Dict[str, str] = Field(default_factory=dict)
+
+    response_cache_size: int = Field(default=2048)
+    response_store_size: int = Field(default=4096)
+    conditional_requests_enabled: bool = Field(default=True)
+    cache_ttl_server_requests: float = Field(default=30.0)
+    cache_ttl_arcade_info: float = Field(default=15.0)
+    cache_ttl_turbo_permission: float = Field(default=300.0)
+    cache_ttl_friends: float = Field(default=30.0)
+    cache_ttl_current_tickets: float = Field(default=10.0)
+
+    network_service_bot_key: Optional[str] = Field(default=None)
+    network_poll_interval: float = Field(default=60.0)
+    network_stale_after: float = Field(default=180.0)
+
+    fanout_timeout: float = Field(default=10.0)
+
+    api_connect_timeout: float = Field(default=3.0)
+    api_read_timeout: float = Field(default=10.0)
+    api_endpoint_timeouts: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    api_max_retries: int = Field(default=2)
+    api_retry_backoff_base: float = Field(default=0.2)
+    api_retry_backoff_max: float = Field(default=2.0)
+    api_retry_budget_ratio: float = Field(default=0.1)
+    api_retry_budget_capacity: float = Field(default=10.0)
+
+    upstream_limit_enabled: bool = Field(default=True)
+    upstream_limit_initial: float = Field(default=20.0)
+    upstream_limit_min: float = Field(default=4.0)
+    upstream_limit_max: float = Field(default=100.0)
+    upstream_queue_size: int = Field(default=200)
+    upstream_latency_tolerance: float = Field(default=2.0)
+    upstream_limit_backoff: float = Field(default=0.9)
+    upstream_command_priorities: Dict[str, int] = Field(
+        default_factory=lambda: {"showPermission": 1, "showFriends": 1, "network": 1}
+    )
+
+    hedge_enabled: bool = Field(default=False)
+    hedge_endpoints: List[str] = Field(default_factory=lambda: ['/web/arcadeInfoDetail', '/web/currentTickets'])
+    hedge_percentile: float = Field(default=0.95)
+    hedge_min_samples: int = Field(default=20)
+    hedge_min_delay: float = Field(default=0.01)
+    hedge_budget_ratio: float = Field(default=0.05)
+    hedge_budget_capacity: float = Field(default=10.0)
+
+    breaker_failure_threshold: int = Field(default=5)
+    breaker_recovery_timeout: float = Field(default=30.0)
+    breaker_half_open_max_calls: int = Field(default=1)
+
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limit_user_rate: float = Field(default=0.2, gt=0)
+    rate_limit_user_capacity: float = Field(default=5.0, gt=0)
+    rate_limit_group_rate: float = Field(default=1.0, gt=0)
+    rate_limit_group_capacity: float = Field(default=20.0, gt=0)
+    rate_limit_global_rate: float = Field(default=10.0, gt=0)
+    rate_limit_global_capacity: float = Field(default=50.0, gt=0)
+    rate_limit_max_tracked: int = Field(default=10000)
+    rate_limit_command_costs: Dict[str, float] = Field(
+        default_factory=lambda: {"help": 0.5, "showPermission": 2.0, "showFriends": 2.0}
+    )
+
+    send_rate_per_channel: float = Field(default=1.0, gt=0)
+    send_burst: float = Field(default=5.0, ge=1)
+    send_merge_enabled: bool = Field(default=True)
+    send_merge_max_length: int = Field(default=1500)
+    send_max_retries: int = Field(default=3)
+    send_retry_backoff: float = Field(default=0.5)
+
+    friends_prefetch_enabled: bool = Field(default=True)
+    friends_fetch_concurrency: int = Field(default=4)
+    friends_chunk_size: int = Field(default=50)
+
+    arcade_index_seed_path: Optional[str] = Field(default=None)
+    arcade_index_fuzzy_candidates: int = Field(default=50)
+
+    watch_poll_interval: float = Field(default=60.0)
+    watch_max_per_target: int = Field(default=10)
+    watch_min_player_delta: int = Field(default=1)
+
+    network_minute_retention_days: float = Field(default=2.0)
+    network_hour_retention_days: float = Field(default=60.0)
+    network_day_retention_days: float = Field(default=730.0)
+    network_trend_moving_average: int = Field(default=12)
+
+    bulk_batch_size: int = Field(default=5000)
+    bulk_progress_interval: float = Field(default=10.0)
+
+    ticket_catalog_source: Optional[str] = Field(default=None)
+    ticket_catalog_refresh_interval: float = Field(default=86400.0)
+
+    metrics_enabled: bool = Field(default=True)
+    metrics_path: str = Field(default="/metrics")
+
+    @model_validator(mode="after")
+    def check_rate_limit_costs(self) -> "Config":
+        # 指令消耗超过任一桶的容量时令牌永远不够，该指令将永远被限流；未配置消耗的指令按 1 计
+        max_cost = max([1.0, *self.rate_limit_command_costs.values()])
+        for name in ("user", "group", "global"):
+            capacity = getattr(self, f"rate_limit_{name}_capacity")
+            if capacity < max_cost:
+                raise ValueError(f"rate_limit_{name}_capacity ({capacity}) 不能小于指令的最大消耗 ({max_cost})")
+        return self
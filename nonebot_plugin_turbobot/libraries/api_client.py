@@ -0,0 +1,430 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from ..config import Config
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .concurrency import UpstreamOverloadedError, request_priority, upstream_limiter
+from .hedging import hedged, latency_tracker
+from .http_client import get_http_client
+from .metrics import UPSTREAM_DURATION, UPSTREAM_HEDGES, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS
+from .response_cache import CACHEABLE_ENDPOINTS, StoredResponse, get_or_fetch, invalidate
+
+plugin_config = Config()
+
+# 仅对幂等的 GET 请求在这些状态码或网络错误时重试
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# 上游返回响应时的回调，参数为接口路径、bot_key 与状态码
+StatusListener = Callable[[str, Optional[str], int], None]
+
+
+class TurboApiError(Exception):
+    """
+    @Author: TurboServlet
+    @Description: Turbo API 返回非 200 状态码时抛出的异常
+    """
+
+    def __init__(self, status_code: int, message: Optional[str] = None):
+        super().__init__(message or f"HTTP {status_code}")
+        self.status_code = status_code
+        self.message = message
+
+
+class ServiceDegradedError(TurboApiError):
+    """
+    @Author: TurboServlet
+    @Description: 上游熔断期间快速失败时抛出的异常
+    """
+
+    def __init__(self, group: str, retry_after: float):
+        super().__init__(503, f"Turbo 服务暂时不可用，请约 {max(1, int(retry_after))} 秒后再试。")
+        self.group = group
+        self.retry_after = retry_after
+
+
+class ServiceBusyError(TurboApiError):
+    """
+    @Author: TurboServlet
+    @Description: 上游请求排队已满时快速失败抛出的异常
+    """
+
+    def __init__(self):
+        super().__init__(503, "当前请求较多，请稍后再试。")
+
+
+def format_api_error(error: TurboApiError, action: str, bad_request_message: Optional[str] = None) -> str:
+    """
+    @Author: TurboServlet
+    @Func: format_api_error()
+    @Description: 将 Turbo API 错误统一转换为回复消息
+    @Param {TurboApiError} error: API 错误
+    @Param {str} action: 操作名称，如“修改名称”
+    @Param {Optional[str]} bad_request_message: 400 时使用的自定义消息
+    @Return: str
+    """
+    if isinstance(error, (ServiceDegradedError, ServiceBusyError)):
+        return error.message
+    status_code = error.status_code
+    if status_code == 400:
+        return bad_request_message or "请求数据不合法，请检查请求。"
+    elif status_code == 401:
+        return "请求的Token缺失或不合法，请检查权限。"
+    elif status_code == 403:
+        return f"权限不足，无法{action}。"
+    elif status_code == 410:
+        return "该用户已被封禁，请联系管理员。"
+    elif status_code == 500:
+        return error.message or "服务器内部错误"
+    else:
+        return f"{action}失败，HTTP响应状态码为 {status_code}。"
+
+
+class RetryBudget:
+    """
+    @Author: TurboServlet
+    @Description: 全局重试预算，每个请求存入 ratio 个令牌，每次重试消耗一个令牌，防止上游故障时重试放大流量；
+                  对冲请求使用同样的预算控制额外请求的比例
+    """
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class TurboApiClient:
+    """
+    @Author: TurboServlet
+    @Description: Turbo API 客户端，每个接口对应一个方法，统一处理超时、重试、缓存与错误
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or plugin_config.api_base_url
+        self.retry_budget = RetryBudget(plugin_config.api_retry_budget_ratio, plugin_config.api_retry_budget_capacity)
+        self.hedge_budget = RetryBudget(plugin_config.hedge_budget_ratio, plugin_config.hedge_budget_capacity)
+        self._status_listeners: List[StatusListener] = []
+
+    def add_status_listener(self, listener: StatusListener):
+        """
+        @Author: TurboServlet
+        @Func: add_status_listener()
+        @Description: 注册上游返回响应（包括 200）时的回调，回调在事件循环中同步执行，不能阻塞
+        @Param {StatusListener} listener: 回调
+        """
+        self._status_listeners.append(listener)
+
+    def _timeout(self, path: str) -> httpx.Timeout:
+        """
+        @Author: TurboServlet
+        @Func: _timeout()
+        @Description: 获取接口的连接与读取超时，可通过 api_endpoint_timeouts 按接口覆盖
+        @Param {str} path: 接口路径
+        @Return: httpx.Timeout
+        """
+        override = plugin_config.api_endpoint_timeouts.get(path, {})
+        connect = override.get("connect", plugin_config.api_connect_timeout)
+        read = override.get("read", plugin_config.api_read_timeout)
+        return httpx.Timeout(read, connect=connect, pool=connect)
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(plugin_config.api_retry_backoff_max, plugin_config.api_retry_backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        bot_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        @Author: TurboServlet
+        @Func: _send()
+        @Description: 经过熔断器与自适应并发限制发送请求；GET 请求在网络错误或 502/503/504 时按抖动退避重试，重试次数受全局预算限制
+        @Return: httpx.Response
+        """
+        breaker = get_breaker(path)
+        breaker.before_call()
+        try:
+            response = await self._send_with_retries(method, path, bot_key, params, json, headers)
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def _send_with_retries(
+        self,
+        method: str,
+        path: str,
+        bot_key: Optional[str],
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        extra_headers: Optional[Dict[str, str]],
+    ) -> httpx.Response:
+        headers = {"Authorization": f"BotKey {bot_key}"} if bot_key else {}
+        if extra_headers:
+            headers.update(extra_headers)
+        retryable = method == "GET"
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            await upstream_limiter.acquire(request_priority.get())
+            UPSTREAM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            # None 表示请求被取消，不作为调整并发上限的样本
+            dropped: Optional[bool] = None
+            try:
+                response = await self._dispatch(method, path, params, json, headers)
+                dropped = response.status_code in RETRYABLE_STATUS_CODES
+            except httpx.TransportError:
+                dropped = True
+                UPSTREAM_REQUESTS.inc(path, "error")
+                if not (retryable and attempt < plugin_config.api_max_retries and self.retry_budget.withdraw()):
+                    raise
+            else:
+                UPSTREAM_REQUESTS.inc(path, str(response.status_code))
+                if not (
+                    retryable
+                    and response.status_code in RETRYABLE_STATUS_CODES
+                    and attempt < plugin_config.api_max_retries
+                    and self.retry_budget.withdraw()
+                ):
+                    return response
+            finally:
+                elapsed = time.perf_counter() - started
+                UPSTREAM_IN_FLIGHT.dec()
+                UPSTREAM_DURATION.observe(path, value=elapsed)
+                upstream_limiter.release(None if dropped is None else elapsed, bool(dropped))
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def _attempt(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        return await get_http_client().request(
+            method,
+            f'{self.base_url}{path}',
+            params=params,
+            json=json,
+            headers=headers or None,
+            timeout=self._timeout(path),
+        )
+
+    async def _observed_attempt(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        # 只记录主请求的延迟；被对冲请求取消或出错时记录到此刻为止的耗时，避免样本只剩较快的请求
+        started = time.perf_counter()
+        try:
+            return await self._attempt(method, path, params, json, headers)
+        finally:
+            latency_tracker.observe(path, time.perf_counter() - started)
+
+    async def _hedge_attempt(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        try:
+            return await self._attempt(method, path, params, json, headers)
+        finally:
+            upstream_limiter.release()
+
+    def _allow_hedge(self, path: str) -> bool:
+        # 对冲请求不排队：没有空闲的并发名额或预算不足时只等待主请求
+        if not upstream_limiter.try_acquire():
+            return False
+        if not self.hedge_budget.withdraw():
+            upstream_limiter.release()
+            return False
+        UPSTREAM_HEDGES.inc(path, "sent")
+        return True
+
+    async def _dispatch(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+    ) -> httpx.Response:
+        """
+        @Author: TurboServlet
+        @Func: _dispatch()
+        @Description: 发出一次请求。启用对冲的 GET 接口在超过该接口近期 p95 延迟仍未返回时再发出一个相同请求，
+                      使用先返回的响应并取消另一个，对冲请求数受 hedge_budget_ratio 限制
+        @Return: httpx.Response
+        """
+        if not (plugin_config.hedge_enabled and method == "GET" and path in plugin_config.hedge_endpoints):
+            return await self._attempt(method, path, params, json, headers)
+        self.hedge_budget.deposit()
+        delay = latency_tracker.quantile(path)
+        if delay is None:
+            return await self._observed_attempt(method, path, params, json, headers)
+
+        response, hedge_won = await hedged(
+            lambda: self._observed_attempt(method, path, params, json, headers),
+            lambda: self._hedge_attempt(method, path, params, json, headers),
+            max(delay, plugin_config.hedge_min_delay),
+            lambda: self._allow_hedge(path),
+        )
+        if hedge_won:
+            UPSTREAM_HEDGES.inc(path, "won")
+        return response
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        bot_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        """
+        @Author: TurboServlet
+        @Func: _request()
+        @Description: 发送请求并检查状态码，可缓存的 GET 接口会经过响应缓存
+        @Return: 状态码为 200 的 httpx.Response
+        """
+        return (await self._request_stored(method, path, bot_key, params, json)).response
+
+    async def _get_json(self, path: str, bot_key: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        @Author: TurboServlet
+        @Func: _get_json()
+        @Description: 发送 GET 请求并返回解析后的 JSON；可缓存接口的解析结果会被复用，调用方不能修改
+        @Return: Any
+        """
+        return (await self._request_stored("GET", path, bot_key, params)).json()
+
+    async def _request_stored(
+        self,
+        method: str,
+        path: str,
+        bot_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> StoredResponse:
+        try:
+            if method == "GET" and path in CACHEABLE_ENDPOINTS:
+                stored = await get_or_fetch(
+                    path, bot_key, params, lambda headers: self._send(method, path, bot_key, params, headers=headers)
+                )
+            else:
+                stored = StoredResponse(await self._send(method, path, bot_key, params, json))
+        except CircuitOpenError as e:
+            raise ServiceDegradedError(e.group, e.retry_after) from e
+        except UpstreamOverloadedError as e:
+            raise ServiceBusyError() from e
+
+        response = stored.response
+        for listener in self._status_listeners:
+            listener(path, bot_key, response.status_code)
+        if response.status_code != 200:
+            message = None
+            if response.status_code == 500:
+                try:
+                    message = response.json().get("message")
+                except Exception:
+                    message = None
+            raise TurboApiError(response.status_code, message)
+        return stored
+
+    async def bind(self, bot_token: str, bot_name: str) -> str:
+        response = await self._request("POST", '/bot/bind', json={"botToken": bot_token, "botName": bot_name})
+        return response.json()["botKey"]
+
+    async def unbind(self, bot_key: str):
+        await self._request("POST", '/bot/unbind', json={"botKey": bot_key})
+
+    async def set_maimai_name(self, bot_key: str, maimai_name: str):
+        await self._request("POST", '/web/setMaimaiName', bot_key, json={"maimaiName": maimai_name})
+
+    async def reset_maimai_name(self, bot_key: str):
+        await self._request("POST", '/web/resetMaimaiName', bot_key)
+
+    async def show_maimai_name(self, bot_key: str) -> str:
+        response = await self._request("GET", '/web/showMaimaiName', bot_key)
+        return response.text
+
+    async def set_tickets(self, bot_key: str, ticket_id: int):
+        await self._request("POST", '/web/setTickets', bot_key, json={"ticketId": ticket_id})
+        invalidate('/web/currentTickets', bot_key)
+
+    async def reset_tickets(self, bot_key: str):
+        await self._request("POST", '/web/resetTickets', bot_key)
+        invalidate('/web/currentTickets', bot_key)
+
+    async def current_tickets(self, bot_key: str) -> Dict[str, Any]:
+        return await self._get_json('/web/currentTickets', bot_key)
+
+    async def show_server_requests(self, bot_key: str) -> Dict[str, Any]:
+        return await self._get_json('/web/showServerRequests', bot_key)
+
+    async def show_permission(self, bot_key: str) -> str:
+        response = await self._request("GET", '/permission/showPermission', bot_key)
+        return response.text.strip().replace('"', '')
+
+    async def show_turbo_permission(self, bot_key: str) -> List[Dict[str, Any]]:
+        return await self._get_json('/web/showTurboPermission', bot_key)
+
+    async def show_friends(self, bot_key: str, page: int = 1) -> Dict[str, Any]:
+        return await self._get_json('/web/showFriends', bot_key, params={"page": page})
+
+    async def show_friend_requests(self, bot_key: str) -> List[Dict[str, Any]]:
+        return await self._get_json('/web/showFriendRequests', bot_key)
+
+    async def add_friend(self, bot_key: str, turbo_name: str):
+        await self._request("POST", '/web/addFriend', bot_key, json={"turboName": turbo_name})
+
+    async def accept_friend(self, bot_key: str, turbo_name: str):
+        await self._request("POST", '/web/acceptFriend', bot_key, json={"turboName": turbo_name})
+        invalidate('/web/showFriends', bot_key)
+
+    async def deny_friend(self, bot_key: str, turbo_name: str):
+        await self._request("POST", '/web/denyFriend', bot_key, json={"turboName": turbo_name})
+
+    async def remove_friend(self, bot_key: str, turbo_name: str):
+        await self._request("POST", '/web/removeFriend', bot_key, json={"turboName": turbo_name})
+        invalidate('/web/showFriends', bot_key)
+
+    async def arcade_info_detail(self, bot_key: str, arcade_name: str) -> Dict[str, Any]:
+        return await self._get_json('/web/arcadeInfoDetail', bot_key, params={"arcadeName": arcade_name})
+
+
+turbo_api = TurboApiClient()
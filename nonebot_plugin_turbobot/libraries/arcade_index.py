@@ -0,0 +1,260 @@
+import asyncio
+import bisect
+import json
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .db_utils import load_arcade_names, save_arcade_names
+
+plugin_config = Config()
+
+# 上游以这些状态码拒绝机厅查询时视为机厅不存在，此时才向用户展示索引中的候选建议
+ARCADE_NOT_FOUND_STATUS_CODES = {400, 404}
+
+try:
+    from pypinyin import Style, lazy_pinyin  # type: ignore
+except ImportError:  # pragma: no cover - pypinyin 为可选依赖
+    lazy_pinyin = None
+    Style = None
+
+
+def normalize_name(name: str) -> str:
+    """
+    @Author: TurboServlet
+    @Func: normalize_name()
+    @Description: 归一化机厅名称：全角转半角、转小写，并去除空白与标点
+    @Param {str} name: 机厅名称
+    @Return: str
+    """
+    name = unicodedata.normalize("NFKC", name).lower()
+    return "".join(ch for ch in name if ch.isalnum())
+
+
+def _pinyin_keys(name: str) -> List[str]:
+    """
+    @Author: TurboServlet
+    @Func: _pinyin_keys()
+    @Description: 生成机厅名称的全拼与首字母键，未安装 pypinyin 时返回空列表
+    @Param {str} name: 归一化后的机厅名称
+    @Return: List[str]
+    """
+    if lazy_pinyin is None or name.isascii():
+        return []
+    full = normalize_name("".join(lazy_pinyin(name)))
+    initials = normalize_name("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)))
+    return [key for key in (full, initials) if key and key != name]
+
+
+def _bigrams(key: str) -> Set[str]:
+    if len(key) < 2:
+        return {key}
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    @Author: TurboServlet
+    @Func: bounded_levenshtein()
+    @Description: 计算编辑距离，超过 limit 时提前返回 limit + 1
+    @Param {str} a: 字符串 a
+    @Param {str} b: 字符串 b
+    @Param {int} limit: 距离上限
+    @Return: int
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, cb in enumerate(b, start=1):
+        current = [j]
+        row_min = j
+        for i, ca in enumerate(a, start=1):
+            value = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (ca != cb))
+            current.append(value)
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ArcadeIndex:
+    """
+    @Author: TurboServlet
+    @Description: 本地机厅名称索引，支持精确、前缀、拼音与编辑距离查找
+    """
+
+    def __init__(self):
+        self._canonical: Dict[str, str] = {}
+        self._sorted_keys: List[str] = []
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._names: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def _insert(self, name: str) -> List[str]:
+        name = name.strip()
+        key = normalize_name(name)
+        if not key or name in self._names:
+            return []
+        self._names.add(name)
+        new_keys: List[str] = []
+        for index_key in [key, *_pinyin_keys(key)]:
+            if index_key in self._canonical:
+                continue
+            self._canonical[index_key] = name
+            new_keys.append(index_key)
+            for gram in _bigrams(index_key):
+                self._grams[gram].add(index_key)
+        return new_keys
+
+    def add(self, name: str) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: add()
+        @Description: 向索引中加入一个机厅名称
+        @Param {str} name: 机厅的规范名称
+        @Return: bool，是否为新名称
+        """
+        new_keys = self._insert(name)
+        for index_key in new_keys:
+            bisect.insort(self._sorted_keys, index_key)
+        return bool(new_keys)
+
+    def bulk_load(self, names: Iterable[str]) -> int:
+        """
+        @Author: TurboServlet
+        @Func: bulk_load()
+        @Description: 批量加入机厅名称，完成后统一排序一次
+        @Param {Iterable[str]} names: 机厅名称
+        @Return: int，新增的数量
+        """
+        added = 0
+        for name in names:
+            new_keys = self._insert(name)
+            if new_keys:
+                self._sorted_keys.extend(new_keys)
+                added += 1
+        self._sorted_keys.sort()
+        return added
+
+    def clear(self):
+        self._canonical.clear()
+        self._sorted_keys.clear()
+        self._grams.clear()
+        self._names.clear()
+
+    def _prefix_matches(self, key: str, limit: int) -> List[str]:
+        matches: List[str] = []
+        start = bisect.bisect_left(self._sorted_keys, key)
+        for position in range(start, len(self._sorted_keys)):
+            index_key = self._sorted_keys[position]
+            if not index_key.startswith(key):
+                break
+            name = self._canonical[index_key]
+            if name not in matches:
+                matches.append(name)
+                if len(matches) > limit:
+                    break
+        return matches
+
+    def _fuzzy_matches(self, key: str, limit: int) -> List[str]:
+        max_distance = max(1, len(key) // 3)
+        overlap: Counter = Counter()
+        for gram in _bigrams(key):
+            overlap.update(self._grams.get(gram, ()))
+        scored: List[Tuple[int, int, str]] = []
+        for index_key, shared in overlap.most_common(plugin_config.arcade_index_fuzzy_candidates):
+            distance = bounded_levenshtein(key, index_key, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, -shared, index_key))
+        scored.sort()
+        matches: List[str] = []
+        for _, _, index_key in scored:
+            name = self._canonical[index_key]
+            if name not in matches:
+                matches.append(name)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def resolve(self, query: str, limit: int = 5) -> Tuple[Optional[str], List[str]]:
+        """
+        @Author: TurboServlet
+        @Func: resolve()
+        @Description: 解析用户输入的机厅名称；规范化后精确匹配时返回规范名称，否则返回前缀或模糊匹配的候选建议。
+                      候选建议不会自动采用，索引中尚未收录的机厅仍需交给上游查询
+        @Param {str} query: 用户输入
+        @Param {int} limit: 最多返回的建议数量
+        @Return: (规范名称或 None, 建议列表)
+        """
+        key = normalize_name(query)
+        if not key:
+            return None, []
+        if key in self._canonical:
+            return self._canonical[key], []
+        prefix = self._prefix_matches(key, limit)
+        if prefix:
+            return None, prefix[:limit]
+        return None, self._fuzzy_matches(key, limit)
+
+
+def read_seed_file(path: str) -> List[str]:
+    """
+    @Author: TurboServlet
+    @Func: read_seed_file()
+    @Description: 读取机厅名称种子文件，支持 JSON 数组或每行一个名称的文本
+    @Param {str} path: 文件路径
+    @Return: List[str]
+    """
+    content = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".json"):
+        return [str(name) for name in json.loads(content)]
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+
+arcade_index = ArcadeIndex()
+
+
+async def refresh_arcade_index() -> int:
+    """
+    @Author: TurboServlet
+    @Func: refresh_arcade_index()
+    @Description: 从数据库与种子文件批量重建机厅索引，种子文件中的新名称会写回数据库
+    @Return: int，索引中的机厅数量
+    """
+    names = list(await load_arcade_names())
+    if plugin_config.arcade_index_seed_path:
+        try:
+            # 种子文件可能很大，读取与解析放到线程池中，避免阻塞事件循环
+            seed_names = await asyncio.get_running_loop().run_in_executor(
+                None, read_seed_file, plugin_config.arcade_index_seed_path
+            )
+            await save_arcade_names(seed_names)
+            names.extend(seed_names)
+        except Exception as e:
+            logger.warning(f"读取机厅种子文件失败：{e}")
+    arcade_index.clear()
+    arcade_index.bulk_load(names)
+    return len(arcade_index)
+
+
+async def learn_arcade_name(name: str):
+    """
+    @Author: TurboServlet
+    @Func: learn_arcade_name()
+    @Description: 记录一次成功查询得到的机厅规范名称
+    @Param {str} name: 机厅名称
+    """
+    if arcade_index.add(name):
+        await save_arcade_names([name])
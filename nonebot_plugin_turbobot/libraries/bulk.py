@@ -0,0 +1,194 @@
+import asyncio
+import csv
+import json
+import time
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .storage import export_bindings, import_bindings
+
+plugin_config = Config()
+
+CONFLICT_POLICIES = ("skip", "overwrite", "report")
+BINDING_FIELDS = ("QQID", "bot_token", "bot_key", "bind_time")
+# 结果中最多保留的冲突 QQID 与无效行号数量
+MAX_REPORTED = 20
+
+BindingRow = Tuple[str, str, str, int]
+
+
+class BulkResult:
+    """
+    @Author: TurboServlet
+    @Description: 批量导入或导出的进度与结果
+    """
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.conflict_count = 0
+        self.conflicts: List[str] = []
+        self.invalid_count = 0
+        self.invalid_lines: List[int] = []
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def add_conflicts(self, qqids: List[str]):
+        self.conflict_count += len(qqids)
+        self.conflicts.extend(qqids[:MAX_REPORTED - len(self.conflicts)])
+
+    def add_invalid(self, line: int):
+        self.invalid_count += 1
+        if len(self.invalid_lines) < MAX_REPORTED:
+            self.invalid_lines.append(line)
+
+
+ProgressCallback = Callable[[BulkResult], Awaitable[None]]
+
+
+def detect_format(path: str) -> str:
+    """
+    @Author: TurboServlet
+    @Func: detect_format()
+    @Description: 按扩展名判断文件格式，.jsonl / .ndjson 为 JSONL，其余按 CSV 处理
+    @Param {str} path: 文件路径
+    @Return: str，csv 或 jsonl
+    """
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson") else "csv"
+
+
+def _to_row(record: Dict[str, object], default_time: int) -> Optional[BindingRow]:
+    qqid = str(record.get("QQID") or "").strip()
+    bot_key = str(record.get("bot_key") or "").strip()
+    if not qqid or not bot_key:
+        return None
+    bind_time = record.get("bind_time")
+    try:
+        bind_time = int(bind_time) if bind_time not in (None, "") else default_time
+    except (TypeError, ValueError):
+        return None
+    return qqid, str(record.get("bot_token") or ""), bot_key, bind_time
+
+
+def read_bindings(file: TextIO, file_format: str, result: BulkResult) -> Iterator[BindingRow]:
+    """
+    @Author: TurboServlet
+    @Func: read_bindings()
+    @Description: 逐行读取绑定记录，CSV 需包含表头，JSONL 每行一个对象；缺少 QQID 或 bot_key 的行记为无效行
+    @Param {TextIO} file: 已打开的文件
+    @Param {str} file_format: csv 或 jsonl
+    @Param {BulkResult} result: 用于记录无效行
+    @Return: Iterator[(QQID, bot_token, bot_key, bind_time)]
+    """
+    default_time = int(time.time())
+    if file_format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            row = _to_row(record, default_time) if isinstance(record, dict) else None
+            if row is None:
+                result.add_invalid(line_number)
+                continue
+            yield row
+    else:
+        reader = csv.DictReader(file)
+        for record in reader:
+            row = _to_row(record, default_time)
+            if row is None:
+                result.add_invalid(reader.line_num)
+                continue
+            yield row
+
+
+def _next_batch(rows: Iterator[BindingRow], batch_size: int) -> List[BindingRow]:
+    return list(islice(rows, batch_size))
+
+
+def _write_rows(file: TextIO, writer: Any, rows: Sequence[Sequence[Any]]):
+    if writer is not None:
+        writer.writerows(rows)
+    else:
+        file.writelines(json.dumps(dict(zip(BINDING_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+async def import_bindings_file(path: str, policy: str, progress: Optional[ProgressCallback] = None) -> BulkResult:
+    """
+    @Author: TurboServlet
+    @Func: import_bindings_file()
+    @Description: 流式读取 CSV / JSONL 文件，按 bulk_batch_size 分批在事务中写入绑定记录，每批完成后报告进度
+    @Param {str} path: 文件路径
+    @Param {str} policy: 冲突处理方式，见 CONFLICT_POLICIES
+    @Param {ProgressCallback} progress: 每批完成后调用的进度回调
+    @Return: BulkResult
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"未知的冲突处理方式：{policy}")
+
+    result = BulkResult()
+    batch_size = max(1, plugin_config.bulk_batch_size)
+    # 打开与解析文件都在线程池中进行，事件循环只接收解析好的批次
+    loop = asyncio.get_running_loop()
+    file = await loop.run_in_executor(None, partial(open, path, newline="", encoding="utf-8-sig"))
+    try:
+        rows = read_bindings(file, detect_format(path), result)
+        while True:
+            batch = await loop.run_in_executor(None, _next_batch, rows, batch_size)
+            if not batch:
+                break
+            inserted, updated, skipped, conflicts = await import_bindings(batch, policy)
+            result.processed += len(batch)
+            result.inserted += inserted
+            result.updated += updated
+            result.skipped += skipped
+            result.add_conflicts(conflicts)
+            logger.debug(f"导入绑定记录：已处理 {result.processed} 条，新增 {result.inserted} 条")
+            if progress is not None:
+                await progress(result)
+    finally:
+        await loop.run_in_executor(None, file.close)
+    return result
+
+
+async def export_bindings_file(path: str, progress: Optional[ProgressCallback] = None) -> BulkResult:
+    """
+    @Author: TurboServlet
+    @Func: export_bindings_file()
+    @Description: 按存储后端的游标分页读取绑定记录并写入 CSV / JSONL 文件，内存中最多只有一页数据
+    @Param {str} path: 文件路径
+    @Param {ProgressCallback} progress: 每页写入后调用的进度回调
+    @Return: BulkResult
+    """
+    result = BulkResult()
+    batch_size = max(1, plugin_config.bulk_batch_size)
+    file_format = detect_format(path)
+    # 文件的打开与写入在线程池中进行，事件循环只负责从存储后端分页读取
+    loop = asyncio.get_running_loop()
+    file = await loop.run_in_executor(None, partial(open, path, "w", newline="", encoding="utf-8"))
+    try:
+        writer = csv.writer(file) if file_format == "csv" else None
+        if writer is not None:
+            await loop.run_in_executor(None, writer.writerow, BINDING_FIELDS)
+        cursor: Optional[str] = ""
+        while cursor is not None:
+            rows, cursor = await export_bindings(cursor, batch_size)
+            await loop.run_in_executor(None, _write_rows, file, writer, rows)
+            result.processed += len(rows)
+            if progress is not None:
+                await progress(result)
+    finally:
+        await loop.run_in_executor(None, file.close)
+    return result
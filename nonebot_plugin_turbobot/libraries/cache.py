@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+MISSING: Any = object()
+
+
+class LRUCache(Generic[K, V]):
+    """
+    @Author: TurboServlet
+    @Description: 有容量上限的 LRU 缓存，记录命中与未命中次数
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def get(self, key: K, default: Any = MISSING) -> Any:
+        """
+        @Author: TurboServlet
+        @Func: get()
+        @Description: 读取缓存并刷新其最近使用顺序，未命中时返回 default（默认为 MISSING）
+        @Param {K} key: 缓存键
+        @Return: 缓存值或 default
+        """
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V):
+        """
+        @Author: TurboServlet
+        @Func: set()
+        @Description: 写入缓存，超出容量时淘汰最久未使用的条目
+        @Param {K} key: 缓存键
+        @Param {V} value: 缓存值
+        """
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        """
+        @Author: TurboServlet
+        @Func: pop()
+        @Description: 移除缓存条目
+        @Param {K} key: 缓存键
+        @Return: 被移除的值或 default
+        """
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def items(self) -> Tuple[Tuple[K, V], ...]:
+        return tuple(self._data.items())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        @Author: TurboServlet
+        @Func: stats()
+        @Description: 获取缓存统计信息
+        @Return: dict，包含 size、maxsize、hits、misses、hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class TTLCache(LRUCache[K, V]):
+    """
+    @Author: TurboServlet
+    @Description: 带过期时间的 LRU 缓存，每个条目可以有独立的 TTL
+    """
+
+    def get(self, key: K, default: Any = MISSING) -> Any:
+        entry = super().get(key, MISSING)
+        if entry is MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self.hits -= 1
+            self.misses += 1
+            return default
+        return value
+
+    def set(self, key: K, value: V, ttl: float = 60.0):
+        """
+        @Author: TurboServlet
+        @Func: set()
+        @Description: 写入缓存并设置过期时间
+        @Param {K} key: 缓存键
+        @Param {V} value: 缓存值
+        @Param {float} ttl: 存活时间（秒），不大于 0 时不缓存
+        """
+        if ttl <= 0:
+            return
+        super().set(key, (time.monotonic() + ttl, value))
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        entry = self._data.pop(key, MISSING)
+        return default if entry is MISSING else entry[1]
+
+    def keys(self) -> Tuple[K, ...]:
+        return tuple(self._data.keys())
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    @Author: TurboServlet
+    @Description: 合并并发的相同请求，同一个键同时只有一个任务在执行，所有等待者共享结果
+    """
+
+    def __init__(self):
+        self._tasks: Dict[K, "asyncio.Task[V]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        """
+        @Author: TurboServlet
+        @Func: do()
+        @Description: 执行或加入一个进行中的任务；单个等待者被取消不会影响其他等待者
+        @Param {K} key: 合并键
+        @Param {Callable} func: 返回协程的无参函数
+        @Return: 任务结果
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,165 @@
+import time
+from typing import Dict, Optional
+
+from nonebot import logger
+
+from ..config import Config
+
+plugin_config = Config()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 接口路径 -> 熔断分组，同一分组共享一个熔断器
+ENDPOINT_GROUPS: Dict[str, str] = {
+    '/bot/bind': 'bot',
+    '/bot/unbind': 'bot',
+    '/permission/showPermission': 'permission',
+    '/web/showTurboPermission': 'permission',
+    '/web/setMaimaiName': 'name',
+    '/web/resetMaimaiName': 'name',
+    '/web/showMaimaiName': 'name',
+    '/web/setTickets': 'tickets',
+    '/web/resetTickets': 'tickets',
+    '/web/currentTickets': 'tickets',
+    '/web/showServerRequests': 'network',
+    '/web/showFriends': 'friends',
+    '/web/showFriendRequests': 'friends',
+    '/web/addFriend': 'friends',
+    '/web/acceptFriend': 'friends',
+    '/web/denyFriend': 'friends',
+    '/web/removeFriend': 'friends',
+    '/web/arcadeInfoDetail': 'arcade',
+}
+
+
+class CircuitOpenError(Exception):
+    """
+    @Author: TurboServlet
+    @Description: 熔断器处于打开状态时直接拒绝请求
+    """
+
+    def __init__(self, group: str, retry_after: float):
+        super().__init__(f"{group} 服务熔断中，{retry_after:.0f} 秒后重试")
+        self.group = group
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    @Author: TurboServlet
+    @Description: 三态熔断器：连续失败达到阈值后打开，冷却后进入半开状态放行少量探测请求，探测成功则关闭
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.total_rejected = 0
+
+    def before_call(self):
+        """
+        @Author: TurboServlet
+        @Func: before_call()
+        @Description: 请求前检查熔断状态，打开状态下抛出 CircuitOpenError；冷却结束后转为半开并放行探测请求
+        """
+        if self.state == OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.recovery_timeout:
+                self.total_rejected += 1
+                raise CircuitOpenError(self.name, self.recovery_timeout - elapsed)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.total_rejected += 1
+                raise CircuitOpenError(self.name, 0)
+            self.half_open_calls += 1
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+        self.consecutive_failures = 0
+
+    def release(self):
+        """
+        @Author: TurboServlet
+        @Func: release()
+        @Description: 请求被取消、未产生结果时归还半开状态下的探测名额
+        """
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            if state == OPEN:
+                self.opened_at = time.monotonic()
+            return
+        logger.warning(f"Turbo API 熔断器 {self.name}：{self.state} -> {state}")
+        self.state = state
+        self.half_open_calls = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == CLOSED:
+            self.consecutive_failures = 0
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        @Author: TurboServlet
+        @Func: snapshot()
+        @Description: 获取熔断器当前状态，供运维查询
+        @Return: dict
+        """
+        retry_after: Optional[float] = None
+        if self.state == OPEN:
+            retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.total_rejected,
+            "retry_after": retry_after,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(path: str) -> CircuitBreaker:
+    """
+    @Author: TurboServlet
+    @Func: get_breaker()
+    @Description: 获取接口所属分组的熔断器
+    @Param {str} path: 接口路径
+    @Return: CircuitBreaker
+    """
+    group = ENDPOINT_GROUPS.get(path, path.strip('/').split('/')[0])
+    breaker = _breakers.get(group)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            group,
+            plugin_config.breaker_failure_threshold,
+            plugin_config.breaker_recovery_timeout,
+            plugin_config.breaker_half_open_max_calls,
+        )
+        _breakers[group] = breaker
+    return breaker
+
+
+def get_breaker_states() -> Dict[str, Dict[str, object]]:
+    """
+    @Author: TurboServlet
+    @Func: get_breaker_states()
+    @Description: 获取所有熔断器的状态
+    @Return: dict，分组名 -> 状态
+    """
+    return {group: breaker.snapshot() for group, breaker in sorted(_breakers.items())}
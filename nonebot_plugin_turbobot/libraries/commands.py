@@ -0,0 +1,125 @@
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from nonebot.rule import Rule, command
+
+CommandHandler = Callable[..., Awaitable[Any]]
+
+# 处理器可以声明的参数，分发时按处理器签名只传入需要的参数
+HANDLER_PARAMETERS = ("bot", "event", "arg")
+
+
+class CommandSpec:
+    """
+    @Author: TurboServlet
+    @Description: 一条插件指令：名称、别名、帮助信息与处理器；local 为 True 的指令不请求 Turbo API，上游过载时不会被拒绝
+    """
+
+    __slots__ = ("name", "aliases", "description", "shown", "superuser", "local", "handler", "parameters")
+
+    def __init__(
+        self,
+        name: str,
+        aliases: Set[str],
+        description: Optional[str] = None,
+        shown: Sequence[str] = (),
+        superuser: bool = False,
+        local: bool = False,
+    ):
+        self.name = name
+        self.aliases = aliases
+        self.description = description
+        self.shown = tuple(shown) or (name,)
+        self.superuser = superuser
+        self.local = local
+        self.handler: Optional[CommandHandler] = None
+        self.parameters: Tuple[str, ...] = ()
+
+    def handle(self) -> Callable[[CommandHandler], CommandHandler]:
+        """
+        @Author: TurboServlet
+        @Func: handle()
+        @Description: 注册指令处理器，处理器可声明 bot、event、arg 中的任意参数
+        @Return: 装饰器
+        """
+        def decorator(handler: CommandHandler) -> CommandHandler:
+            signature = inspect.signature(handler)
+            self.handler = handler
+            self.parameters = tuple(name for name in HANDLER_PARAMETERS if name in signature.parameters)
+            return handler
+        return decorator
+
+    async def call(self, **values: Any):
+        if self.handler is None:
+            return
+        await self.handler(**{name: values[name] for name in self.parameters})
+
+    def help_line(self) -> str:
+        return " 或 ".join(f"/{alias}" for alias in self.shown) + f" - {self.description}"
+
+
+class CommandRegistry:
+    """
+    @Author: TurboServlet
+    @Description: 插件指令注册表。所有指令共用一个 matcher，按预先计算的别名表查找处理器，帮助信息也由注册表生成
+    """
+
+    def __init__(self):
+        self._specs: List[CommandSpec] = []
+        self._aliases: Dict[str, CommandSpec] = {}
+
+    def register(
+        self,
+        name: str,
+        aliases: Iterable[str] = (),
+        description: Optional[str] = None,
+        shown: Sequence[str] = (),
+        superuser: bool = False,
+        local: bool = False,
+    ) -> CommandSpec:
+        """
+        @Author: TurboServlet
+        @Func: register()
+        @Description: 注册一条指令，名称与别名都不能与已有指令重复
+        @Param {str} name: 指令名称，用于限流消耗与指标标签
+        @Param {Iterable[str]} aliases: 指令别名
+        @Param {str} description: 帮助信息中的说明，为空时不出现在帮助信息中
+        @Param {Sequence[str]} shown: 帮助信息中展示的指令写法，默认只展示名称
+        @Param {bool} superuser: 是否仅限超级用户
+        @Param {bool} local: 是否只使用本地数据，不请求 Turbo API
+        @Return: CommandSpec
+        """
+        spec = CommandSpec(name, {name, *aliases}, description, shown, superuser, local)
+        for alias in spec.aliases:
+            if alias in self._aliases:
+                raise ValueError(f"指令别名重复：{alias}")
+            self._aliases[alias] = spec
+        self._specs.append(spec)
+        return spec
+
+    def lookup(self, cmd: Tuple[str, ...]) -> Optional[CommandSpec]:
+        """
+        @Author: TurboServlet
+        @Func: lookup()
+        @Description: 按 NoneBot 前缀树解析出的指令查找注册的指令
+        @Param {Tuple[str, ...]} cmd: 指令（按指令分隔符切分后的元组）
+        @Return: Optional[CommandSpec]
+        """
+        if len(cmd) != 1:
+            return None
+        return self._aliases.get(cmd[0])
+
+    def rule(self) -> Rule:
+        """
+        @Author: TurboServlet
+        @Func: rule()
+        @Description: 生成匹配全部指令别名的规则。别名加入 NoneBot 的全局前缀树，每条消息只解析一次
+        @Return: Rule
+        """
+        return command(*self._aliases)
+
+    def help_text(self) -> str:
+        lines = [f"{index}. {spec.help_line()}" for index, spec in enumerate(
+            (spec for spec in self._specs if spec.description and not spec.superuser), start=1
+        )]
+        return "\n指令帮助信息：\n" + "\n".join(lines)
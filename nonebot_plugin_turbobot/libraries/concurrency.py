@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from ..config import Config
+from .metrics import UPSTREAM_CONCURRENCY_LIMIT, UPSTREAM_QUEUED, UPSTREAM_SHED
+
+plugin_config = Config()
+
+# 上游请求优先级，数值越小越先获得并发名额
+PRIORITY_INTERACTIVE = 0
+PRIORITY_HEAVY = 1
+PRIORITY_BACKGROUND = 2
+
+# 当前任务发起上游请求时使用的优先级。指令分发时按指令设置，轮询、预取等后台任务保持默认的最低优先级
+request_priority: ContextVar[int] = ContextVar("turbobot_request_priority", default=PRIORITY_BACKGROUND)
+
+# 短期延迟的平滑系数与长期基准延迟的平滑系数
+SHORT_SMOOTHING = 0.2
+BASELINE_SMOOTHING = 0.01
+
+
+class UpstreamOverloadedError(Exception):
+    """
+    @Author: TurboServlet
+    @Description: 上游请求等待队列已满，或排队中的请求被更高优先级的请求挤出时抛出
+    """
+
+
+def command_priority(command: str) -> int:
+    """
+    @Author: TurboServlet
+    @Func: command_priority()
+    @Description: 获取指令发起上游请求时的优先级，未配置的指令视为交互式的轻量请求
+    @Param {str} command: 指令名称
+    @Return: int
+    """
+    return plugin_config.upstream_command_priorities.get(command, PRIORITY_INTERACTIVE)
+
+
+class AdaptiveLimiter:
+    """
+    @Author: TurboServlet
+    @Description: 自适应并发限制器（AIMD）：请求成功且延迟接近长期基准时，每轮往返把上限加一；
+                  出现超时、网络错误、502/503/504 或短期延迟超过基准的 tolerance 倍时按 backoff 比例收缩上限。
+                  超出上限的请求进入有界优先队列，队列满时拒绝，优先级更高的请求可以挤掉队尾的低优先级请求
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        max_queue: int,
+        tolerance: float,
+        backoff: float,
+        enabled: bool = True,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max_limit, max(min_limit, initial))
+        self.max_queue = max_queue
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.enabled = enabled
+        self.in_flight = 0
+        self.shed = 0
+        self.short_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        # (优先级, 序号, Future)，序号保证同优先级先进先出
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        UPSTREAM_CONCURRENCY_LIMIT.set(value=self.limit)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def overloaded(self, priority: int) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: overloaded()
+        @Description: 队列已满且没有可以被挤掉的低优先级请求时返回 True，用于在处理指令前提前拒绝
+        @Param {int} priority: 请求优先级
+        @Return: bool
+        """
+        if not self.enabled or len(self._waiters) < self.max_queue:
+            return False
+        return not self._waiters or priority >= max(self._waiters)[0]
+
+    async def acquire(self, priority: int):
+        """
+        @Author: TurboServlet
+        @Func: acquire()
+        @Description: 获取一个并发名额，名额不足时按优先级排队
+        @Param {int} priority: 请求优先级
+        """
+        if not self.enabled or (self._has_capacity() and not self._waiters):
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters) if self._waiters else None
+            if worst is None or priority >= worst[0]:
+                self._reject()
+                raise UpstreamOverloadedError("上游请求队列已满")
+            self._remove(worst)
+            worst[2].set_exception(UpstreamOverloadedError("上游请求被更高优先级的请求挤出队列"))
+            self._reject()
+
+        entry = (priority, next(self._sequence), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, entry)
+        UPSTREAM_QUEUED.set(value=len(self._waiters))
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry[2].done() and not entry[2].cancelled() and entry[2].exception() is None:
+                # 已经分到名额但调用方被取消，把名额交给下一个请求
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._remove(entry)
+            raise
+
+    def try_acquire(self) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: try_acquire()
+        @Description: 不排队地尝试获取一个名额，用于可有可无的额外请求（如对冲请求）
+        @Return: bool，是否获取成功
+        """
+        if self.enabled and (self._waiters or not self._has_capacity()):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False):
+        """
+        @Author: TurboServlet
+        @Func: release()
+        @Description: 归还并发名额并根据本次请求的结果调整上限
+        @Param {Optional[float]} latency: 请求耗时（秒），请求被取消时为 None，不参与调整
+        @Param {bool} dropped: 是否超时、网络错误或上游过载
+        """
+        self.in_flight -= 1
+        if self.enabled and (latency is not None or dropped):
+            self._adjust(latency, dropped)
+        self._wake()
+
+    def _adjust(self, latency: Optional[float], dropped: bool):
+        overloaded = dropped
+        if latency is not None and not dropped:
+            if self.short_latency is None:
+                self.short_latency = self.baseline_latency = latency
+            else:
+                self.short_latency += (latency - self.short_latency) * SHORT_SMOOTHING
+                self.baseline_latency += (latency - self.baseline_latency) * BASELINE_SMOOTHING
+            overloaded = self.short_latency > self.baseline_latency * self.tolerance
+
+        if overloaded:
+            # 同一轮往返内的多个慢请求只收缩一次，避免突发时上限直接跌到底
+            now = time.monotonic()
+            if now - self._last_decrease >= (self.short_latency or 0.0):
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif self.in_flight * 2 >= self.limit:
+            # 只有名额真正被用到一半以上时才增加，空闲时上限不会无限增长
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        UPSTREAM_CONCURRENCY_LIMIT.set(value=self.limit)
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+        UPSTREAM_QUEUED.set(value=len(self._waiters))
+
+    def _remove(self, entry: Tuple[int, int, asyncio.Future]):
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+        UPSTREAM_QUEUED.set(value=len(self._waiters))
+
+    def _reject(self):
+        self.shed += 1
+        UPSTREAM_SHED.inc()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "shed": self.shed,
+            "latency": self.short_latency or 0.0,
+            "baseline": self.baseline_latency or 0.0,
+        }
+
+
+upstream_limiter = AdaptiveLimiter(
+    initial=plugin_config.upstream_limit_initial,
+    min_limit=plugin_config.upstream_limit_min,
+    max_limit=plugin_config.upstream_limit_max,
+    max_queue=plugin_config.upstream_queue_size,
+    tolerance=plugin_config.upstream_latency_tolerance,
+    backoff=plugin_config.upstream_limit_backoff,
+    enabled=plugin_config.upstream_limit_enabled,
+)
@@ -1,88 +1,445 @@
-import sqlite3
-from datetime import datetime
-from typing import Optional
-
-from nonebot import get_driver
-
-from ..config import Config
-
-plugin_config = Config()
-
-
-def get_connection():
-    """
-    @Author: TurboServlet
-    @Func: get_connection()
-    @Description: 获取数据库连接
-    @Return: sqlite3.Connection
-    """
-    return sqlite3.connect(plugin_config.database_path)
-
-
-def is_already_bound(qqid: str) -> bool:
-    """
-    @Author: TurboServlet
-    @Func: is_already_bound()
-    @Description: 检查用户是否已经绑定
-    @Param {str} qqid: 用户QQ号
-    @Return: bool
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT 1 FROM user WHERE QQID = ?', (qqid,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
-
-
-def get_bot_key(qqid: str) -> Optional[str]:
-    """
-    @Author: TurboServlet
-    @Func: get_bot_key()
-    @Description: 获取用户的bot_key
-    @Param {str} qqid: 用户QQ号
-    @Return: Optional[str]
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT bot_key FROM user WHERE QQID = ?', (qqid,))
-    row = cursor.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-
-def bind_user(qqid: str, bot_token: str, bot_key: str):
-    """
-    @Author: TurboServlet
-    @Func: bind_user()
-    @Description: 绑定用户信息到数据库
-    @Param {str} qqid: 用户的QQID（不是QQ号）
-    @Param {str} bot_token: 用户的bot_token
-    @Param {str} bot_key: 用户的bot_key
-    """
-    bind_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        '''
-    INSERT INTO user (QQID, bot_token, bot_key, bind_time) 
-    VALUES (?, ?, ?, ?)
-    ''',
-        (qqid, bot_token, bot_key, bind_time),
-    )
-    conn.commit()
-    conn.close()
-
-
-def unbind_user(qqid: str):
-    """
-    @Author: TurboServlet
-    @Func: unbind_user()
-    @Description: 解除用户绑定
-    @Param {str} qqid: 用户的QQID（不是QQ号）
-    """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM user WHERE QQID = ?", (qqid,))
-    conn.commit()
-    conn.close()
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from nonebot import get_driver, logger
+
+from ..config import Config
+from .metrics import DB_QUERY_DURATION
+from .migrations import migrate
+
+plugin_config = Config()
+
+T = TypeVar("T")
+
+SQL_GET_BOT_KEY = 'SELECT bot_key FROM user WHERE QQID = ?'
+SQL_BIND_USER = '''
+    INSERT INTO user (QQID, bot_token, bot_key, bind_time) 
+    VALUES (?, ?, ?, ?)
+    '''
+SQL_UNBIND_USER = "DELETE FROM user WHERE QQID = ?"
+SQL_FIND_BINDINGS = 'SELECT QQID, bot_key FROM user WHERE QQID IN (SELECT value FROM json_each(?))'
+SQL_IMPORT_BINDING_SKIP = '''
+    INSERT INTO user (QQID, bot_token, bot_key, bind_time) VALUES (?, ?, ?, ?)
+    ON CONFLICT (QQID) DO NOTHING
+    '''
+SQL_IMPORT_BINDING_OVERWRITE = '''
+    INSERT INTO user (QQID, bot_token, bot_key, bind_time) VALUES (?, ?, ?, ?)
+    ON CONFLICT (QQID) DO UPDATE SET
+        bot_token = excluded.bot_token,
+        bot_key = excluded.bot_key,
+        bind_time = excluded.bind_time
+    '''
+SQL_EXPORT_BINDINGS = '''
+    SELECT QQID, bot_token, bot_key, bind_time FROM user
+    WHERE QQID > ? ORDER BY QQID LIMIT ?
+    '''
+SQL_LOAD_ARCADES = 'SELECT name FROM arcade'
+SQL_SAVE_ARCADE = 'INSERT OR IGNORE INTO arcade (name) VALUES (?)'
+SQL_LOAD_WATCHES = 'SELECT arcade_name, target_type, target_id, bot_id, qqid FROM watch'
+SQL_ADD_WATCH = '''
+    INSERT OR REPLACE INTO watch (arcade_name, target_type, target_id, bot_id, qqid)
+    VALUES (?, ?, ?, ?, ?)
+    '''
+SQL_REMOVE_WATCH = 'DELETE FROM watch WHERE arcade_name = ? AND target_type = ? AND target_id = ?'
+SQL_RECORD_NETWORK_SAMPLE = '''
+    INSERT INTO network_series (resolution, bucket, samples, exception_rate, zlib_skipped)
+    VALUES (?, ?, 1, ?, ?)
+    ON CONFLICT (resolution, bucket) DO UPDATE SET
+        samples = samples + 1,
+        exception_rate = (exception_rate * samples + excluded.exception_rate) / (samples + 1),
+        zlib_skipped = (zlib_skipped * samples + excluded.zlib_skipped) / (samples + 1)
+    '''
+SQL_PRUNE_NETWORK_SERIES = 'DELETE FROM network_series WHERE resolution = ? AND bucket < ?'
+SQL_LOAD_NETWORK_SERIES = '''
+    SELECT bucket, exception_rate, zlib_skipped FROM network_series
+    WHERE resolution = ? AND bucket >= ? ORDER BY bucket
+    '''
+SQL_LOAD_TICKET_CATALOG = 'SELECT ticket_id, description, version FROM ticket_catalog'
+SQL_CLEAR_TICKET_CATALOG = 'DELETE FROM ticket_catalog'
+SQL_SAVE_TICKET = 'INSERT INTO ticket_catalog (ticket_id, description, version) VALUES (?, ?, ?)'
+
+# 所有数据库操作都在同一个专用线程中串行执行，连接只在该线程内使用
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turbobot-db")
+_connection: Optional[sqlite3.Connection] = None
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    @Author: TurboServlet
+    @Func: get_connection()
+    @Description: 获取持久数据库连接（仅可在数据库线程中调用），首次调用时以 WAL 模式打开并执行数据库迁移
+    @Return: sqlite3.Connection
+    """
+    global _connection
+    if _connection is None:
+        conn = sqlite3.connect(
+            plugin_config.database_path,
+            check_same_thread=False,
+            cached_statements=plugin_config.database_cached_statements,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(plugin_config.database_busy_timeout * 1000)}')
+        migrate(conn)
+        _connection = conn
+    return _connection
+
+
+def _close_connection():
+    """
+    @Author: TurboServlet
+    @Func: _close_connection()
+    @Description: 关闭持久数据库连接（仅可在数据库线程中调用）
+    """
+    global _connection
+    if _connection is not None:
+        _connection.execute('PRAGMA optimize')
+        _connection.close()
+        _connection = None
+
+
+async def run_in_db_thread(func: Callable[..., T], *args: Any) -> T:
+    """
+    @Author: TurboServlet
+    @Func: run_in_db_thread()
+    @Description: 将阻塞的数据库操作放到数据库线程中执行，避免阻塞事件循环
+    @Param {Callable} func: 需要执行的同步函数
+    @Return: 函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _timed, func, args)
+
+
+def _timed(func: Callable[..., T], args: Tuple[Any, ...]) -> T:
+    # 只在数据库线程中执行，该线程是 DB_QUERY_DURATION 的唯一写入者
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        DB_QUERY_DURATION.observe(func.__name__.lstrip("_"), value=time.perf_counter() - started)
+
+
+def _run_maintenance() -> Tuple[int, int]:
+    """
+    @Author: TurboServlet
+    @Func: _run_maintenance()
+    @Description: 更新查询规划统计、回收空闲页并截断 WAL 文件（仅可在数据库线程中调用）
+    @Return: (回收前的空闲页数, 检查点写回的页数)
+    """
+    conn = get_connection()
+    conn.execute(f'PRAGMA analysis_limit = {plugin_config.database_analysis_limit}')
+    conn.execute('ANALYZE')
+    free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    conn.execute(f'PRAGMA incremental_vacuum({plugin_config.database_vacuum_pages})').fetchall()
+    _, _, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    return free_pages, checkpointed
+
+
+async def _maintenance_loop():
+    while True:
+        await asyncio.sleep(plugin_config.database_maintenance_interval)
+        try:
+            free_pages, checkpointed = await run_in_db_thread(_run_maintenance)
+            logger.debug(f"数据库维护完成，回收空闲页 {free_pages} 个，检查点写回 {checkpointed} 页")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"数据库维护过程中出现错误：{e}")
+
+
+async def init_database():
+    """
+    @Author: TurboServlet
+    @Func: init_database()
+    @Description: 在驱动启动时打开持久数据库连接，并启动定期维护任务
+    """
+    global _maintenance_task
+    await run_in_db_thread(get_connection)
+    if plugin_config.database_maintenance_interval > 0 and (_maintenance_task is None or _maintenance_task.done()):
+        _maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+async def close_database():
+    """
+    @Author: TurboServlet
+    @Func: close_database()
+    @Description: 在驱动关闭时停止维护任务并关闭数据库连接
+    """
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
+    await run_in_db_thread(_close_connection)
+
+
+def _get_bot_key(qqid: str) -> Optional[str]:
+    row = get_connection().execute(SQL_GET_BOT_KEY, (qqid,)).fetchone()
+    return row[0] if row else None
+
+
+def _bind_user(qqid: str, bot_token: str, bot_key: str, bind_time: int):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_BIND_USER, (qqid, bot_token, bot_key, bind_time))
+
+
+def _unbind_user(qqid: str):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_UNBIND_USER, (qqid,))
+
+
+async def load_bot_key(qqid: str) -> Optional[str]:
+    """
+    @Author: TurboServlet
+    @Func: load_bot_key()
+    @Description: 读取用户绑定的 bot_key
+    @Param {str} qqid: 用户QQID
+    @Return: Optional[str]，未绑定时为 None
+    """
+    return await run_in_db_thread(_get_bot_key, qqid)
+
+
+async def save_binding(qqid: str, bot_token: str, bot_key: str, bind_time: int):
+    """
+    @Author: TurboServlet
+    @Func: save_binding()
+    @Description: 写入一条绑定记录
+    """
+    await run_in_db_thread(_bind_user, qqid, bot_token, bot_key, bind_time)
+
+
+async def delete_binding(qqid: str):
+    """
+    @Author: TurboServlet
+    @Func: delete_binding()
+    @Description: 删除用户的绑定记录
+    @Param {str} qqid: 用户QQID
+    """
+    await run_in_db_thread(_unbind_user, qqid)
+
+
+def plan_binding_import(
+    rows: List[Tuple[str, str, str, int]], existing: Dict[str, str], policy: str
+) -> Tuple[List[Tuple[str, str, str, int]], int, int, int, List[str]]:
+    """
+    @Author: TurboServlet
+    @Func: plan_binding_import()
+    @Description: 根据已有绑定与冲突处理方式决定一批导入记录中需要写入的记录，同一批中重复出现的 QQID 按已存在处理
+    @Param {List[Tuple]} rows: (QQID, bot_token, bot_key, bind_time) 列表
+    @Param {dict} existing: 已存在的 QQID -> bot_key
+    @Param {str} policy: skip 跳过，overwrite 覆盖，report 跳过并报告 bot_key 不同的记录
+    @Return: (需要写入的记录, 新增数, 覆盖数, 跳过数, 冲突的 QQID 列表)
+    """
+    inserted = updated = skipped = 0
+    conflicts: List[str] = []
+    writes: List[Tuple[str, str, str, int]] = []
+    for row in rows:
+        qqid, _, bot_key, _ = row
+        if qqid not in existing:
+            inserted += 1
+            writes.append(row)
+        elif policy == "overwrite":
+            updated += 1
+            writes.append(row)
+        elif policy == "report" and existing[qqid] != bot_key:
+            conflicts.append(qqid)
+        else:
+            skipped += 1
+        existing[qqid] = bot_key
+    return writes, inserted, updated, skipped, conflicts
+
+
+def _import_bindings(rows: List[Tuple[str, str, str, int]], policy: str) -> Tuple[int, int, int, List[str]]:
+    conn = get_connection()
+    existing = dict(conn.execute(SQL_FIND_BINDINGS, (json.dumps([row[0] for row in rows]),)).fetchall())
+    writes, inserted, updated, skipped, conflicts = plan_binding_import(rows, existing, policy)
+    with conn:
+        conn.executemany(SQL_IMPORT_BINDING_OVERWRITE if policy == "overwrite" else SQL_IMPORT_BINDING_SKIP, writes)
+    return inserted, updated, skipped, conflicts
+
+
+def _export_bindings(after: str, limit: int) -> List[Tuple[str, str, str, int]]:
+    return get_connection().execute(SQL_EXPORT_BINDINGS, (after, limit)).fetchall()
+
+
+async def save_bindings(rows: List[Tuple[str, str, str, int]], policy: str) -> Tuple[int, int, int, List[str]]:
+    """
+    @Author: TurboServlet
+    @Func: save_bindings()
+    @Description: 在一个事务中写入一批绑定记录，冲突处理见 plan_binding_import()
+    @Param {List[Tuple]} rows: (QQID, bot_token, bot_key, bind_time) 列表
+    @Param {str} policy: skip、overwrite 或 report
+    @Return: (新增数, 覆盖数, 跳过数, 冲突的 QQID 列表)
+    """
+    return await run_in_db_thread(_import_bindings, rows, policy)
+
+
+async def load_bindings(after: str, limit: int) -> List[Tuple[str, str, str, int]]:
+    """
+    @Author: TurboServlet
+    @Func: load_bindings()
+    @Description: 按 QQID 顺序读取 after 之后的一页绑定记录
+    @Param {str} after: 上一页最后的 QQID，第一页为空字符串
+    @Param {int} limit: 每页数量
+    @Return: List[(QQID, bot_token, bot_key, bind_time)]
+    """
+    return await run_in_db_thread(_export_bindings, after, limit)
+
+
+def _load_arcade_names() -> List[str]:
+    return [row[0] for row in get_connection().execute(SQL_LOAD_ARCADES)]
+
+
+def _save_arcade_names(names: List[str]):
+    conn = get_connection()
+    with conn:
+        conn.executemany(SQL_SAVE_ARCADE, ((name,) for name in names))
+
+
+async def load_arcade_names() -> List[str]:
+    """
+    @Author: TurboServlet
+    @Func: load_arcade_names()
+    @Description: 读取已记录的全部机厅名称
+    @Return: List[str]
+    """
+    return await run_in_db_thread(_load_arcade_names)
+
+
+async def save_arcade_names(names: List[str]):
+    """
+    @Author: TurboServlet
+    @Func: save_arcade_names()
+    @Description: 记录机厅名称，已存在的名称会被忽略
+    @Param {List[str]} names: 机厅名称
+    """
+    await run_in_db_thread(_save_arcade_names, list(names))
+
+
+def _load_watches() -> List[Tuple[str, str, str, str, str]]:
+    return get_connection().execute(SQL_LOAD_WATCHES).fetchall()
+
+
+def _add_watch(arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_ADD_WATCH, (arcade_name, target_type, target_id, bot_id, qqid))
+
+
+def _remove_watch(arcade_name: str, target_type: str, target_id: str):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_REMOVE_WATCH, (arcade_name, target_type, target_id))
+
+
+async def load_watch_rows() -> List[Tuple[str, str, str, str, str]]:
+    """
+    @Author: TurboServlet
+    @Func: load_watch_rows()
+    @Description: 读取全部机厅关注记录
+    @Return: List[(机厅名称, 目标类型, 目标ID, Bot ID, QQID)]
+    """
+    return await run_in_db_thread(_load_watches)
+
+
+async def save_watch(arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+    """
+    @Author: TurboServlet
+    @Func: save_watch()
+    @Description: 写入一条机厅关注记录，同一目标重复关注时覆盖
+    """
+    await run_in_db_thread(_add_watch, arcade_name, target_type, target_id, bot_id, qqid)
+
+
+async def delete_watch(arcade_name: str, target_type: str, target_id: str):
+    """
+    @Author: TurboServlet
+    @Func: delete_watch()
+    @Description: 删除一条机厅关注记录
+    """
+    await run_in_db_thread(_remove_watch, arcade_name, target_type, target_id)
+
+
+def _record_network_sample(timestamp: int, exception_rate: float, zlib_skipped: float, retention: Dict[int, int]):
+    conn = get_connection()
+    with conn:
+        for resolution, keep_seconds in retention.items():
+            conn.execute(SQL_RECORD_NETWORK_SAMPLE, (resolution, timestamp - timestamp % resolution, exception_rate, zlib_skipped))
+            conn.execute(SQL_PRUNE_NETWORK_SERIES, (resolution, timestamp - keep_seconds))
+
+
+def _load_network_series(resolution: int, since: int) -> List[Tuple[int, float, float]]:
+    return get_connection().execute(SQL_LOAD_NETWORK_SERIES, (resolution, since)).fetchall()
+
+
+async def record_network_sample(timestamp: int, exception_rate: float, zlib_skipped: float, retention: Dict[int, int]):
+    """
+    @Author: TurboServlet
+    @Func: record_network_sample()
+    @Description: 将一次网络统计写入各个粒度的聚合桶，并删除超出保留期的旧桶
+    @Param {int} timestamp: 采样时间（Unix 秒）
+    @Param {float} exception_rate: 异常请求占比
+    @Param {float} zlib_skipped: Z-LIB 跳过数量
+    @Param {dict} retention: 聚合粒度（秒）-> 保留时长（秒）
+    """
+    await run_in_db_thread(_record_network_sample, timestamp, exception_rate, zlib_skipped, retention)
+
+
+async def load_network_series(resolution: int, since: int) -> List[Tuple[int, float, float]]:
+    """
+    @Author: TurboServlet
+    @Func: load_network_series()
+    @Description: 按时间顺序读取某一粒度下的网络统计聚合
+    @Param {int} resolution: 聚合粒度（秒）
+    @Param {int} since: 起始时间（Unix 秒）
+    @Return: List[(桶起始时间, 异常请求占比, Z-LIB 跳过数量)]
+    """
+    return await run_in_db_thread(_load_network_series, resolution, since)
+
+
+def _load_ticket_catalog() -> Tuple[Optional[str], Dict[int, str]]:
+    version = None
+    entries: Dict[int, str] = {}
+    for ticket_id, description, row_version in get_connection().execute(SQL_LOAD_TICKET_CATALOG):
+        entries[ticket_id] = description
+        version = row_version
+    return version, entries
+
+
+def _save_ticket_catalog(version: str, entries: Dict[int, str]):
+    conn = get_connection()
+    with conn:
+        conn.execute(SQL_CLEAR_TICKET_CATALOG)
+        conn.executemany(SQL_SAVE_TICKET, ((ticket_id, description, version) for ticket_id, description in entries.items()))
+
+
+async def load_ticket_catalog() -> Tuple[Optional[str], Dict[int, str]]:
+    """
+    @Author: TurboServlet
+    @Func: load_ticket_catalog()
+    @Description: 读取本地保存的功能票目录
+    @Return: (版本号, 功能票ID -> 描述)，没有保存过时版本号为 None
+    """
+    return await run_in_db_thread(_load_ticket_catalog)
+
+
+async def save_ticket_catalog(version: str, entries: Dict[int, str]):
+    """
+    @Author: TurboServlet
+    @Func: save_ticket_catalog()
+    @Description: 在同一事务中用新版本替换本地保存的功能票目录
+    @Param {str} version: 目录版本号
+    @Param {dict} entries: 功能票ID -> 描述
+    """
+    await run_in_db_thread(_save_ticket_catalog, version, dict(entries))
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..config import Config
+
+plugin_config = Config()
+
+
+async def fan_out(
+    calls: Dict[str, Callable[[], Awaitable[Any]]],
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+    """
+    @Author: TurboServlet
+    @Func: fan_out()
+    @Description: 在同一个截止时间内并发执行多个接口调用，返回部分结果；超时未完成的调用会被取消并记为 TimeoutError
+    @Param {dict} calls: 名称 -> 返回协程的无参函数
+    @Param {Optional[float]} timeout: 截止时间（秒），默认使用 fanout_timeout
+    @Return: (成功结果字典, 失败异常字典)
+    """
+    if timeout is None:
+        timeout = plugin_config.fanout_timeout
+    tasks = {name: asyncio.ensure_future(call()) for name, call in calls.items()}
+    if not tasks:
+        return {}, {}
+
+    try:
+        await asyncio.wait(tasks.values(), timeout=timeout)
+    except asyncio.CancelledError:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            errors[name] = asyncio.TimeoutError(f"{name} 在 {timeout} 秒内未完成")
+        elif task.cancelled():
+            errors[name] = asyncio.CancelledError()
+        elif task.exception() is not None:
+            errors[name] = task.exception()
+        else:
+            results[name] = task.result()
+    return results, errors
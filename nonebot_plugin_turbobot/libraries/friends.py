@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Dict, List, Set, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .api_client import turbo_api
+from .concurrency import PRIORITY_BACKGROUND, request_priority
+from .fanout import fan_out
+
+plugin_config = Config()
+
+_prefetch_tasks: Set[asyncio.Task] = set()
+
+
+async def _prefetch(bot_key: str, page: int):
+    # 预取只是猜测用户会翻页，以后台优先级排队，不占用交互请求的并发名额
+    request_priority.set(PRIORITY_BACKGROUND)
+    try:
+        await turbo_api.show_friends(bot_key, page)
+    except Exception as e:
+        logger.debug(f"预取好友列表第 {page} 页失败：{e!r}")
+
+
+def prefetch_friends_page(bot_key: str, page: int):
+    """
+    @Author: TurboServlet
+    @Func: prefetch_friends_page()
+    @Description: 在后台预取好友列表的指定页，结果进入响应缓存供下一次翻页使用
+    @Param {str} bot_key: 用户的bot_key
+    @Param {int} page: 页码
+    """
+    if not plugin_config.friends_prefetch_enabled:
+        return
+    task = asyncio.create_task(_prefetch(bot_key, page))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+
+
+async def fetch_all_friends(bot_key: str) -> Tuple[List[Dict[str, Any]], int, List[int]]:
+    """
+    @Author: TurboServlet
+    @Func: fetch_all_friends()
+    @Description: 获取第一页得到总页数后，在并发上限内同时获取其余页面并按页码合并
+    @Param {str} bot_key: 用户的bot_key
+    @Return: (好友列表, 好友总数, 获取失败的页码)
+    """
+    first_page = await turbo_api.show_friends(bot_key, 1)
+    total_pages = first_page.get("totalPages", 0)
+    total_elements = first_page.get("totalElements", 0)
+    pages: Dict[int, List[Dict[str, Any]]] = {1: first_page.get("content", [])}
+
+    semaphore = asyncio.Semaphore(plugin_config.friends_fetch_concurrency)
+
+    async def fetch_page(page: int) -> List[Dict[str, Any]]:
+        async with semaphore:
+            friends_data = await turbo_api.show_friends(bot_key, page)
+        return friends_data.get("content", [])
+
+    results, errors = await fan_out(
+        {str(page): (lambda page=page: fetch_page(page)) for page in range(2, total_pages + 1)}
+    )
+    for page, content in results.items():
+        pages[int(page)] = content
+
+    friends = [friend for page in sorted(pages) for friend in pages[page]]
+    return friends, total_elements, sorted(int(page) for page in errors)
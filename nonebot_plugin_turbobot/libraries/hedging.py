@@ -0,0 +1,94 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from ..config import Config
+
+plugin_config = Config()
+
+# 每个接口保留的最近延迟样本数
+LATENCY_WINDOW = 256
+# 每新增多少个样本重新计算一次分位数
+RECOMPUTE_EVERY = 16
+
+
+class LatencyTracker:
+    """
+    @Author: TurboServlet
+    @Description: 按接口记录最近的请求延迟，定期计算指定分位数，用作对冲请求的触发延迟
+    """
+
+    def __init__(self, percentile: float, min_samples: int):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._quantiles: Dict[str, float] = {}
+        self._pending: Dict[str, int] = {}
+
+    def observe(self, path: str, latency: float):
+        samples = self._samples.get(path)
+        if samples is None:
+            samples = self._samples[path] = deque(maxlen=LATENCY_WINDOW)
+        samples.append(latency)
+        pending = self._pending.get(path, 0) + 1
+        if pending >= RECOMPUTE_EVERY or path not in self._quantiles:
+            pending = 0
+            if len(samples) >= self.min_samples:
+                ordered = sorted(samples)
+                self._quantiles[path] = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        self._pending[path] = pending
+
+    def quantile(self, path: str) -> Optional[float]:
+        """
+        @Author: TurboServlet
+        @Func: quantile()
+        @Description: 获取接口延迟的分位数，样本不足时返回 None
+        @Param {str} path: 接口路径
+        @Return: Optional[float]
+        """
+        return self._quantiles.get(path)
+
+    def stats(self) -> Dict[str, float]:
+        return dict(self._quantiles)
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[Any]],
+    backup: Callable[[], Awaitable[Any]],
+    delay: float,
+    allow_backup: Callable[[], bool],
+) -> Tuple[Any, bool]:
+    """
+    @Author: TurboServlet
+    @Func: hedged()
+    @Description: 先发出主请求，delay 秒内未完成且 allow_backup 允许时再发出一个对冲请求，
+                  使用最先成功的结果并取消另一个；两个请求都失败时抛出主请求的异常
+    @Param {Callable} primary: 主请求
+    @Param {Callable} backup: 对冲请求
+    @Param {float} delay: 发出对冲请求前等待的时间（秒）
+    @Param {Callable} allow_backup: 到达 delay 时判断是否发出对冲请求，如检查对冲预算
+    @Return: (结果, 是否由对冲请求返回)
+    """
+    first = asyncio.ensure_future(primary())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and allow_backup():
+            tasks.append(asyncio.ensure_future(backup()))
+
+        failed = []
+        while tasks:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda task: task is not first):
+                if task.exception() is None:
+                    return task.result(), task is not first
+                failed.append(task)
+            tasks = list(pending)
+        raise min(failed, key=lambda task: task is not first).exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+latency_tracker = LatencyTracker(plugin_config.hedge_percentile, plugin_config.hedge_min_samples)
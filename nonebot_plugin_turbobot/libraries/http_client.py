@@ -0,0 +1,96 @@
+import importlib.util
+from typing import Optional
+
+import httpx
+from nonebot import logger
+
+from ..config import Config
+
+plugin_config = Config()
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _accept_encoding() -> str:
+    """
+    @Author: TurboServlet
+    @Func: _accept_encoding()
+    @Description: 根据已安装的解码库生成 Accept-Encoding 请求头
+    @Return: str
+    """
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    if importlib.util.find_spec("zstandard"):
+        encodings.append("zstd")
+    return ", ".join(encodings)
+
+
+def _http2_available() -> bool:
+    """
+    @Author: TurboServlet
+    @Func: _http2_available()
+    @Description: 检查是否启用并安装了 HTTP/2 支持
+    @Return: bool
+    """
+    if not plugin_config.http2_enabled:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("已启用 http2_enabled 但未安装 h2，将回退到 HTTP/1.1（可通过 pip install httpx[http2] 安装）")
+        return False
+    return True
+
+
+def _create_client() -> httpx.AsyncClient:
+    """
+    @Author: TurboServlet
+    @Func: _create_client()
+    @Description: 创建带连接池的共享 HTTP 客户端
+    @Return: httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=plugin_config.http_max_connections,
+        max_keepalive_connections=plugin_config.http_max_keepalive_connections,
+        keepalive_expiry=plugin_config.http_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=_http2_available(),
+        headers={"Accept-Encoding": _accept_encoding()},
+    )
+
+
+async def init_http_client():
+    """
+    @Author: TurboServlet
+    @Func: init_http_client()
+    @Description: 在驱动启动时创建共享 HTTP 客户端
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+
+
+async def close_http_client():
+    """
+    @Author: TurboServlet
+    @Func: close_http_client()
+    @Description: 在驱动关闭时释放共享 HTTP 客户端及其连接池
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    @Author: TurboServlet
+    @Func: get_http_client()
+    @Description: 获取插件共享的 HTTP 客户端，若尚未初始化则立即创建
+    @Return: httpx.AsyncClient
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
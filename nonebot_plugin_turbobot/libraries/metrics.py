@@ -0,0 +1,186 @@
+import bisect
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from nonebot import get_driver, logger
+from nonebot.drivers import URL, ASGIMixin, HTTPServerSetup, Request, Response
+
+from ..config import Config
+
+plugin_config = Config()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    @Author: TurboServlet
+    @Description: 指标基类。每组标签对应一个独立的累加器，只在事件循环线程（或唯一的数据库线程）中写入，不需要加锁
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float):
+        self._values[labels] = value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数..., 超出最大桶的计数, 总和]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, *labels: str, value: float):
+        """
+        @Author: TurboServlet
+        @Func: observe()
+        @Description: 记录一次观测值，只增加所在桶的计数，导出时再累加为 Prometheus 的累计桶
+        @Param {float} value: 观测值（秒）
+        """
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _samples(self) -> Iterable[str]:
+        for labels, counts in list(self._values.items()):
+            counts = list(counts)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+COMMAND_DURATION = Histogram("turbobot_command_duration_seconds", "指令处理耗时", ("command",))
+COMMANDS_IN_FLIGHT = Gauge("turbobot_commands_in_flight", "正在处理的指令数", ("command",))
+COMMANDS_RATE_LIMITED = Counter("turbobot_commands_rate_limited_total", "被限流的指令数", ("command",))
+UPSTREAM_REQUESTS = Counter("turbobot_upstream_requests_total", "Turbo API 请求数（按接口与状态码）", ("endpoint", "status"))
+UPSTREAM_DURATION = Histogram("turbobot_upstream_duration_seconds", "Turbo API 单次请求耗时", ("endpoint",))
+UPSTREAM_IN_FLIGHT = Gauge("turbobot_upstream_in_flight", "正在进行的 Turbo API 请求数")
+UPSTREAM_CONCURRENCY_LIMIT = Gauge("turbobot_upstream_concurrency_limit", "Turbo API 请求的自适应并发上限")
+UPSTREAM_QUEUED = Gauge("turbobot_upstream_queued", "等待并发名额的 Turbo API 请求数")
+UPSTREAM_SHED = Counter("turbobot_upstream_shed_total", "因等待队列已满被拒绝的 Turbo API 请求数")
+UPSTREAM_HEDGES = Counter("turbobot_upstream_hedges_total", "Turbo API 对冲请求数（sent 为发出，won 为先于主请求返回）", ("endpoint", "outcome"))
+COMMANDS_SHED = Counter("turbobot_commands_shed_total", "上游过载时在处理前被拒绝的指令数", ("command",))
+COMMANDS_FORBIDDEN = Counter("turbobot_commands_forbidden_total", "按权限快照在本地拒绝的指令数", ("command",))
+DB_QUERY_DURATION = Histogram(
+    "turbobot_db_query_duration_seconds",
+    "SQLite 操作耗时（不含排队时间）",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+_registry: List[_Metric] = [
+    COMMAND_DURATION,
+    COMMANDS_IN_FLIGHT,
+    COMMANDS_RATE_LIMITED,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_DURATION,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_QUEUED,
+    UPSTREAM_SHED,
+    UPSTREAM_HEDGES,
+    COMMANDS_SHED,
+    COMMANDS_FORBIDDEN,
+    DB_QUERY_DURATION,
+]
+
+
+def render_metrics() -> str:
+    """
+    @Author: TurboServlet
+    @Func: render_metrics()
+    @Description: 以 Prometheus 文本格式导出所有指标
+    @Return: str
+    """
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics(request: Request) -> Response:
+    return Response(
+        200,
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        content=render_metrics(),
+    )
+
+
+def setup_metrics_route():
+    """
+    @Author: TurboServlet
+    @Func: setup_metrics_route()
+    @Description: 在驱动的 ASGI 应用上挂载指标路由，驱动不支持 HTTP 服务时跳过
+    """
+    if not plugin_config.metrics_enabled:
+        return
+    driver = get_driver()
+    if not isinstance(driver, ASGIMixin):
+        logger.info("当前驱动不支持 HTTP 服务，未挂载指标路由")
+        return
+    driver.setup_http_server(
+        HTTPServerSetup(URL(plugin_config.metrics_path), "GET", "turbobot_metrics", _handle_metrics)
+    )
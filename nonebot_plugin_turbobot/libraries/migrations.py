@@ -0,0 +1,106 @@
+import sqlite3
+from typing import Callable, List, Tuple
+
+from nonebot import logger
+
+
+def _execute_all(*statements: str) -> Callable[[sqlite3.Connection], None]:
+    def apply(conn: sqlite3.Connection):
+        for statement in statements:
+            conn.execute(statement)
+    return apply
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection):
+    # auto_vacuum 模式只有在 VACUUM 之后才会对已有数据库生效，VACUUM 不能在事务中执行
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+
+
+# (版本号, 说明, 迁移函数, 是否在事务中执行)，版本号保存在 PRAGMA user_version 中
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None], bool]] = [
+    (1, "创建用户绑定表", _execute_all(
+        'CREATE TABLE IF NOT EXISTS user (QQID TEXT, bot_token TEXT, bot_key TEXT, bind_time TEXT)',
+    ), True),
+    (2, "以 QQID 为主键重建用户绑定表，绑定时间改为 Unix 秒", _execute_all(
+        '''
+        CREATE TABLE user_v2 (
+            QQID TEXT PRIMARY KEY NOT NULL,
+            bot_token TEXT NOT NULL,
+            bot_key TEXT NOT NULL,
+            bind_time INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        # 旧表没有唯一约束，同一 QQID 存在多条记录时保留最后绑定的一条
+        '''
+        INSERT OR REPLACE INTO user_v2 (QQID, bot_token, bot_key, bind_time)
+        SELECT QQID, COALESCE(bot_token, ''), COALESCE(bot_key, ''),
+               COALESCE(CAST(strftime('%s', bind_time, 'utc') AS INTEGER), 0)
+        FROM user WHERE QQID IS NOT NULL ORDER BY bind_time
+        ''',
+        'DROP TABLE user',
+        'ALTER TABLE user_v2 RENAME TO user',
+    ), True),
+    (3, "创建机厅索引、机厅关注与网络统计表", _execute_all(
+        'CREATE TABLE IF NOT EXISTS arcade (name TEXT PRIMARY KEY)',
+        '''
+        CREATE TABLE IF NOT EXISTS watch (
+            arcade_name TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id TEXT NOT NULL,
+            bot_id TEXT NOT NULL,
+            qqid TEXT NOT NULL,
+            PRIMARY KEY (arcade_name, target_type, target_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS network_series (
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            samples INTEGER NOT NULL,
+            exception_rate REAL NOT NULL,
+            zlib_skipped REAL NOT NULL,
+            PRIMARY KEY (resolution, bucket)
+        ) WITHOUT ROWID
+        ''',
+    ), True),
+    (4, "启用增量 VACUUM", _enable_incremental_vacuum, False),
+    (5, "创建功能票目录表", _execute_all(
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_catalog (
+            ticket_id INTEGER PRIMARY KEY NOT NULL,
+            description TEXT NOT NULL,
+            version TEXT NOT NULL
+        ) WITHOUT ROWID
+        ''',
+    ), True),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    @Author: TurboServlet
+    @Func: migrate()
+    @Description: 按版本号依次执行尚未执行的迁移，每个迁移与版本号更新在同一事务中提交
+    @Param {sqlite3.Connection} conn: 数据库连接
+    @Return: int，迁移后的版本号
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, description, apply, transactional in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"数据库迁移 {version} -> {target}：{description}")
+        if transactional:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {target}')
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        else:
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {target}')
+        version = target
+    return version
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .api_client import TurboApiError, turbo_api
+from .network_series import record_network_data
+
+plugin_config = Config()
+
+_snapshot: Optional[Tuple[Dict[str, Any], float]] = None
+_poller_task: Optional[asyncio.Task] = None
+
+
+def update_network_snapshot(network_data: Dict[str, Any]):
+    """
+    @Author: TurboServlet
+    @Func: update_network_snapshot()
+    @Description: 更新内存中的网络统计快照
+    @Param {dict} network_data: /web/showServerRequests 的响应数据
+    """
+    global _snapshot
+    _snapshot = (network_data, time.monotonic())
+
+
+def get_network_snapshot(max_age: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], float]]:
+    """
+    @Author: TurboServlet
+    @Func: get_network_snapshot()
+    @Description: 获取网络统计快照及其已存在的秒数，快照不存在或超过 max_age 时返回 None
+    @Param {Optional[float]} max_age: 允许的最大快照年龄（秒），默认使用 network_stale_after
+    @Return: Optional[(dict, float)]
+    """
+    if _snapshot is None:
+        return None
+    network_data, fetched_at = _snapshot
+    age = time.monotonic() - fetched_at
+    if age > (plugin_config.network_stale_after if max_age is None else max_age):
+        return None
+    return network_data, age
+
+
+async def refresh_network_snapshot(bot_key: str) -> bool:
+    """
+    @Author: TurboServlet
+    @Func: refresh_network_snapshot()
+    @Description: 使用指定的bot_key拉取一次网络统计，更新快照并写入时间序列
+    @Param {str} bot_key: 用于请求的bot_key
+    @Return: bool，是否成功更新
+    """
+    network_data = await turbo_api.show_server_requests(bot_key)
+    if not network_data:
+        return False
+    update_network_snapshot(network_data)
+    await record_network_data(network_data)
+    return True
+
+
+async def _poll_loop(bot_key: str):
+    while True:
+        try:
+            await refresh_network_snapshot(bot_key)
+        except asyncio.CancelledError:
+            raise
+        except TurboApiError as e:
+            logger.warning(f"网络统计拉取失败，HTTP响应状态码为 {e.status_code}")
+        except Exception as e:
+            logger.warning(f"网络统计拉取过程中出现错误：{e}")
+        await asyncio.sleep(plugin_config.network_poll_interval)
+
+
+async def start_network_poller():
+    """
+    @Author: TurboServlet
+    @Func: start_network_poller()
+    @Description: 在驱动启动时启动网络统计后台轮询，未配置 network_service_bot_key 时不启动
+    """
+    global _poller_task
+    if not plugin_config.network_service_bot_key:
+        logger.info("未配置 network_service_bot_key，网络统计将按需拉取")
+        return
+    if _poller_task is None or _poller_task.done():
+        _poller_task = asyncio.create_task(_poll_loop(plugin_config.network_service_bot_key))
+
+
+async def stop_network_poller():
+    """
+    @Author: TurboServlet
+    @Func: stop_network_poller()
+    @Description: 在驱动关闭时停止网络统计后台轮询
+    """
+    global _poller_task
+    if _poller_task is not None:
+        _poller_task.cancel()
+        try:
+            await _poller_task
+        except asyncio.CancelledError:
+            pass
+        _poller_task = None
@@ -0,0 +1,125 @@
+import math
+import time
+from itertools import accumulate
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from ..config import Config
+from .db_utils import load_network_series, record_network_sample
+
+plugin_config = Config()
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - numpy 为可选依赖
+    np = None
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+RESOLUTION_NAMES = {MINUTE: "分钟", HOUR: "小时", DAY: "天"}
+
+PERCENTILES = (50, 90, 99)
+
+
+def get_retention() -> Dict[int, int]:
+    """
+    @Author: TurboServlet
+    @Func: get_retention()
+    @Description: 获取各聚合粒度的保留时长
+    @Return: dict，聚合粒度（秒）-> 保留时长（秒）
+    """
+    return {
+        MINUTE: int(plugin_config.network_minute_retention_days * DAY),
+        HOUR: int(plugin_config.network_hour_retention_days * DAY),
+        DAY: int(plugin_config.network_day_retention_days * DAY),
+    }
+
+
+def pick_resolution(window: int) -> int:
+    """
+    @Author: TurboServlet
+    @Func: pick_resolution()
+    @Description: 选择能覆盖整个时间窗口的最细聚合粒度
+    @Param {int} window: 时间窗口（秒）
+    @Return: int，聚合粒度（秒）
+    """
+    for resolution, keep_seconds in get_retention().items():
+        if window <= keep_seconds:
+            return resolution
+    return DAY
+
+
+async def record_network_data(network_data: Dict[str, Any], timestamp: Optional[int] = None):
+    """
+    @Author: TurboServlet
+    @Func: record_network_data()
+    @Description: 记录一次 /web/showServerRequests 的统计结果
+    @Param {dict} network_data: 网络统计数据
+    @Param {Optional[int]} timestamp: 采样时间（Unix 秒），默认为当前时间
+    """
+    await record_network_sample(
+        int(time.time()) if timestamp is None else timestamp,
+        float(network_data.get("exceptionRequestsRate", 0)),
+        float(network_data.get("zlibSkippedRequestsCount", 0)),
+        get_retention(),
+    )
+
+
+def _percentile(sorted_values: Sequence[float], percent: float) -> float:
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values: Sequence[float], window: int) -> Dict[str, Any]:
+    """
+    @Author: TurboServlet
+    @Func: summarize()
+    @Description: 计算序列的分位数、均值与移动平均；安装 numpy 时使用向量化计算
+    @Param {Sequence[float]} values: 按时间排序的数值
+    @Param {int} window: 移动平均的点数
+    @Return: dict，包含 percentiles、mean、moving_average（最近一个移动平均值）与 moving_average_max
+    """
+    window = max(1, min(window, len(values)))
+    if np is not None:
+        array = np.asarray(values, dtype=float)
+        cumulative = np.cumsum(np.insert(array, 0, 0.0))
+        moving = (cumulative[window:] - cumulative[:-window]) / window
+        return {
+            "percentiles": dict(zip(PERCENTILES, np.percentile(array, PERCENTILES).tolist())),
+            "mean": float(array.mean()),
+            "moving_average": float(moving[-1]),
+            "moving_average_max": float(moving.max()),
+        }
+
+    ordered = sorted(values)
+    cumulative = [0.0, *accumulate(values)]
+    moving = [(cumulative[i] - cumulative[i - window]) / window for i in range(window, len(cumulative))]
+    return {
+        "percentiles": {percent: _percentile(ordered, percent) for percent in PERCENTILES},
+        "mean": cumulative[-1] / len(values),
+        "moving_average": moving[-1],
+        "moving_average_max": max(moving),
+    }
+
+
+async def get_network_trend(window: int) -> Optional[Tuple[int, int, Dict[str, Dict[str, Any]]]]:
+    """
+    @Author: TurboServlet
+    @Func: get_network_trend()
+    @Description: 统计时间窗口内异常请求占比与 Z-LIB 跳过数量的趋势
+    @Param {int} window: 时间窗口（秒）
+    @Return: (聚合粒度, 数据点数, 指标名 -> 统计结果)，窗口内没有数据时返回 None
+    """
+    resolution = pick_resolution(window)
+    rows = await load_network_series(resolution, int(time.time()) - window)
+    if not rows:
+        return None
+    _, exception_rates, zlib_skipped = zip(*rows)
+    moving_window = plugin_config.network_trend_moving_average
+    return resolution, len(rows), {
+        "exceptionRequestsRate": summarize(exception_rates, moving_window),
+        "zlibSkippedRequestsCount": summarize(zlib_skipped, moving_window),
+    }
@@ -0,0 +1,179 @@
+import asyncio
+import html
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from ..permission.models import UserPermission
+from .api_client import TurboApiError, turbo_api
+from .cache import MISSING, LRUCache, SingleFlight, TTLCache
+from .concurrency import PRIORITY_BACKGROUND, request_priority
+from .fanout import fan_out
+from .response_cache import invalidate
+from .storage import get_bot_key
+
+plugin_config = Config()
+
+PERMISSION_ENDPOINTS = ('/permission/showPermission', '/web/showTurboPermission')
+# 这些指令不经过权限快照检查：绑定与解绑不依赖 Turbo 权限，/showPermission 本身会刷新快照
+UNGATED_COMMANDS = {"bind", "unbind", "showPermission"}
+# 上游返回这些状态码说明快照可能已经过时
+DISAGREEMENT_STATUS_CODES = {403, 410}
+# 同一用户两次因上游拒绝而尝试刷新快照的最短间隔（秒），与刷新是否成功无关
+MIN_REFRESH_INTERVAL = 30.0
+
+
+class PermissionSnapshot:
+    """
+    @Author: TurboServlet
+    @Description: 用户权限快照：/permission/showPermission 返回的权限级别与 /web/showTurboPermission 返回的详细权限
+    """
+
+    __slots__ = ("permission", "permissions", "fetched_at")
+
+    def __init__(self, permission: UserPermission, permissions: Optional[Dict[str, bool]]):
+        self.permission = permission
+        # 详细权限描述 -> 是否授予，获取失败时为 None
+        self.permissions = permissions
+        self.fetched_at = time.monotonic()
+
+    @property
+    def banned(self) -> bool:
+        return self.permission.permission == "BANNED"
+
+    def denies(self, required: str) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: denies()
+        @Description: 详细权限中明确未授予 required 时返回 True；详细权限未知或不包含该项时交给上游判断
+        @Param {str} required: 详细权限描述
+        @Return: bool
+        """
+        return self.permissions is not None and self.permissions.get(required) is False
+
+    def granted(self) -> Tuple[str, ...]:
+        return tuple(name for name, is_granted in (self.permissions or {}).items() if is_granted)
+
+
+# bot_key -> 权限快照
+_snapshots: "TTLCache[str, PermissionSnapshot]" = TTLCache(plugin_config.permission_snapshot_size)
+_in_flight: "SingleFlight[str, Tuple[PermissionSnapshot, Optional[BaseException]]]" = SingleFlight()
+_refresh_tasks: Set[asyncio.Task] = set()
+# bot_key -> 上一次因上游拒绝而尝试刷新的时间，没有快照或刷新一直失败时也能限制刷新频率
+_refresh_attempts: "LRUCache[str, float]" = LRUCache(plugin_config.permission_snapshot_size)
+
+
+async def _fetch(bot_key: str) -> Tuple[PermissionSnapshot, Optional[BaseException]]:
+    # 详细权限接口带有响应缓存，刷新快照时需要绕过
+    invalidate('/web/showTurboPermission', bot_key)
+    try:
+        return await _fetch_snapshot(bot_key)
+    except BaseException:
+        # 刷新失败时丢弃旧快照，之后的指令交给上游判断，不会因过时的封禁状态一直被拒绝
+        _snapshots.pop(bot_key)
+        raise
+
+
+async def _fetch_snapshot(bot_key: str) -> Tuple[PermissionSnapshot, Optional[BaseException]]:
+    results, errors = await fan_out({
+        "permission": lambda: turbo_api.show_permission(bot_key),
+        "turbo": lambda: turbo_api.show_turbo_permission(bot_key),
+    })
+
+    level_error = errors.get("permission")
+    if isinstance(level_error, TurboApiError) and level_error.status_code == 410:
+        level = "BANNED"
+    elif level_error is not None:
+        raise level_error
+    else:
+        level = results["permission"]
+
+    permissions = None
+    if results.get("turbo"):
+        permissions = {
+            html.unescape(item.get("permissionDescription", "未知权限")): bool(item.get("isGranted", False))
+            for item in results["turbo"]
+        }
+    snapshot = PermissionSnapshot(UserPermission(permission=level), permissions)
+    _snapshots.set(bot_key, snapshot, ttl=plugin_config.permission_snapshot_ttl)
+    return snapshot, errors.get("turbo")
+
+
+async def refresh_permission_snapshot(bot_key: str) -> Tuple[PermissionSnapshot, Optional[BaseException]]:
+    """
+    @Author: TurboServlet
+    @Func: refresh_permission_snapshot()
+    @Description: 从上游重新获取权限级别与详细权限并更新快照，并发的刷新会被合并；
+                  权限级别接口返回 410 时记为封禁
+    @Param {str} bot_key: 用户的bot_key
+    @Return: (权限快照, 获取详细权限时的错误)
+    """
+    return await _in_flight.do(bot_key, lambda: _fetch(bot_key))
+
+
+def get_permission_snapshot(bot_key: str) -> Optional[PermissionSnapshot]:
+    snapshot = _snapshots.get(bot_key)
+    return None if snapshot is MISSING else snapshot
+
+
+def get_permission_snapshot_stats() -> dict:
+    return _snapshots.stats()
+
+
+async def check_command_permission(command: str, qqid: str) -> Optional[str]:
+    """
+    @Author: TurboServlet
+    @Func: check_command_permission()
+    @Description: 按权限快照在本地检查用户能否执行指令，没有快照时放行，由上游判断
+    @Param {str} command: 指令名称
+    @Param {str} qqid: 用户QQID
+    @Return: 拒绝时的回复消息，放行时为 None
+    """
+    if command in UNGATED_COMMANDS:
+        return None
+    bot_key = await get_bot_key(qqid)
+    snapshot = get_permission_snapshot(bot_key) if bot_key else None
+    if snapshot is None:
+        return None
+    if snapshot.banned:
+        return "该用户已被封禁，请联系管理员。"
+    required = plugin_config.command_required_permissions.get(command)
+    if required and snapshot.denies(required):
+        return f"权限不足，您尚未获得「{required}」权限。"
+    return None
+
+
+async def _refresh_quietly(bot_key: str):
+    request_priority.set(PRIORITY_BACKGROUND)
+    try:
+        await refresh_permission_snapshot(bot_key)
+    except Exception as e:
+        logger.debug(f"刷新权限快照失败：{e!r}")
+
+
+def _on_upstream_status(path: str, bot_key: Optional[str], status_code: int):
+    if not bot_key or path in PERMISSION_ENDPOINTS:
+        return
+    if status_code == 200:
+        # 上游接受了快照中被封禁用户的请求（如解封后关注轮询使用其 bot_key），丢弃快照
+        snapshot = get_permission_snapshot(bot_key)
+        if snapshot is not None and snapshot.banned:
+            _snapshots.pop(bot_key)
+        return
+    if status_code not in DISAGREEMENT_STATUS_CODES:
+        return
+
+    # 上游以 403 / 410 拒绝说明快照缺失或已经过时，在后台刷新，之后的指令可以在本地拒绝
+    now = time.monotonic()
+    last_attempt = _refresh_attempts.get(bot_key)
+    if last_attempt is not MISSING and now - last_attempt < MIN_REFRESH_INTERVAL:
+        return
+    _refresh_attempts.set(bot_key, now)
+    task = asyncio.create_task(_refresh_quietly(bot_key))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+turbo_api.add_status_listener(_on_upstream_status)
@@ -0,0 +1,67 @@
+from typing import List, Optional, Tuple
+
+from ..config import Config
+from .cache import MISSING, LRUCache
+from .storage import BucketSpec, get_storage
+
+plugin_config = Config()
+
+
+class RateLimiter:
+    """
+    @Author: TurboServlet
+    @Description: 入站指令限流器，同时检查用户、群组与全局三级令牌桶，任一不足即拒绝。
+                  限流桶由存储后端保存：SQLite 后端保存在进程内，共享后端上多个实例共用同一份额度
+    """
+
+    def __init__(self):
+        # 已经收到过限流提示的用户，在恢复正常前不再重复提示
+        self._notified: "LRUCache[str, bool]" = LRUCache(plugin_config.rate_limit_max_tracked)
+
+    def command_cost(self, command: str) -> float:
+        return plugin_config.rate_limit_command_costs.get(command, 1.0)
+
+    async def check(self, command: str, user_id: str, group_id: Optional[str] = None) -> Tuple[bool, float, bool]:
+        """
+        @Author: TurboServlet
+        @Func: check()
+        @Description: 检查并扣除令牌；只有所有桶都足够时才会扣除
+        @Param {str} command: 指令名称
+        @Param {str} user_id: 用户ID
+        @Param {Optional[str]} group_id: 群组或频道ID，私聊为 None
+        @Return: (是否放行, 需等待的秒数, 是否需要发送限流提示)
+        """
+        if not plugin_config.rate_limit_enabled:
+            return True, 0.0, False
+
+        buckets: List[BucketSpec] = [
+            (f"user:{user_id}", plugin_config.rate_limit_user_rate, plugin_config.rate_limit_user_capacity),
+            ("global", plugin_config.rate_limit_global_rate, plugin_config.rate_limit_global_capacity),
+        ]
+        if group_id:
+            buckets.append(
+                (f"group:{group_id}", plugin_config.rate_limit_group_rate, plugin_config.rate_limit_group_capacity)
+            )
+        wait = await get_storage().take_tokens(buckets, self.command_cost(command))
+
+        if wait > 0:
+            notify = self._notified.get(user_id) is MISSING
+            if notify:
+                self._notified.set(user_id, True)
+            return False, wait, notify
+        self._notified.pop(user_id)
+        return True, 0.0, False
+
+
+def get_group_id(event) -> Optional[str]:
+    """
+    @Author: TurboServlet
+    @Func: get_group_id()
+    @Description: 获取事件所在的群组或频道ID，私聊消息返回 None
+    @Param {MessageEvent} event: 消息事件
+    @Return: Optional[str]
+    """
+    return getattr(event, "group_openid", None) or getattr(event, "channel_id", None)
+
+
+rate_limiter = RateLimiter()
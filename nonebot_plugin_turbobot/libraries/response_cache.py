@@ -0,0 +1,164 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+
+from ..config import Config
+from .cache import MISSING, LRUCache, SingleFlight, TTLCache
+
+plugin_config = Config()
+
+# 可缓存的只读接口：路径 -> (TTL 秒数, 缓存键是否包含 bot_key)
+CACHEABLE_ENDPOINTS: Dict[str, Tuple[float, bool]] = {
+    '/web/showServerRequests': (plugin_config.cache_ttl_server_requests, False),
+    '/web/arcadeInfoDetail': (plugin_config.cache_ttl_arcade_info, True),
+    '/web/showTurboPermission': (plugin_config.cache_ttl_turbo_permission, True),
+    '/web/showFriends': (plugin_config.cache_ttl_friends, True),
+    '/web/currentTickets': (plugin_config.cache_ttl_current_tickets, True),
+}
+
+
+
+class StoredResponse:
+    """
+    @Author: TurboServlet
+    @Description: 保存的响应及其校验信息（ETag / Last-Modified），JSON 只解析一次，解析结果在多次请求之间共享，调用方不能修改
+    """
+
+    __slots__ = ("response", "etag", "last_modified", "_parsed")
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        self._parsed: Any = MISSING
+
+    def json(self) -> Any:
+        if self._parsed is MISSING:
+            self._parsed = self.response.json()
+        return self._parsed
+
+    def conditional_headers(self) -> Optional[Dict[str, str]]:
+        """
+        @Author: TurboServlet
+        @Func: conditional_headers()
+        @Description: 生成条件请求头，上游没有返回校验信息时返回 None
+        @Return: Optional[dict]
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers or None
+
+    def revalidated(self, response: httpx.Response) -> "StoredResponse":
+        """
+        @Author: TurboServlet
+        @Func: revalidated()
+        @Description: 用新的响应更新保存的响应。304 或响应体未变化时沿用已解析的对象，只更新校验信息
+        @Param {httpx.Response} response: 新的响应（200 或 304）
+        @Return: StoredResponse
+        """
+        if response.status_code == 304:
+            self.etag = response.headers.get("ETag", self.etag)
+            self.last_modified = response.headers.get("Last-Modified", self.last_modified)
+            return self
+        if response.content != self.response.content:
+            return StoredResponse(response)
+        self.response = response
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        return self
+
+
+_response_cache: "TTLCache[Hashable, StoredResponse]" = TTLCache(plugin_config.response_cache_size)
+_in_flight: "SingleFlight[Hashable, StoredResponse]" = SingleFlight()
+# TTL 过期或被 invalidate 后仍然保留的响应，用于发送条件请求并在未变化时复用解析结果
+_response_store: "LRUCache[Hashable, StoredResponse]" = LRUCache(plugin_config.response_store_size)
+_not_modified = 0
+_unchanged = 0
+
+
+def _make_key(path: str, params: Optional[Dict[str, Any]], bot_key: Optional[str]) -> Hashable:
+    """
+    @Author: TurboServlet
+    @Func: _make_key()
+    @Description: 生成缓存键，由接口路径、请求参数以及（按需）bot_key 组成
+    @Return: Hashable
+    """
+    _, per_user = CACHEABLE_ENDPOINTS.get(path, (0, True))
+    frozen_params = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return path, frozen_params, bot_key if per_user else None
+
+
+async def get_or_fetch(
+    path: str,
+    bot_key: Optional[str],
+    params: Optional[Dict[str, Any]],
+    fetch: Callable[[Optional[Dict[str, str]]], Awaitable[httpx.Response]],
+) -> StoredResponse:
+    """
+    @Author: TurboServlet
+    @Func: get_or_fetch()
+    @Description: 读取只读接口的缓存响应，未命中时调用 fetch 获取；成功的响应按接口 TTL 缓存，并发的相同请求只会向上游发送一次。
+                  之前保存过响应时发送条件请求，上游返回 304 或响应体未变化时复用已解析的对象
+    @Param {str} path: 接口路径，如 /web/currentTickets
+    @Param {Optional[str]} bot_key: 用户的bot_key
+    @Param {Optional[dict]} params: 查询参数
+    @Param {Callable} fetch: 实际发送请求的函数，参数为额外的请求头
+    @Return: StoredResponse
+    """
+    ttl, _ = CACHEABLE_ENDPOINTS.get(path, (0, True))
+    key = _make_key(path, params, bot_key)
+    cached = _response_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def fetch_and_store() -> StoredResponse:
+        global _not_modified, _unchanged
+        stored = _response_store.get(key)
+        conditional = stored is not MISSING and plugin_config.conditional_requests_enabled
+        response = await fetch(stored.conditional_headers() if conditional else None)
+        if conditional and response.status_code == 304:
+            _not_modified += 1
+        elif response.status_code != 200:
+            return StoredResponse(response)
+        if stored is MISSING:
+            stored = StoredResponse(response)
+        else:
+            previous, stored = stored, stored.revalidated(response)
+            if stored is previous and response.status_code == 200:
+                _unchanged += 1
+        _response_cache.set(key, stored, ttl)
+        _response_store.set(key, stored)
+        return stored
+
+    return await _in_flight.do(key, fetch_and_store)
+
+
+def invalidate(path: str, bot_key: Optional[str] = None):
+    """
+    @Author: TurboServlet
+    @Func: invalidate()
+    @Description: 使某接口的缓存失效，指定 bot_key 时只清除该用户的条目；保存的响应仍用于之后的条件请求
+    @Param {str} path: 接口路径
+    @Param {Optional[str]} bot_key: 用户的bot_key
+    """
+    for key in _response_cache.keys():
+        if key[0] == path and (bot_key is None or key[2] == bot_key):
+            _response_cache.pop(key)
+
+
+def get_response_cache_stats() -> dict:
+    """
+    @Author: TurboServlet
+    @Func: get_response_cache_stats()
+    @Description: 获取响应缓存的命中统计
+    @Return: dict
+    """
+    stats = _response_cache.stats()
+    stats["in_flight"] = len(_in_flight)
+    stats["stored"] = len(_response_store)
+    stats["not_modified"] = _not_modified
+    stats["unchanged"] = _unchanged
+    return stats
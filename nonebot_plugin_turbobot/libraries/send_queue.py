@@ -0,0 +1,209 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from nonebot import logger
+from nonebot.exception import ActionFailed, NetworkError
+from nonebot.matcher import current_bot, current_event
+
+from ..config import Config
+from .cache import LRUCache
+from .rate_limit import get_group_id
+from .token_bucket import TokenBucket
+
+plugin_config = Config()
+
+
+# 主动推送的目标：(目标类型, 目标ID)，目标类型为 group / channel / user
+Target = Tuple[str, str]
+
+
+class _Outgoing:
+    __slots__ = ("bot", "event", "target", "session_id", "message", "future")
+
+    def __init__(self, bot, event, message: Any, target: Optional[Target] = None):
+        self.bot = bot
+        # 回复消息时为被回复的事件，主动推送时为 None，按 target 发送
+        self.event = event
+        self.target = target
+        self.session_id = event.get_session_id() if event is not None else f"push_{bot.self_id}_{target[0]}_{target[1]}"
+        self.message = message
+        self.future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+
+
+class _Channel:
+    __slots__ = ("queue", "bucket", "worker")
+
+    def __init__(self):
+        self.queue: Deque[_Outgoing] = deque()
+        self.bucket = TokenBucket(plugin_config.send_rate_per_channel, plugin_config.send_burst)
+        self.worker: Optional[asyncio.Task] = None
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    @Author: TurboServlet
+    @Func: _is_transient()
+    @Description: 判断发送失败是否可以重试（网络错误、被限频或平台 5xx）
+    @Param {Exception} error: 发送时抛出的异常
+    @Return: bool
+    """
+    if isinstance(error, NetworkError):
+        return True
+    if isinstance(error, ActionFailed):
+        status_code = getattr(error, "status_code", None)
+        return status_code == 429 or (status_code is not None and status_code >= 500)
+    return False
+
+
+async def _send_once(item: _Outgoing, message: Any):
+    if item.event is not None:
+        await item.bot.send(item.event, message)
+        return
+    target_type, target_id = item.target
+    if target_type == "group":
+        await item.bot.send_to_group(target_id, message)
+    elif target_type == "channel":
+        await item.bot.send_to_channel(target_id, message)
+    else:
+        await item.bot.send_to_c2c(target_id, message)
+
+
+class OutboundDispatcher:
+    """
+    @Author: TurboServlet
+    @Description: 出站消息调度器，按频道排队并限速发送，合并同一会话中连续的短消息，发送失败时退避重试
+    """
+
+    def __init__(self):
+        # 有消息排队或 worker 仍在发送的频道，不受容量限制，保证每个频道同时只有一个 worker
+        self._active: Dict[str, _Channel] = {}
+        # 队列已清空的频道，保留令牌桶避免频道反复重建绕过限速，超出容量时按 LRU 淘汰
+        self._idle: "LRUCache[str, _Channel]" = LRUCache(plugin_config.rate_limit_max_tracked)
+
+    @staticmethod
+    def _channel_key(event) -> str:
+        group_id = get_group_id(event)
+        return f"group_{group_id}" if group_id else f"user_{event.get_user_id()}"
+
+    async def send(self, bot, event, message: Any):
+        """
+        @Author: TurboServlet
+        @Func: send()
+        @Description: 将消息加入所在频道的发送队列，并等待其发送完成
+        @Param {Bot} bot: 发送消息的 Bot
+        @Param {MessageEvent} event: 被回复的消息事件
+        @Param {Any} message: 消息内容
+        """
+        await self._enqueue(self._channel_key(event), _Outgoing(bot, event, message))
+
+    async def push(self, bot, target: Target, message: Any):
+        """
+        @Author: TurboServlet
+        @Func: push()
+        @Description: 主动向目标发送消息（如机厅关注推送），与同一群、频道或用户的回复共用发送队列与限速
+        @Param {Bot} bot: 发送消息的 Bot
+        @Param {Target} target: (目标类型, 目标ID)，目标类型为 group / channel / user
+        @Param {Any} message: 消息内容
+        """
+        target_type, target_id = target
+        # 与 _channel_key() 的规则一致：群与子频道按群组键，私聊按用户键
+        key = f"user_{target_id}" if target_type == "user" else f"group_{target_id}"
+        await self._enqueue(key, _Outgoing(bot, None, message, target))
+
+    async def _enqueue(self, key: str, item: _Outgoing):
+        channel = self._active.get(key)
+        if channel is None:
+            channel = self._idle.pop(key) or _Channel()
+            self._active[key] = channel
+        channel.queue.append(item)
+        if channel.worker is None or channel.worker.done():
+            channel.worker = asyncio.create_task(self._drain(key, channel))
+        await asyncio.shield(item.future)
+
+    def _take_batch(self, channel: _Channel) -> List[_Outgoing]:
+        """
+        @Author: TurboServlet
+        @Func: _take_batch()
+        @Description: 取出队首消息，并在允许时合并其后同一会话的连续短文本消息
+        @Return: List[_Outgoing]
+        """
+        batch = [channel.queue.popleft()]
+        if not plugin_config.send_merge_enabled or not isinstance(batch[0].message, str):
+            return batch
+        length = len(batch[0].message)
+        while channel.queue:
+            candidate = channel.queue[0]
+            if candidate.session_id != batch[0].session_id or not isinstance(candidate.message, str):
+                break
+            if length + len(candidate.message) + 2 > plugin_config.send_merge_max_length:
+                break
+            length += len(candidate.message) + 2
+            batch.append(channel.queue.popleft())
+        return batch
+
+    async def _drain(self, key: str, channel: _Channel):
+        try:
+            await self._send_queued(channel)
+        finally:
+            # 队列清空后频道才转入空闲 LRU，淘汰时不会有另一个 worker 同时向该频道发送
+            if self._active.get(key) is channel and not channel.queue:
+                del self._active[key]
+                self._idle.set(key, channel)
+
+    async def _send_queued(self, channel: _Channel):
+        while channel.queue:
+            batch = self._take_batch(channel)
+            head = batch[0]
+            message = "\n\n".join(item.message for item in batch) if len(batch) > 1 else head.message
+
+            wait = channel.bucket.retry_after(1, time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            channel.bucket.consume(1)
+
+            error = await self._deliver(head, message)
+            for item in batch:
+                if item.future.done():
+                    continue
+                if error is None:
+                    item.future.set_result(None)
+                else:
+                    item.future.set_exception(error)
+
+    async def _deliver(self, item: _Outgoing, message: Any) -> Optional[Exception]:
+        """
+        @Author: TurboServlet
+        @Func: _deliver()
+        @Description: 发送消息，遇到可重试错误时按抖动退避重试
+        @Return: 最终失败时返回异常，成功返回 None
+        """
+        attempt = 0
+        while True:
+            try:
+                await _send_once(item, message)
+                return None
+            except Exception as e:
+                if not _is_transient(e) or attempt >= plugin_config.send_max_retries:
+                    logger.warning(f"消息发送失败：{e!r}")
+                    return e
+                await asyncio.sleep(random.uniform(0, plugin_config.send_retry_backoff * (2 ** attempt)))
+                attempt += 1
+
+    def pending(self) -> int:
+        return sum(len(channel.queue) for channel in self._active.values())
+
+
+outbound = OutboundDispatcher()
+
+
+async def reply(message: Any):
+    """
+    @Author: TurboServlet
+    @Func: reply()
+    @Description: 在事件处理流程中回复当前事件，消息会经过出站调度器排队发送
+    @Param {Any} message: 消息内容
+    """
+    await outbound.send(current_bot.get(), current_event.get(), message)
@@ -0,0 +1,548 @@
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .cache import MISSING, LRUCache
+from .db_utils import (
+    delete_binding,
+    delete_watch,
+    load_bindings,
+    load_bot_key,
+    load_watch_rows,
+    plan_binding_import,
+    save_binding,
+    save_bindings,
+    save_watch,
+)
+from .token_bucket import TokenBucket
+
+plugin_config = Config()
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except ImportError:  # pragma: no cover - redis 为可选依赖
+    aioredis = None
+
+BindingRow = Tuple[str, str, str, int]
+WatchRow = Tuple[str, str, str, str, str]
+# (桶名称, 令牌补充速率, 桶容量)
+BucketSpec = Tuple[str, float, float]
+# 失效通知回调，参数为失效的键，None 表示该类数据全部失效
+InvalidationCallback = Callable[[Optional[str]], Awaitable[None]]
+
+
+class StorageBackend(ABC):
+    """
+    @Author: TurboServlet
+    @Description: 存储后端接口：绑定记录、机厅关注、限流桶、后台任务租约以及多实例之间的缓存失效通知。
+                  shared 为 True 的后端可以被多个 NoneBot 进程同时使用
+    """
+
+    name = "base"
+    shared = False
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[InvalidationCallback]] = {}
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def on_invalidate(self, kind: str, callback: InvalidationCallback):
+        """
+        @Author: TurboServlet
+        @Func: on_invalidate()
+        @Description: 注册其他实例发布失效通知时的回调
+        @Param {str} kind: 数据类型，如 binding、watch
+        @Param {InvalidationCallback} callback: 回调
+        """
+        self._callbacks.setdefault(kind, []).append(callback)
+
+    async def _dispatch_invalidation(self, kind: str, key: Optional[str]):
+        for callback in self._callbacks.get(kind, []):
+            try:
+                await callback(key)
+            except Exception as e:
+                logger.warning(f"处理 {kind} 失效通知时出现错误：{e!r}")
+
+    async def publish_invalidation(self, kind: str, key: Optional[str] = None):
+        """
+        @Author: TurboServlet
+        @Func: publish_invalidation()
+        @Description: 通知其他实例丢弃本地缓存，单实例后端不需要通知
+        @Param {str} kind: 数据类型
+        @Param {Optional[str]} key: 失效的键，None 表示全部
+        """
+
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: acquire_lease()
+        @Description: 获取或续期一个命名租约，保证后台任务只在一个实例上运行；单实例后端总是成功
+        @Param {str} name: 租约名称
+        @Param {float} ttl: 租约有效期（秒）
+        @Return: bool
+        """
+        return True
+
+    @abstractmethod
+    async def take_tokens(self, buckets: Sequence[BucketSpec], cost: float) -> float:
+        """
+        @Author: TurboServlet
+        @Func: take_tokens()
+        @Description: 从限流桶中扣除令牌，只有所有桶都足够时才扣除
+        @Param {Sequence[BucketSpec]} buckets: 需要检查的桶
+        @Param {float} cost: 需要的令牌数
+        @Return: float，需等待的秒数，0 表示已扣除
+        """
+        ...
+
+    @abstractmethod
+    async def get_bot_key(self, qqid: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def bind_user(self, qqid: str, bot_token: str, bot_key: str, bind_time: int):
+        ...
+
+    @abstractmethod
+    async def unbind_user(self, qqid: str):
+        ...
+
+    @abstractmethod
+    async def import_bindings(self, rows: List[BindingRow], policy: str) -> Tuple[int, int, int, List[str]]:
+        ...
+
+    @abstractmethod
+    async def export_bindings(self, cursor: str, limit: int) -> Tuple[List[BindingRow], Optional[str]]:
+        ...
+
+    @abstractmethod
+    async def load_watches(self) -> List[WatchRow]:
+        ...
+
+    @abstractmethod
+    async def add_watch(self, arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+        ...
+
+    @abstractmethod
+    async def remove_watch(self, arcade_name: str, target_type: str, target_id: str):
+        ...
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    @Author: TurboServlet
+    @Description: 基于本地 SQLite 数据库的存储后端，只能被单个进程使用，限流桶保存在进程内
+    """
+
+    name = "sqlite"
+
+    def __init__(self):
+        super().__init__()
+        # 用户与群组的桶共用一个 LRU，全局桶每次都会被访问，不会被淘汰
+        self._buckets: "LRUCache[str, TokenBucket]" = LRUCache(plugin_config.rate_limit_max_tracked * 2)
+
+    async def take_tokens(self, buckets: Sequence[BucketSpec], cost: float) -> float:
+        now = time.monotonic()
+        local: List[TokenBucket] = []
+        for name, rate, capacity in buckets:
+            bucket = self._buckets.get(name)
+            if bucket is MISSING:
+                bucket = TokenBucket(rate, capacity)
+                self._buckets.set(name, bucket)
+            local.append(bucket)
+
+        wait = max(bucket.retry_after(cost, now) for bucket in local)
+        if wait > 0:
+            return wait
+        for bucket in local:
+            bucket.consume(cost)
+        return 0.0
+
+    async def get_bot_key(self, qqid: str) -> Optional[str]:
+        return await load_bot_key(qqid)
+
+    async def bind_user(self, qqid: str, bot_token: str, bot_key: str, bind_time: int):
+        await save_binding(qqid, bot_token, bot_key, bind_time)
+
+    async def unbind_user(self, qqid: str):
+        await delete_binding(qqid)
+
+    async def import_bindings(self, rows: List[BindingRow], policy: str) -> Tuple[int, int, int, List[str]]:
+        return await save_bindings(rows, policy)
+
+    async def export_bindings(self, cursor: str, limit: int) -> Tuple[List[BindingRow], Optional[str]]:
+        # 以上一页最后的 QQID 作为游标，不在两页之间保持读事务
+        rows = await load_bindings(cursor, limit)
+        return rows, rows[-1][0] if len(rows) == limit else None
+
+    async def load_watches(self) -> List[WatchRow]:
+        return await load_watch_rows()
+
+    async def add_watch(self, arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+        await save_watch(arcade_name, target_type, target_id, bot_id, qqid)
+
+    async def remove_watch(self, arcade_name: str, target_type: str, target_id: str):
+        await delete_watch(arcade_name, target_type, target_id)
+
+
+class RedisStorage(StorageBackend):
+    """
+    @Author: TurboServlet
+    @Description: 基于 Redis 协议键值服务的共享存储后端，多个实例通过发布订阅互相通知缓存失效。
+                  只使用基础命令（不依赖 Lua 脚本），可以运行在 benchmarks/kv_server.py 这样的本地替身服务上
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str, prefix: str):
+        super().__init__()
+        self.url = url
+        self.prefix = prefix
+        self.instance_id = uuid.uuid4().hex
+        self._client = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    async def start(self):
+        await self.client.ping()
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _listen(self):
+        channel = self._key("invalidate")
+        reconnecting = False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                if reconnecting:
+                    # 断线期间可能错过了通知，重连后丢弃所有本地缓存
+                    for kind in list(self._callbacks):
+                        await self._dispatch_invalidation(kind, None)
+                    reconnecting = False
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.instance_id:
+                        await self._dispatch_invalidation(payload["kind"], payload.get("key"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"存储后端失效通知订阅中断，1 秒后重连：{e!r}")
+                reconnecting = True
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def publish_invalidation(self, kind: str, key: Optional[str] = None):
+        payload = json.dumps({"origin": self.instance_id, "kind": kind, "key": key})
+        await self.client.publish(self._key("invalidate"), payload)
+
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        key = self._key("lease", name)
+        ttl_ms = max(1, int(ttl * 1000))
+        if await self.client.set(key, self.instance_id, px=ttl_ms, nx=True):
+            return True
+        if await self.client.get(key) == self.instance_id:
+            await self.client.pexpire(key, ttl_ms)
+            return True
+        return False
+
+    async def take_tokens(self, buckets: Sequence[BucketSpec], cost: float) -> float:
+        # 共享桶使用固定窗口计数：窗口长度为 capacity / rate，每个窗口最多消耗 capacity 个令牌，
+        # 长期速率与令牌桶相同，只需要 SET NX、INCRBYFLOAT 与 PTTL 三个原子命令
+        pipe = self.client.pipeline(transaction=False)
+        windows = []
+        for name, rate, capacity in buckets:
+            windows.append(max(1, int(capacity / rate * 1000)))
+            key = self._key("bucket", name)
+            pipe.set(key, 0, px=windows[-1], nx=True)
+            pipe.incrbyfloat(key, cost)
+            pipe.pttl(key)
+        results = await pipe.execute()
+
+        wait = 0.0
+        for index, (_, _, capacity) in enumerate(buckets):
+            used, ttl_ms = float(results[index * 3 + 1]), results[index * 3 + 2]
+            if used > capacity:
+                wait = max(wait, (ttl_ms if ttl_ms > 0 else windows[index]) / 1000)
+        if wait > 0:
+            rollback = self.client.pipeline(transaction=False)
+            for name, _, _ in buckets:
+                rollback.incrbyfloat(self._key("bucket", name), -cost)
+            await rollback.execute()
+        return wait
+
+    async def get_bot_key(self, qqid: str) -> Optional[str]:
+        return await self.client.hget(self._key("user", qqid), "bot_key")
+
+    async def bind_user(self, qqid: str, bot_token: str, bot_key: str, bind_time: int):
+        await self.client.hset(
+            self._key("user", qqid), mapping={"bot_token": bot_token, "bot_key": bot_key, "bind_time": bind_time}
+        )
+
+    async def unbind_user(self, qqid: str):
+        await self.client.delete(self._key("user", qqid))
+
+    async def import_bindings(self, rows: List[BindingRow], policy: str) -> Tuple[int, int, int, List[str]]:
+        pipe = self.client.pipeline(transaction=False)
+        for qqid, _, _, _ in rows:
+            pipe.hget(self._key("user", qqid), "bot_key")
+        existing = {row[0]: bot_key for row, bot_key in zip(rows, await pipe.execute()) if bot_key is not None}
+        writes, inserted, updated, skipped, conflicts = plan_binding_import(rows, existing, policy)
+
+        pipe = self.client.pipeline(transaction=False)
+        for qqid, bot_token, bot_key, bind_time in writes:
+            pipe.hset(self._key("user", qqid), mapping={"bot_token": bot_token, "bot_key": bot_key, "bind_time": bind_time})
+        await pipe.execute()
+        return inserted, updated, skipped, conflicts
+
+    async def export_bindings(self, cursor: str, limit: int) -> Tuple[List[BindingRow], Optional[str]]:
+        # SCAN 游标为 0 时表示遍历完成，单页可能没有数据
+        next_cursor, keys = await self.client.scan(int(cursor or 0), match=self._key("user", "*"), count=limit)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, "bot_token", "bot_key", "bind_time")
+        rows: List[BindingRow] = []
+        user_prefix = self._key("user", "")
+        for key, (bot_token, bot_key, bind_time) in zip(keys, await pipe.execute()):
+            if bot_key is not None:
+                rows.append((key[len(user_prefix):], bot_token or "", bot_key, int(bind_time or 0)))
+        rows.sort()
+        return rows, str(next_cursor) if int(next_cursor) else None
+
+    def _watch_field(self, arcade_name: str, target_type: str, target_id: str) -> str:
+        return json.dumps([arcade_name, target_type, target_id], ensure_ascii=False)
+
+    async def load_watches(self) -> List[WatchRow]:
+        rows: List[WatchRow] = []
+        for field, value in (await self.client.hgetall(self._key("watch"))).items():
+            arcade_name, target_type, target_id = json.loads(field)
+            bot_id, qqid = json.loads(value)
+            rows.append((arcade_name, target_type, target_id, bot_id, qqid))
+        return rows
+
+    async def add_watch(self, arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+        await self.client.hset(
+            self._key("watch"), self._watch_field(arcade_name, target_type, target_id), json.dumps([bot_id, qqid])
+        )
+
+    async def remove_watch(self, arcade_name: str, target_type: str, target_id: str):
+        await self.client.hdel(self._key("watch"), self._watch_field(arcade_name, target_type, target_id))
+
+
+def _create_storage() -> StorageBackend:
+    """
+    @Author: TurboServlet
+    @Func: _create_storage()
+    @Description: 按 storage_backend 配置创建存储后端，未安装 redis 时回退到 SQLite
+    @Return: StorageBackend
+    """
+    if plugin_config.storage_backend == "redis":
+        if aioredis is not None:
+            return RedisStorage(plugin_config.storage_url, plugin_config.storage_key_prefix)
+        logger.warning("已配置 storage_backend=redis 但未安装 redis，将回退到 SQLite（可通过 pip install redis 安装）")
+    elif plugin_config.storage_backend != "sqlite":
+        logger.warning(f"未知的存储后端 {plugin_config.storage_backend}，将使用 SQLite")
+    return SQLiteStorage()
+
+
+_storage = _create_storage()
+
+# QQID -> bot_key 的进程内缓存，None 表示“未绑定”的否定缓存；共享后端上由其他实例的失效通知清除
+_bot_key_cache: "LRUCache[str, Optional[str]]" = LRUCache(plugin_config.bot_key_cache_size)
+# 每次写入或收到失效通知时递增，用于丢弃与之并发的旧读取结果
+_write_generation = 0
+
+
+def get_storage() -> StorageBackend:
+    return _storage
+
+
+async def _invalidate_binding(qqid: Optional[str]):
+    global _write_generation
+    _write_generation += 1
+    if qqid is None:
+        _bot_key_cache.clear()
+    else:
+        _bot_key_cache.pop(qqid)
+
+
+async def init_storage():
+    """
+    @Author: TurboServlet
+    @Func: init_storage()
+    @Description: 在驱动启动时连接存储后端并订阅失效通知
+    """
+    _storage.on_invalidate("binding", _invalidate_binding)
+    await _storage.start()
+    logger.info(f"存储后端：{_storage.name}")
+
+
+async def close_storage():
+    await _storage.close()
+
+
+async def is_already_bound(qqid: str) -> bool:
+    """
+    @Author: TurboServlet
+    @Func: is_already_bound()
+    @Description: 检查用户是否已经绑定
+    @Param {str} qqid: 用户QQ号
+    @Return: bool
+    """
+    return await get_bot_key(qqid) is not None
+
+
+async def get_bot_key(qqid: str) -> Optional[str]:
+    """
+    @Author: TurboServlet
+    @Func: get_bot_key()
+    @Description: 获取用户的bot_key，优先读取进程内缓存
+    @Param {str} qqid: 用户QQ号
+    @Return: Optional[str]
+    """
+    cached = _bot_key_cache.get(qqid)
+    if cached is not MISSING:
+        return cached
+    generation = _write_generation
+    bot_key = await _storage.get_bot_key(qqid)
+    if generation == _write_generation:
+        _bot_key_cache.set(qqid, bot_key)
+    return bot_key
+
+
+def get_bot_key_cache_stats() -> dict:
+    """
+    @Author: TurboServlet
+    @Func: get_bot_key_cache_stats()
+    @Description: 获取 bot_key 缓存的命中统计，用于调整缓存容量
+    @Return: dict
+    """
+    return _bot_key_cache.stats()
+
+
+async def bind_user(qqid: str, bot_token: str, bot_key: str):
+    """
+    @Author: TurboServlet
+    @Func: bind_user()
+    @Description: 绑定用户信息，并通知其他实例丢弃该用户的缓存
+    @Param {str} qqid: 用户的QQID（不是QQ号）
+    @Param {str} bot_token: 用户的bot_token
+    @Param {str} bot_key: 用户的bot_key
+    """
+    global _write_generation
+    bind_time = int(time.time())
+    _write_generation += 1
+    await _storage.bind_user(qqid, bot_token, bot_key, bind_time)
+    _bot_key_cache.set(qqid, bot_key)
+    await _storage.publish_invalidation("binding", qqid)
+
+
+async def unbind_user(qqid: str):
+    """
+    @Author: TurboServlet
+    @Func: unbind_user()
+    @Description: 解除用户绑定，并通知其他实例丢弃该用户的缓存
+    @Param {str} qqid: 用户的QQID（不是QQ号）
+    """
+    global _write_generation
+    _write_generation += 1
+    await _storage.unbind_user(qqid)
+    _bot_key_cache.set(qqid, None)
+    await _storage.publish_invalidation("binding", qqid)
+
+
+async def import_bindings(rows: List[BindingRow], policy: str) -> Tuple[int, int, int, List[str]]:
+    """
+    @Author: TurboServlet
+    @Func: import_bindings()
+    @Description: 批量写入一批绑定记录，清除相关用户的 bot_key 缓存并通知其他实例
+    @Param {List[Tuple]} rows: (QQID, bot_token, bot_key, bind_time) 列表
+    @Param {str} policy: QQID 已存在时的处理方式：skip 跳过，overwrite 覆盖，report 跳过并报告 bot_key 不同的记录
+    @Return: (新增数, 覆盖数, 跳过数, 冲突的 QQID 列表)
+    """
+    global _write_generation
+    _write_generation += 1
+    result = await _storage.import_bindings(rows, policy)
+    for row in rows:
+        _bot_key_cache.pop(row[0])
+    await _storage.publish_invalidation("binding")
+    return result
+
+
+async def export_bindings(cursor: str, limit: int) -> Tuple[List[BindingRow], Optional[str]]:
+    """
+    @Author: TurboServlet
+    @Func: export_bindings()
+    @Description: 分页读取绑定记录
+    @Param {str} cursor: 上一页返回的游标，第一页为空字符串
+    @Param {int} limit: 每页数量（共享后端上为近似值）
+    @Return: (绑定记录列表, 下一页游标)，没有下一页时游标为 None
+    """
+    return await _storage.export_bindings(cursor, limit)
+
+
+async def load_watches() -> List[WatchRow]:
+    """
+    @Author: TurboServlet
+    @Func: load_watches()
+    @Description: 读取全部机厅关注记录
+    @Return: List[(机厅名称, 目标类型, 目标ID, Bot ID, QQID)]
+    """
+    return await _storage.load_watches()
+
+
+async def add_watch(arcade_name: str, target_type: str, target_id: str, bot_id: str, qqid: str):
+    """
+    @Author: TurboServlet
+    @Func: add_watch()
+    @Description: 保存一条机厅关注记录，同一目标重复关注时覆盖，并通知其他实例
+    """
+    await _storage.add_watch(arcade_name, target_type, target_id, bot_id, qqid)
+    await _storage.publish_invalidation("watch")
+
+
+async def remove_watch(arcade_name: str, target_type: str, target_id: str):
+    """
+    @Author: TurboServlet
+    @Func: remove_watch()
+    @Description: 删除一条机厅关注记录，并通知其他实例
+    """
+    await _storage.remove_watch(arcade_name, target_type, target_id)
+    await _storage.publish_invalidation("watch")
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from nonebot import logger
+
+from ..config import Config
+from .db_utils import load_ticket_catalog, save_ticket_catalog
+from .http_client import get_http_client
+
+plugin_config = Config()
+
+DEFAULT_TICKET_DESCRIPTION = '没有票'
+BUILTIN_VERSION = 'builtin'
+
+# 内置的功能票描述，数据源不可用时使用，数据源中的条目会覆盖同ID的内置条目
+BUILTIN_TICKETS: Mapping[int, str] = MappingProxyType({
+    2: '付费2倍票',
+    3: '付费3倍票',
+    4: '付费4倍票',
+    5: '付费5倍票',
+    6: '付费6倍票',
+    10005: '活动5倍票 (类型1)',
+    10105: '活动5倍票 (类型2)',
+    10205: '活动5倍票 (类型3)',
+    11001: '免费1.5倍票',
+    11002: '免费2倍票',
+    11003: '免费3倍票',
+    11005: '免费5倍票',
+    30001: '特殊2倍票',
+})
+
+# 当前生效的功能票目录。刷新时整体替换为新的只读映射，读取方不需要加锁
+_catalog: Mapping[int, str] = BUILTIN_TICKETS
+_catalog_version = BUILTIN_VERSION
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_ticket_description(ticket_id: int) -> str:
+    """
+    @Author: TurboServlet
+    @Func: get_ticket_description()
+    @Description: 获取功能票的描述信息，目录中没有的功能票显示其ID
+    @Param {int} ticket_id: 票的ID
+    @Return: str
+    """
+    description = _catalog.get(ticket_id)
+    if description is not None:
+        return description
+    if not ticket_id:
+        return DEFAULT_TICKET_DESCRIPTION
+    return f"未知功能票（ID {ticket_id}）"
+
+
+def get_ticket_catalog_stats() -> dict:
+    return {"version": _catalog_version, "size": len(_catalog)}
+
+
+def parse_ticket_catalog(data: Any) -> Tuple[str, Dict[int, str]]:
+    """
+    @Author: TurboServlet
+    @Func: parse_ticket_catalog()
+    @Description: 解析功能票目录，支持 {"version": ..., "tickets": {ID: 描述}} 或直接的 {ID: 描述}，
+                  未提供版本号时以内容摘要作为版本号
+    @Param {Any} data: 解析后的 JSON 数据
+    @Return: (版本号, 功能票ID -> 描述)
+    """
+    if not isinstance(data, dict):
+        raise ValueError("功能票目录必须是 JSON 对象")
+    wrapped = "tickets" in data
+    tickets = data["tickets"] if wrapped else data
+    if not isinstance(tickets, dict):
+        raise ValueError("功能票目录的 tickets 必须是 JSON 对象")
+
+    entries: Dict[int, str] = {}
+    for ticket_id, description in tickets.items():
+        if ticket_id == "version":
+            continue
+        entries[int(ticket_id)] = str(description)
+    if not entries:
+        raise ValueError("功能票目录为空")
+
+    version = data.get("version") if wrapped else None
+    if version is None:
+        digest = hashlib.sha1(json.dumps(sorted(entries.items()), ensure_ascii=False).encode()).hexdigest()
+        version = digest[:12]
+    return str(version), entries
+
+
+def _install(version: str, entries: Mapping[int, str]):
+    global _catalog, _catalog_version
+    _catalog = MappingProxyType({**BUILTIN_TICKETS, **entries})
+    _catalog_version = version
+
+
+async def _read_source(source: str) -> Any:
+    if source.startswith(("http://", "https://")):
+        response = await get_http_client().get(source, timeout=plugin_config.api_read_timeout)
+        response.raise_for_status()
+        return response.json()
+    # 读取与解析本地文件放到线程池中，避免每次刷新阻塞事件循环
+    return await asyncio.get_running_loop().run_in_executor(None, _read_file, source)
+
+
+def _read_file(path: str) -> Any:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+async def refresh_ticket_catalog() -> Tuple[str, int, bool]:
+    """
+    @Author: TurboServlet
+    @Func: refresh_ticket_catalog()
+    @Description: 从配置的数据源（URL 或本地 JSON 文件）刷新功能票目录，版本变化时写入数据库
+    @Return: (当前版本号, 功能票数量, 是否更新)
+    """
+    source = plugin_config.ticket_catalog_source
+    if not source:
+        return _catalog_version, len(_catalog), False
+
+    version, entries = parse_ticket_catalog(await _read_source(source))
+    if version == _catalog_version:
+        return _catalog_version, len(_catalog), False
+
+    await save_ticket_catalog(version, entries)
+    _install(version, entries)
+    logger.info(f"功能票目录已更新到版本 {version}，共 {len(_catalog)} 种功能票")
+    return _catalog_version, len(_catalog), True
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            await refresh_ticket_catalog()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"刷新功能票目录失败，继续使用版本 {_catalog_version}：{e}")
+        if plugin_config.ticket_catalog_refresh_interval <= 0:
+            return
+        await asyncio.sleep(plugin_config.ticket_catalog_refresh_interval)
+
+
+async def start_ticket_catalog():
+    """
+    @Author: TurboServlet
+    @Func: start_ticket_catalog()
+    @Description: 启动时先加载数据库中保存的目录，再在后台从数据源刷新，不阻塞启动
+    """
+    global _refresh_task
+    try:
+        version, entries = await load_ticket_catalog()
+        if version is not None:
+            _install(version, entries)
+    except Exception as e:
+        logger.warning(f"读取本地功能票目录失败，使用内置目录：{e}")
+
+    if plugin_config.ticket_catalog_source and _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_ticket_catalog():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
@@ -0,0 +1,39 @@
+import time
+
+
+class TokenBucket:
+    """
+    @Author: TurboServlet
+    @Description: 令牌桶，按固定速率补充令牌，容量决定允许的突发量。
+                  调用方需保证 rate > 0 且单次消耗不超过 capacity，由 Config 中各速率项的 gt=0 / ge=1 约束
+                  与 check_rate_limit_costs 校验保证，因此 retry_after() 返回的等待时间总是有限的
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def retry_after(self, cost: float, now: float) -> float:
+        """
+        @Author: TurboServlet
+        @Func: retry_after()
+        @Description: 计算还需等待多久才有足够令牌，令牌充足时返回 0
+        @Param {float} cost: 需要的令牌数
+        @Param {float} now: 当前时间
+        @Return: float
+        """
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def consume(self, cost: float):
+        self.tokens -= cost
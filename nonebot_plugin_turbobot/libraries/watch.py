@@ -0,0 +1,247 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from nonebot import get_bots, logger
+
+from ..config import Config
+from .api_client import TurboApiError, turbo_api
+from .storage import add_watch, get_bot_key, get_storage, load_watches, remove_watch
+from .fanout import fan_out
+from .send_queue import Target, outbound
+
+plugin_config = Config()
+
+# 机厅快照：(30 分钟内玩家数, 玩家名称集合)
+ArcadeSnapshot = Tuple[int, Set[str]]
+
+
+class _Subscriber:
+    __slots__ = ("bot_id", "qqid")
+
+    def __init__(self, bot_id: str, qqid: str):
+        self.bot_id = bot_id
+        self.qqid = qqid
+
+
+def get_watch_target(event) -> Target:
+    """
+    @Author: TurboServlet
+    @Func: get_watch_target()
+    @Description: 获取事件对应的推送目标，群聊推送到群，频道推送到子频道，其余推送到私聊
+    @Param {MessageEvent} event: 消息事件
+    @Return: (目标类型, 目标ID)
+    """
+    group_openid = getattr(event, "group_openid", None)
+    if group_openid:
+        return "group", group_openid
+    channel_id = getattr(event, "channel_id", None)
+    if channel_id:
+        return "channel", channel_id
+    return "user", str(event.get_user_id())
+
+
+def take_snapshot(arcade_data: Dict[str, Any]) -> ArcadeSnapshot:
+    players = {player.get("maimaiName", "未知玩家") for player in arcade_data.get("playerList", [])}
+    return arcade_data.get("thirtyMinutesPlayer", 0), players
+
+
+def diff_snapshots(arcade_name: str, previous: ArcadeSnapshot, current: ArcadeSnapshot) -> Optional[str]:
+    """
+    @Author: TurboServlet
+    @Func: diff_snapshots()
+    @Description: 比较两次机厅快照，30 分钟内玩家数变化达到阈值或有新玩家出现时生成推送消息
+    @Param {str} arcade_name: 机厅名称
+    @Param {ArcadeSnapshot} previous: 上一次的快照
+    @Param {ArcadeSnapshot} current: 本次快照
+    @Return: 推送消息，无明显变化时返回 None
+    """
+    previous_count, previous_players = previous
+    current_count, current_players = current
+    new_players = sorted(current_players - previous_players)
+    count_changed = abs(current_count - previous_count) >= plugin_config.watch_min_player_delta
+    if not count_changed and not new_players:
+        return None
+
+    message = f"机厅「{arcade_name}」有新动态\n30 分钟内玩家：{previous_count} → {current_count}"
+    if new_players:
+        message += "\n新到玩家：" + "、".join(new_players[:6])
+        if len(new_players) > 6:
+            message += f" 等 {len(new_players)} 人"
+    return message
+
+
+class WatchScheduler:
+    """
+    @Author: TurboServlet
+    @Description: 机厅关注调度器，每个被关注的机厅每轮只请求一次，有明显变化时推送给所有关注者
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Dict[Target, _Subscriber]] = {}
+        self._snapshots: Dict[str, ArcadeSnapshot] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self) -> int:
+        """
+        @Author: TurboServlet
+        @Func: load()
+        @Description: 从存储后端重新载入全部关注记录，不再被关注的机厅丢弃其快照
+        @Return: int，关注记录数量
+        """
+        rows = await load_watches()
+        subscriptions: Dict[str, Dict[Target, _Subscriber]] = {}
+        for arcade_name, target_type, target_id, bot_id, qqid in rows:
+            subscriptions.setdefault(arcade_name, {})[(target_type, target_id)] = _Subscriber(bot_id, qqid)
+        self._subscriptions = subscriptions
+        for arcade_name in list(self._snapshots):
+            if arcade_name not in subscriptions:
+                del self._snapshots[arcade_name]
+        return len(rows)
+
+    async def _on_invalidate(self, key: Optional[str]):
+        await self.load()
+
+    def watched_by(self, target: Target) -> List[str]:
+        return sorted(name for name, subscribers in self._subscriptions.items() if target in subscribers)
+
+    async def subscribe(self, arcade_name: str, target: Target, bot_id: str, qqid: str, arcade_data: Dict[str, Any]):
+        """
+        @Author: TurboServlet
+        @Func: subscribe()
+        @Description: 关注机厅，并以订阅时查询到的数据作为比较基准
+        @Param {str} arcade_name: 机厅规范名称
+        @Param {Target} target: 推送目标
+        @Param {str} bot_id: 负责推送的 Bot ID
+        @Param {str} qqid: 订阅者的QQID，轮询时使用其 bot_key
+        @Param {dict} arcade_data: 订阅时查询到的机厅数据
+        """
+        await add_watch(arcade_name, target[0], target[1], bot_id, qqid)
+        self._subscriptions.setdefault(arcade_name, {})[target] = _Subscriber(bot_id, qqid)
+        self._snapshots.setdefault(arcade_name, take_snapshot(arcade_data))
+
+    async def unsubscribe(self, arcade_name: str, target: Target) -> bool:
+        """
+        @Author: TurboServlet
+        @Func: unsubscribe()
+        @Description: 取消关注机厅，机厅无人关注后不再轮询
+        @Param {str} arcade_name: 机厅名称
+        @Param {Target} target: 推送目标
+        @Return: bool，是否存在该关注
+        """
+        subscribers = self._subscriptions.get(arcade_name)
+        if not subscribers or target not in subscribers:
+            return False
+        await remove_watch(arcade_name, target[0], target[1])
+        del subscribers[target]
+        if not subscribers:
+            del self._subscriptions[arcade_name]
+            self._snapshots.pop(arcade_name, None)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "arcades": len(self._subscriptions),
+            "subscriptions": sum(len(subscribers) for subscribers in self._subscriptions.values()),
+        }
+
+    async def _pick_bot_key(self, subscribers: Dict[Target, _Subscriber]) -> Optional[str]:
+        for subscriber in list(subscribers.values()):
+            bot_key = await get_bot_key(subscriber.qqid)
+            if bot_key:
+                return bot_key
+        return None
+
+    async def _fetch(self, arcade_name: str) -> Optional[Dict[str, Any]]:
+        subscribers = self._subscriptions.get(arcade_name)
+        if not subscribers:
+            return None
+        bot_key = await self._pick_bot_key(subscribers)
+        if bot_key is None:
+            return None
+        return await turbo_api.arcade_info_detail(bot_key, arcade_name)
+
+    async def poll_once(self):
+        """
+        @Author: TurboServlet
+        @Func: poll_once()
+        @Description: 对所有被关注的机厅各请求一次，与上次快照比较后推送变化
+        """
+        calls = {name: (lambda name=name: self._fetch(name)) for name in list(self._subscriptions)}
+        if not calls:
+            return
+        results, errors = await fan_out(calls, timeout=plugin_config.fanout_timeout)
+
+        for arcade_name, error in errors.items():
+            if isinstance(error, TurboApiError):
+                logger.warning(f"机厅「{arcade_name}」关注轮询失败，HTTP响应状态码为 {error.status_code}")
+            else:
+                logger.warning(f"机厅「{arcade_name}」关注轮询过程中出现错误：{error!r}")
+
+        pushes = []
+        for arcade_name, arcade_data in results.items():
+            if arcade_data is None or arcade_name not in self._subscriptions:
+                continue
+            current = take_snapshot(arcade_data)
+            previous = self._snapshots.get(arcade_name)
+            self._snapshots[arcade_name] = current
+            if previous is None:
+                continue
+            message = diff_snapshots(arcade_name, previous, current)
+            if message:
+                for target, subscriber in list(self._subscriptions[arcade_name].items()):
+                    pushes.append(self._push(target, subscriber.bot_id, message))
+        if pushes:
+            await asyncio.gather(*pushes)
+
+    async def _push(self, target: Target, bot_id: str, message: str):
+        bot = get_bots().get(bot_id)
+        if bot is None:
+            return
+        try:
+            # 经过出站调度器排队，与该群、频道或用户的普通回复共用限速与重试
+            await outbound.push(bot, target, message)
+        except Exception as e:
+            logger.warning(f"机厅关注推送到 {target[0]} {target[1]} 失败：{e!r}")
+
+    async def _run(self):
+        storage = get_storage()
+        while True:
+            await asyncio.sleep(plugin_config.watch_poll_interval)
+            try:
+                # 多个实例共用存储后端时，只有持有租约的实例轮询与推送，其余实例在租约过期后接替
+                if not await storage.acquire_lease("watch-poller", plugin_config.watch_poll_interval * 3):
+                    continue
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"机厅关注轮询过程中出现错误：{e!r}")
+
+    async def start(self):
+        """
+        @Author: TurboServlet
+        @Func: start()
+        @Description: 在驱动启动时载入关注记录并启动后台轮询，其他实例修改关注后重新载入
+        """
+        get_storage().on_invalidate("watch", self._on_invalidate)
+        count = await self.load()
+        logger.info(f"已载入 {count} 条机厅关注")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        @Author: TurboServlet
+        @Func: stop()
+        @Description: 在驱动关闭时停止后台轮询
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+watch_scheduler = WatchScheduler()